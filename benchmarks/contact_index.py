@@ -0,0 +1,78 @@
+"""
+Compare GeoSpace neighbor queries with the grid `ContactIndex`.
+
+Usage: python -m benchmarks.contact_index
+"""
+import time
+
+import mesa
+import mesa_geo as mg
+import numpy as np
+import shapely
+
+from src.disease_spread.contact_index import ContactIndex
+
+EXPOSURE_DISTANCE = 0.000015  # about 12m, same as the server default
+AREA_SIZE = 0.05  # degrees
+POPULATIONS = [1_000, 10_000, 100_000]
+INFECTED = [10, 100, 1_000]
+
+
+def make_agents(model, size, rng):
+    # Agents sit on a limited set of places, like they do in the model
+    places = rng.random((max(1, size // 10), 2)) * AREA_SIZE
+    points = places[rng.integers(0, len(places), size)]
+    return [
+        mg.GeoAgent(i, model, shapely.Point(x, y), 'epsg:4326')
+        for i, (x, y) in enumerate(points)
+    ]
+
+
+def bench_geospace(space, infected):
+    start = time.perf_counter()
+    contacts = 0
+    for agent in infected:
+        contacts += sum(1 for _ in space.get_neighbors_within_distance(agent, EXPOSURE_DISTANCE, center=True))
+    return time.perf_counter() - start, contacts
+
+
+def bench_grid(agents, infected_indexes):
+    start = time.perf_counter()
+    index = ContactIndex(EXPOSURE_DISTANCE)
+    for agent in agents:
+        index.add(agent)
+    index.build()
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sources, _ = index.query(infected_indexes, EXPOSURE_DISTANCE)
+    return build_time, time.perf_counter() - start, len(sources)
+
+
+def main():
+    rng = np.random.default_rng(42)
+    model = mesa.Model()
+
+    print(f'{"population":>10} {"infected":>8} {"geospace, s":>12} {"grid build, s":>14} {"grid query, s":>14} {"contacts":>9}')
+    for size in POPULATIONS:
+        agents = make_agents(model, size, rng)
+        space = mg.GeoSpace('epsg:4326')
+        space.add_agents(agents)
+
+        for amount in INFECTED:
+            if amount > size:
+                continue
+            infected_indexes = rng.choice(size, amount, replace=False)
+            infected = [agents[i] for i in infected_indexes]
+
+            geospace_time, geospace_contacts = bench_geospace(space, infected)
+            build_time, query_time, grid_contacts = bench_grid(agents, infected_indexes)
+
+            if geospace_contacts != grid_contacts:
+                print(f'[Benchmark] Contacts mismatch: geospace={geospace_contacts} grid={grid_contacts}')
+
+            print(f'{size:>10} {amount:>8} {geospace_time:>12.4f} {build_time:>14.4f} {query_time:>14.4f} {grid_contacts:>9}')
+
+
+if __name__ == '__main__':
+    main()
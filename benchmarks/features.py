@@ -0,0 +1,137 @@
+"""
+Compare the array-based feature post-processing of `PolygonUtils` (representative points, value filter,
+overlap check, `home` merge) with the previous row-wise pipeline on large synthetic raw feature frames,
+shaped like `ox.features_from_polygon` results.
+
+Usage: python -m benchmarks.features [sizes...]
+"""
+import sys
+import time
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from benchmarks.synthetic_store import tag_values
+from src.config import Config
+from src.openstreetmap.custompolygon import PolygonUtils
+from src.openstreetmap.tags import TagsConfig
+
+SIZES = [10_000, 100_000, 300_000]
+AREA_SIZE = 0.2  # degrees
+BUILDING_SIZE = 0.0001  # degrees
+OTHER_VALUE = 'yes'  # Value outside most selections, dropped by the filter
+OVERLAP_SHARE = 0.05
+OTHER_VALUE_SHARE = 0.2
+GEOMETRY_SHARES = {'polygon': 0.7, 'point': 0.2, 'line': 0.1}
+
+
+def make_features(size: int, tags: dict, rng: np.random.Generator) -> gpd.GeoDataFrame:
+    """
+    Raw features of one tag: polygons, points and lines with one tag column set per row, some with values outside
+    the selection and some with a second column set (overlaps).
+    """
+    centers = rng.random((size, 2)) * AREA_SIZE
+    kinds = rng.choice(list(GEOMETRY_SHARES), size, p=list(GEOMETRY_SHARES.values()))
+
+    half = BUILDING_SIZE / 2
+    geometry = shapely.points(centers)
+    polygons = kinds == 'polygon'
+    geometry[polygons] = shapely.box(*(centers[polygons] - half).T, *(centers[polygons] + half).T)
+    lines = kinds == 'line'
+    geometry[lines] = shapely.linestrings(
+        np.stack([centers[lines] - half, centers[lines] + half], axis=1)
+    )
+
+    pairs = tag_values(tags)
+    keys = list(tags)
+    columns = {key: np.full(size, None, dtype=object) for key in keys}
+    for row, pair in enumerate(rng.integers(0, len(pairs), size)):
+        key, value = pairs[pair]
+        columns[key][row] = OTHER_VALUE if rng.random() < OTHER_VALUE_SHARE else value
+    if len(keys) > 1:
+        for row in np.flatnonzero(rng.random(size) < OVERLAP_SHARE):
+            key, value = pairs[rng.integers(len(pairs))]
+            columns[key][row] = value
+
+    index = pd.MultiIndex.from_arrays(
+        [np.where(kinds == 'point', 'node', 'way'), np.arange(size)], names=['element', 'id']
+    )
+    return gpd.GeoDataFrame({**columns, 'name': 'feature'}, geometry=geometry, index=index, crs=4326)
+
+
+def legacy_process_features(features: gpd.GeoDataFrame, tags: dict) -> gpd.GeoDataFrame:
+    """
+    Row-wise pipeline before the array rewrite.
+    """
+    features = features[['geometry', *tags.keys()]]
+    features['representative_point'] = features['geometry'].apply(PolygonUtils.get_representative_point)
+    features = features.drop(columns=['geometry'])
+
+    for key, value in tags.items():
+        if isinstance(value, bool) and value:
+            continue
+        features[key] = features[key].where(features[key].isin(value), np.nan)
+
+    overlap_indexes = []
+    for i, row in features.iterrows():
+        if len([column for column in tags if pd.notna(row[column])]) > 1:
+            overlap_indexes.append(i)
+    return features.drop(overlap_indexes)
+
+
+def legacy_prepare_housing_df(df: gpd.GeoDataFrame, tags: dict) -> gpd.GeoDataFrame:
+    df = df.copy()  # The legacy version added `home` to the frame of the store
+    df['home'] = df[list(tags)].bfill(axis=1).iloc[:, 0]
+    return df.drop(columns=list(tags))
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def same_frames(legacy: pd.DataFrame, new: pd.DataFrame) -> bool:
+    if not legacy.index.equals(new.index) or list(legacy.columns) != list(new.columns):
+        return False
+    for column in legacy.columns:
+        if column == 'representative_point':
+            if not shapely.equals(np.asarray(legacy[column].values), np.asarray(new[column].values)).all():
+                return False
+        elif not legacy[column].isna().equals(new[column].isna()) or \
+                not (legacy[column].dropna() == new[column].dropna()).all():
+            return False
+    return True
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    tags = TagsConfig(Config.TAGS_PATH)
+    rng = np.random.default_rng(42)
+
+    print(f'{"tag":>6} {"rows":>8} {"legacy, s":>10} {"arrays, s":>10} {"speedup":>8} {"kept":>8}')
+    for size in sizes:
+        for tag in ['home', 'work']:
+            features = make_features(size, tags[tag], rng)
+            original = features.copy()
+
+            legacy_time, legacy = timed(legacy_process_features, features, tags[tag])
+            new_time, new = timed(PolygonUtils.process_features, features, tags[tag])
+            if tag == 'home':
+                legacy_merge_time, legacy = timed(legacy_prepare_housing_df, legacy, tags[tag])
+                new_merge_time, new = timed(PolygonUtils.prepare_housing_df, new, tags[tag])
+                legacy_time += legacy_merge_time
+                new_time += new_merge_time
+
+            if not same_frames(legacy, new):
+                print(f'[Benchmark] Results differ: {tag} | {size}')
+            if not features.equals(original):
+                print(f'[Benchmark] Input frame was modified: {tag} | {size}')
+
+            print(f'{tag:>6} {size:>8} {legacy_time:>10.3f} {new_time:>10.3f} {legacy_time / new_time:>7.1f}x {len(new):>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Bytes per `Human` agent with shared `DiseaseParameters` and slots, compared to the previous layout
+where every agent kept all disease constants in its instance dict.
+
+Usage: python -m benchmarks.memory [sizes...]
+"""
+import gc
+import random
+import sys
+import tracemalloc
+
+import mesa
+import mesa_geo as mg
+import shapely
+
+from src.config import Config
+from src.disease_spread.agent import Human
+from src.disease_spread.parameters import DiseaseParameters
+from src.utils.human_age import HumanAgeGroup
+from src.utils.human_state import HumanState
+from src.utils.random_streams import RandomStreams
+
+SIZES = [100_000, 1_000_000]
+
+
+class BenchmarkModel(mesa.Model):
+    def __init__(self):
+        super().__init__()
+        self.step_per_day = 24
+        self.parameters = DiseaseParameters(self.step_per_day)
+        self.rng = RandomStreams(1).stream('agents')
+
+
+class LegacyHuman(mg.GeoAgent):
+    """
+    Attribute layout of `Human` before the disease constants were shared.
+    """
+
+    def __init__(self, unique_id, model, geometry, crs, exposure_distance, routines, raion=None):
+        super().__init__(unique_id, model, geometry, crs)
+        self.exposure_distance = exposure_distance
+        self.raion = raion
+        self.counted = False
+        self.condition = HumanState.Sustainable
+
+        self.step_per_day = model.step_per_day
+        self.year_in_steps = 365 * self.step_per_day
+        self.lifespan_steps = 96 * self.year_in_steps
+        self.healthy_contagious_rate = 0.017
+        self.latent_chance = 0.9
+        self.primary_chance = 0.1
+        self.latent_recovery_chance = 0.1
+        self.tuberculosis_recovery_chance = 0.896
+        self.mortality_chance = 0.104
+        self.post_primary_latent_chance = (0.05, 0.15)
+        self.repeated_infection_chance = 0.14
+        self.latent_recovery_day_range = (42, 56)
+        self.incubation_period_days = 60
+        self.IR_constant = 0.0024
+        self.constant_a = 90
+        self.constant_b = 50
+        self.time_spend_with_in_minutes = 1 * 60
+
+        self.steps_lived = HumanAgeGroup.set_random_init_age(model.rng) * self.year_in_steps
+        self.human_age_group = HumanAgeGroup.set_age_group(self.steps_lived / self.year_in_steps)
+        self.routines = routines
+        self.steps_infected = 0
+        self.random_day_in_life = int(model.rng.integers(0, int(self.lifespan_steps / self.year_in_steps) + 1))
+
+        self.flag_reinfection = False
+        self.flag_latent_recovery = False
+        self.flag_latent_infection = False
+        self.reinfection_step = None
+        self.latent_recovery_step = None
+        self.latent_infection_step = None
+        self.countagious_rate = 0
+        self.max_countagious_rate = 0
+
+        self.population_index = None
+        self.contact_slot = None
+        self.clock_step = None
+
+
+def measure(size, create):
+    model = BenchmarkModel()
+    crs = mg.GeoSpace('epsg:4326').crs
+    # Agents share home points, like they do in the model
+    points = [shapely.Point(random.random(), random.random()) for _ in range(1_000)]
+
+    gc.collect()
+    tracemalloc.start()
+    agents = [create(i, model, points[i % len(points)], crs) for i in range(size)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del agents
+    gc.collect()
+    return current / size
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    HumanAgeGroup.init(Config.POPULATION_PATH)
+
+    layouts = {
+        'legacy': lambda i, model, point, crs: LegacyHuman(i, model, point, crs, 0.000015, None, 'raion'),
+        'shared': lambda i, model, point, crs: Human(i, model, point, crs, None, 'raion'),
+    }
+
+    print(f'{"agents":>10} {"legacy, B/agent":>16} {"shared, B/agent":>16} {"saved":>7}')
+    for size in sizes:
+        legacy = measure(size, layouts['legacy'])
+        shared = measure(size, layouts['shared'])
+        print(f'{size:>10} {legacy:>16.0f} {shared:>16.0f} {1 - shared / legacy:>7.1%}')
+
+
+if __name__ == '__main__':
+    main()
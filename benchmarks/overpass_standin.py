@@ -0,0 +1,120 @@
+"""
+Recorded-response stand-in for Overpass, to run `OSMPreloader` without network access and compare one fetch per
+(raion, tag) with one fetch per raion using the union of all tags.
+
+`RecordedOverpass` answers like `ox.features_from_polygon` from a recorded frame of raw features: rows matching
+the tags and intersecting the polygon. Every answer goes through the `requests` response hooks osmnx would call,
+with an Overpass-like JSON body, so `RequestStats` counts requests and bytes the same way as real traffic.
+
+Usage: python -m benchmarks.overpass_standin [features per tag]
+"""
+import json
+import shutil
+import sys
+import tempfile
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import requests
+import shapely
+from osmnx import settings
+
+from benchmarks.features import AREA_SIZE, make_features, same_frames
+from src.config import Config
+from src.openstreetmap.custompolygon import CustomPolygon, PolygonUtils
+from src.openstreetmap.feature_cache import FeatureCache
+from src.openstreetmap.preloader import OSMPreloader
+from src.openstreetmap.request_stats import RequestStats
+from src.openstreetmap.tags import TagsConfig
+from src.utils.agent_places import AgentPlaces
+
+FEATURES_PER_TAG = 20_000
+RAIONS = 2
+RAION_WIDTH = AREA_SIZE / RAIONS  # degrees, raions split the feature area
+
+
+class RecordedOverpass:
+    def __init__(self, features: gpd.GeoDataFrame):
+        self.features = features
+
+    def __call__(self, polygon, tags: dict) -> gpd.GeoDataFrame:
+        rows = PolygonUtils.match_features(self.features, tags) & self.features.intersects(polygon).to_numpy()
+        answer = self.features[rows]
+        self.__respond(answer, tags)
+        if answer.empty:
+            return gpd.GeoDataFrame(geometry=[], crs=4326)
+        # Like osmnx, only columns of tags some feature has
+        return answer.dropna(axis=1, how='all')
+
+    @staticmethod
+    def __respond(answer: gpd.GeoDataFrame, tags: dict):
+        columns = [column for column in answer.columns if column != 'geometry']
+        elements = [
+            {'type': element, 'id': int(osm_id), 'tags': {k: v for k, v in zip(columns, values) if pd.notna(v)},
+             'geometry': shapely.to_wkt(geometry, rounding_precision=7)}
+            for (element, osm_id), geometry, values in zip(
+                answer.index, answer.geometry.values, answer[columns].itertuples(index=False)
+            )
+        ]
+        response = requests.Response()
+        response.status_code = 200
+        response.url = settings.overpass_url.rstrip('/') + '/interpreter'
+        response._content = json.dumps({'query': tags, 'elements': elements}).encode()
+
+        hooks = (settings.requests_kwargs.get('hooks') or {}).get('response') or []
+        for hook in hooks if isinstance(hooks, list) else [hooks]:
+            hook(response)
+
+
+def make_recorded_features(selections: dict[str, dict], size: int, rng: np.random.Generator) -> gpd.GeoDataFrame:
+    frames = [make_features(size, tags, rng) for tags in selections.values()]
+    features = pd.concat(frames)
+    features.index = pd.MultiIndex.from_arrays(
+        [features.index.get_level_values('element'), np.arange(len(features))], names=['element', 'id']
+    )
+    return gpd.GeoDataFrame(features, geometry='geometry', crs=4326)
+
+
+def per_tag_fetches(fetcher: RecordedOverpass, polygon, selections: dict[str, dict]) -> tuple[dict, RequestStats]:
+    stats = RequestStats()
+    with stats.record():
+        frames = {tag: PolygonUtils.process_features(fetcher(polygon, tags), tags) for tag, tags in selections.items()}
+    return frames, stats
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else FEATURES_PER_TAG
+    tags = TagsConfig(Config.TAGS_PATH)
+    places = AgentPlaces.new(Config.ROUTINES_PATH)
+    selections = {place['tag']: tags[place['tag']] for place in places.raw().values()}
+    fetcher = RecordedOverpass(make_recorded_features(selections, size, np.random.default_rng(42)))
+
+    # Boundaries come from the feature cache, so neither Nominatim nor Overpass is needed
+    cache = FeatureCache(tempfile.mkdtemp())
+    raions = {}
+    for number in range(RAIONS):
+        name = f'Recorded Raion {number}'
+        box = shapely.box(number * RAION_WIDTH, 0.0, (number + 1) * RAION_WIDTH, AREA_SIZE)
+        raions[name] = CustomPolygon.from_gdf(name, gpd.GeoDataFrame(geometry=[box], crs=4326))
+        cache.save_polygon(name, 1, raions[name])
+
+    preloader = OSMPreloader(tags, places, fetcher=fetcher)
+    preloader.cache = cache
+    store = preloader.preload(list(raions))
+
+    per_tag = RequestStats()
+    for name, custom_polygon in raions.items():
+        frames, stats = per_tag_fetches(fetcher, custom_polygon.polygon, selections)
+        per_tag.merge(stats.state())
+        for tag, df in frames.items():
+            if not same_frames(df, store[name]['places'][tag]):
+                print(f'[Benchmark] Frames differ: {name} | {tag}')
+
+    print(f'[Benchmark] Fetch per tag:   {per_tag.summary()}')
+    print(f'[Benchmark] Fetch per raion: {preloader.stats.summary()}')
+    shutil.rmtree(cache.folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+Benchmark suite on synthetic stores, no osmnx or network access needed.
+
+Every size runs in a fresh process and reports store and routine setup, `TuberculosisSpread.__init__`,
+steps/sec with phase times and counters of the `StepProfiler`, neighbor queries, `AgentRoutine.generate`
+and the peak RSS.
+Results are written as JSON to `benchmarks/results`, compare two of them with `--compare`.
+
+Usage: python -m benchmarks.suite [--sizes 10000 100000 1000000] [--steps 48] [--engine vectorized] ...
+       python -m benchmarks.suite --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from src.utils.path_finder import PathFinder
+
+SIZES = [10_000, 100_000]
+STEPS = 48  # Two simulated days, every routine transition hour is included
+QUERIES = 1_000
+ROUTINES = 1_000
+RESULTS_FOLDER = os.path.join('benchmarks', 'results')
+
+
+def run_case(case: dict) -> dict:
+    """
+    One benchmark case, runs in its own process so the peak RSS belongs to it.
+    """
+    from benchmarks.synthetic_store import make_store
+    from src.config import Config
+    from src.disease_spread.model import TuberculosisSpread
+    from src.disease_spread.profiler import StepProfiler
+    from src.openstreetmap.tags import TagsConfig
+    from src.utils.agent_routines import AgentRoutine
+
+    result = {**case}
+
+    started = time.perf_counter()
+    tags = TagsConfig(Config.TAGS_PATH)
+    store = make_store(case['size'], raions=case['raions'], seed=case['seed'], tags=tags)
+    result['store_time'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    routine_creator = AgentRoutine(config_path=Config.ROUTINES_PATH, store=store)
+    result['routine_creator_time'] = time.perf_counter() - started
+
+    raion = next(iter(store))
+    home_points = store[raion]['places']['home']['representative_point'].iloc[:ROUTINES].tolist()
+    rng = np.random.default_rng(case['seed'])
+    started = time.perf_counter()
+    for home_point in home_points:
+        routine_creator.generate(home_point, raion, rng)
+    result['routine_generate_per_1k'] = (time.perf_counter() - started) / len(home_points) * 1_000
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = TuberculosisSpread(
+            store=store,
+            tags=tags,
+            exposure_distance=case['exposure_distance'],
+            infected_percentage=case['infected_percentage'],
+            routine_creator=routine_creator,
+            engine=case['engine'],
+            contacts=case['contacts'],
+            infection=case['infection'],
+            scheduler=case.get('scheduler', 'base'),
+            seed=case['seed'],
+        )
+    result['init_time'] = time.perf_counter() - started
+    result['agents'] = len(model.humans())
+
+    model.profiler = StepProfiler()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(case['steps']):
+            model.step()
+    run_time = time.perf_counter() - started
+    result['steps_per_sec'] = case['steps'] / run_time
+
+    profile = model.profiler.summary()
+    result['phases'] = {name: stats['per_step'] for name, stats in profile['phases'].items()}
+    result['counters'] = {name: stats['per_step'] for name, stats in profile['counters'].items()}
+    model.profiler = None
+
+    humans = model.humans()
+    if model.contact_index is not None:
+        model.contact_index.build(*model.positions.coordinates())
+    else:
+        model.sync_geometries()
+    queried = rng.choice(len(humans), min(QUERIES, len(humans)), replace=False)
+    started = time.perf_counter()
+    contacts = sum(len(model.get_contacts(humans[index])) for index in queried.tolist())
+    result['neighbor_query_per_1k'] = (time.perf_counter() - started) / len(queried) * 1_000
+    result['contacts_per_query'] = contacts / len(queried)
+
+    # Kilobytes on Linux
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PathFinder.root_path(), text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args) -> dict:
+    cases = [
+        {
+            'size': size,
+            'raions': args.raions,
+            'steps': args.steps,
+            'engine': args.engine,
+            'contacts': args.contacts,
+            'infection': args.infection,
+            'scheduler': args.scheduler,
+            'exposure_distance': args.exposure_distance,
+            'infected_percentage': args.infected_percentage,
+            'seed': args.seed,
+        }
+        for size in args.sizes
+    ]
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for case in cases:
+        print(f'[Benchmark] {case["size"]} agents, {case["engine"]} engine, {case["scheduler"]} scheduler, '
+              f'{case["contacts"]} contacts...', flush=True)
+        with context.Pool(1) as pool:
+            result = pool.apply(run_case, (case,))
+        results.append(result)
+        print(f'[Benchmark] init {result["init_time"]:.2f}s, {result["steps_per_sec"]:.2f} steps/sec, '
+              f'peak {result["peak_rss_mb"]:.0f} MB')
+
+    return {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': multiprocessing.cpu_count(),
+        'cases': results,
+    }
+
+
+def save(report: dict, output: str | None) -> str:
+    if output is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = PathFinder.find(os.path.join(RESULTS_FOLDER, f'{timestamp}_{report["commit"] or "nocommit"}.json'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    return output
+
+
+def case_key(case: dict) -> tuple:
+    return case['size'], case['raions'], case['engine'], case.get('scheduler', 'base'), case['contacts'], case['infection']
+
+
+def flatten(case: dict) -> dict:
+    metrics = {key: value for key, value in case.items() if isinstance(value, float)}
+    metrics.update({f'phase.{name}': value for name, value in case.get('phases', {}).items()})
+    metrics.update({f'counter.{name}': value for name, value in case.get('counters', {}).items()})
+    return metrics
+
+
+def compare(old_path: str, new_path: str):
+    """
+    Print new / old of every metric of the cases both reports have.
+    """
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+
+    old_cases = {case_key(case): case for case in old['cases']}
+    print(f'[Benchmark] {old["commit"]} -> {new["commit"]}')
+    for case in new['cases']:
+        key = case_key(case)
+        if key not in old_cases:
+            print(f'[Benchmark] {key}: missing in {old_path}')
+            continue
+
+        print(f'\n{" | ".join(map(str, key))}')
+        old_metrics, new_metrics = flatten(old_cases[key]), flatten(case)
+        for name, value in new_metrics.items():
+            if name not in old_metrics or name in ['exposure_distance', 'infected_percentage']:
+                continue
+            ratio = value / old_metrics[name] if old_metrics[name] else float('inf')
+            print(f'  {name:<28} {old_metrics[name]:>12.4f} {value:>12.4f}  x{ratio:.2f}')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark TuberculosisSpread on synthetic stores.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Agent amounts')
+    parser.add_argument('--raions', type=int, default=2)
+    parser.add_argument('--steps', type=int, default=STEPS)
+    parser.add_argument('--engine', default='vectorized', help='agent | vectorized')
+    parser.add_argument('--contacts', default='grid', help='geospace | grid')
+    parser.add_argument('--infection', default='neighbors', help='neighbors | colocation')
+    parser.add_argument('--scheduler', default='base', help='base | event (agent engine only)')
+    parser.add_argument('--exposure-distance', type=float, default=0.000015)
+    parser.add_argument('--infected-percentage', type=float, default=0.044)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='Result file (default: benchmarks/results/<time>_<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run_suite(args)
+    print(f'[Benchmark] Results saved to {save(report, args.output)}')
+
+
+if __name__ == '__main__':
+    main()
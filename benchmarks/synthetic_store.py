@@ -0,0 +1,138 @@
+"""
+Synthetic stores in the shape `OSMPreloader.preload` returns, so the model runs without osmnx and network access:
+    {raion: {'polygon': CustomPolygon, 'places': {tag: GeoDataFrame}}}
+
+Raions are square polygons side by side. Every place frame has the tag columns of `tags.yaml`, exactly one of them
+set per row like after the preloader overlap filter, and a `representative_point` column.
+
+Usage: python -m benchmarks.synthetic_store [agents] [raions]
+"""
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from src.config import Config
+from src.openstreetmap.custompolygon import CustomPolygon
+from src.openstreetmap.mapping.housing import HOUSING_MAPPING
+from src.openstreetmap.tags import TagsConfig
+from src.utils.agent_places import AgentPlaces
+
+RAION_SIZE = 0.2  # degrees, about the size of a raion
+SECTORS_PER_SIDE = 4  # Sector polygons per raion side, OSM raions have one
+# Places of a tag per home, homes are derived from the requested amount of agents
+PLACES_PER_HOME = {
+    'kindergarten': 0.002,
+    'school': 0.002,
+    'college': 0.001,
+    'work': 0.05,
+    'weekend_activity': 0.02,
+    'weekday_second_activity': 0.02,
+}
+MIN_PLACES = 5
+TAG_VALUE = 'yes'  # Value of tag columns set to `true` in `tags.yaml`
+
+
+def tag_values(tags: dict) -> list[tuple[str, str]]:
+    """
+    Every (column, value) pair a place of the tag can have.
+    """
+    pairs = []
+    for column, values in tags.items():
+        if isinstance(values, list):
+            pairs += [(column, value) for value in values]
+        else:
+            pairs.append((column, TAG_VALUE))
+    return pairs
+
+
+def make_places(tags: dict, points: np.ndarray, rng: np.random.Generator, values=None) -> gpd.GeoDataFrame:
+    """
+    Place frame with one tag column set per row.
+    :param values: (column, value) of every row, random ones of the tag if not given
+    """
+    if values is None:
+        pairs = tag_values(tags)
+        values = [pairs[i] for i in rng.integers(0, len(pairs), len(points))]
+
+    columns = {column: np.full(len(points), None, dtype=object) for column in tags}
+    for row, (column, value) in enumerate(values):
+        columns[column][row] = value
+
+    return gpd.GeoDataFrame({
+        **columns,
+        'representative_point': gpd.GeoSeries(shapely.points(points), crs=4326),
+    })
+
+
+def make_homes(tags: dict, agents: int, origin: tuple[float, float], rng: np.random.Generator) -> gpd.GeoDataFrame:
+    """
+    Homes housing `agents` humans in total with `HOUSING_MAPPING`.
+    """
+    pairs = [(column, value) for column, value in tag_values(tags) if value in HOUSING_MAPPING]
+    # Enough homes for the smallest buildings, trimmed by the cumulative amount of residents
+    drawn = [pairs[i] for i in rng.integers(0, len(pairs), agents)]
+    residents = np.cumsum([HOUSING_MAPPING[value] for _, value in drawn])
+    homes = int(np.searchsorted(residents, agents)) + 1
+
+    points = np.asarray(origin) + rng.random((homes, 2)) * RAION_SIZE
+    return make_places(tags, points, rng, drawn[:homes])
+
+
+def make_raion_polygon(name: str, origin: tuple[float, float], sectors_per_side: int) -> CustomPolygon:
+    x, y = origin
+    size = RAION_SIZE / sectors_per_side
+    sectors = [
+        shapely.box(x + i * size, y + j * size, x + (i + 1) * size, y + (j + 1) * size)
+        for i in range(sectors_per_side) for j in range(sectors_per_side)
+    ]
+    return CustomPolygon.from_gdf(name, gpd.GeoDataFrame(geometry=sectors, crs=4326))
+
+
+def make_store(agents: int, raions: int = 2, seed: int = 1, sectors_per_side: int = SECTORS_PER_SIDE,
+               tags: TagsConfig | None = None, places: AgentPlaces | None = None) -> dict:
+    """
+    Store with about `agents` humans split evenly across `raions`.
+    """
+    rng = np.random.default_rng(seed)
+    tags = tags or TagsConfig(Config.TAGS_PATH)
+    places = places or AgentPlaces.new(Config.ROUTINES_PATH)
+
+    store = {}
+    for number in range(raions):
+        name = f'Synthetic Raion {number}'
+        origin = (number * RAION_SIZE, 0.0)
+        raion_agents = agents // raions + (1 if number < agents % raions else 0)
+        homes = make_homes(tags['home'], raion_agents, origin, rng)
+
+        raion_places = {}
+        for place in places:
+            tag = place['tag']
+            if tag == 'home':
+                raion_places[tag] = homes
+                continue
+
+            amount = max(MIN_PLACES, int(len(homes) * PLACES_PER_HOME.get(tag, 0)))
+            points = np.asarray(origin) + rng.random((amount, 2)) * RAION_SIZE
+            raion_places[tag] = make_places(tags[tag], points, rng)
+
+        store[name] = {
+            'polygon': make_raion_polygon(name, origin, sectors_per_side),
+            'places': raion_places,
+        }
+
+    return store
+
+
+def describe(store: dict) -> pd.DataFrame:
+    return pd.DataFrame([
+        {'raion': raion, **{tag: len(df) for tag, df in data['places'].items()}}
+        for raion, data in store.items()
+    ])
+
+
+if __name__ == '__main__':
+    print(describe(make_store(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+                              int(sys.argv[2]) if len(sys.argv) > 2 else 2)))
@@ -0,0 +1,44 @@
+import argparse
+
+from src.batch.runner import BatchRunner
+from src.batch.scenario import Scenario
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run TuberculosisSpread headless from a scenario file.')
+    parser.add_argument('scenario', help='Path to the scenario YAML file')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: from scenario)')
+    parser.add_argument('--steps', type=int, default=None, help='Override the run length in steps')
+    parser.add_argument('--years', type=float, default=None, help='Override the run length in years')
+    parser.add_argument('--output', default=None, help='Override the results directory')
+    parser.add_argument('--distributed', action='store_true', help='Step every raion in its own process')
+    parser.add_argument('--resume', action='store_true', help='Continue runs from their last checkpoint')
+    parser.add_argument('--profile', type=int, default=None, metavar='LOG_EVERY',
+                        help='Profile step phases, logging throughput every LOG_EVERY steps')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scenario = Scenario.load(args.scenario)
+
+    if args.steps is not None:
+        scenario.steps, scenario.years = args.steps, None
+    elif args.years is not None:
+        scenario.steps, scenario.years = None, args.years
+    if args.output is not None:
+        scenario.output = args.output
+    if args.distributed:
+        scenario.distributed = True
+    if args.resume:
+        scenario.resume = True
+    if args.profile is not None:
+        scenario.profile = {'log_every': args.profile}
+
+    runner = BatchRunner(scenario)
+    results = runner.run(args.processes)
+    print(f'[BatchRunner] Results saved to {runner.save(results)}')
+
+
+if __name__ == '__main__':
+    main()
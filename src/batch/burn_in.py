@@ -0,0 +1,58 @@
+import argparse
+import time
+
+from src.batch.scenario import Scenario
+from src.config import Config
+from src.disease_spread.model import TuberculosisSpread
+from src.disease_spread.snapshot import SnapshotLibrary
+from src.openstreetmap.preloader import OSMPreloader
+from src.openstreetmap.tags import TagsConfig
+from src.utils.agent_places import AgentPlaces
+from src.utils.agent_routines import AgentRoutine
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Run the first run of a scenario for a burn-in period and save it to the snapshot library.'
+    )
+    parser.add_argument('scenario', help='Path to the scenario YAML file')
+    parser.add_argument('--years', type=float, default=10, help='Burn-in length in simulated years (default: 10)')
+    parser.add_argument('--name', default=None, help='Snapshot name (default: <scenario>_<years>y)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scenario = Scenario.load(args.scenario)
+    run = scenario.runs()[0]
+    name = args.name or f'{scenario.name}_{args.years:g}y'
+
+    Config.configure_osmnx()
+    tags = TagsConfig(Config.TAGS_PATH)
+    store = OSMPreloader(tags, AgentPlaces.new(Config.ROUTINES_PATH), extract=scenario.extract).preload(scenario.locations)
+
+    model = TuberculosisSpread(
+        store=store,
+        tags=tags,
+        routine_creator=AgentRoutine(config_path=Config.ROUTINES_PATH, store=store),
+        disease_parameters=run['disease_parameters'],
+        seed=run['seed'],
+        **run['model'],
+    )
+
+    steps = int(args.years * 365 * model.step_per_day)
+    report_every = max(1, steps // 20)
+    started = time.perf_counter()
+    step = 0
+    while step < steps:
+        previous_step = step
+        step += model.step(steps - step)
+        if step // report_every > previous_step // report_every:
+            print(f'[BurnIn] {step}/{steps} steps ({time.perf_counter() - started:.1f}s)')
+
+    path = SnapshotLibrary().save(model, name, burn_in_years=args.years, scenario=scenario.name)
+    print(f'[BurnIn] Snapshot saved to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.disease_spread.model import TuberculosisSpread
+from src.disease_spread.population import Population
+from src.disease_spread.sector_map import NO_SECTOR, SectorMap
+from src.openstreetmap.tags import TagsConfig
+from src.utils.agent_routines import AgentRoutine
+from src.utils.human_state import HumanState
+
+
+def select(arrays: dict, mask: np.ndarray, drop=()) -> dict:
+    return {key: values[mask] for key, values in arrays.items() if key not in drop}
+
+
+def counters_snapshot(model: TuberculosisSpread) -> dict:
+    return {
+        'by_state': dict(model.counters.by_state),
+        'by_raion': {raion: dict(counter) for raion, counter in model.counters.by_raion.items()},
+    }
+
+
+def raion_worker(connection, store: dict, raion: str, arguments: dict):
+    """
+    Worker process of `DistributedRunner`, owns the humans living in `raion`.
+    """
+    routine_creator = AgentRoutine(config_path=Config.ROUTINES_PATH, store=store)
+    model = TuberculosisSpread(
+        store=store,
+        tags=TagsConfig(Config.TAGS_PATH),
+        routine_creator=routine_creator,
+        raions=[raion],
+        **arguments,
+    )
+    population = model.population
+    own = list(store.keys()).index(raion)
+
+    # Raion of every place point, agents standing in another raion are stepped there
+    domains = SectorMap(model.positions.points)
+    for name in store:
+        domains.add_geometry(store[name]['polygon'].polygon)
+
+    connection.send({'step_per_day': model.step_per_day, **counters_snapshot(model)})
+
+    local = None
+    local_infections = None
+    while True:
+        command, payload = connection.recv()
+
+        if command == 'advance':
+            population.advance()
+            present = population.present(owner=own)
+            domain = domains.point_sectors(present['place'])
+            # Points outside every raion polygon stay with the owner
+            abroad = (domain != NO_SECTOR) & (domain != own)
+
+            local = select(present, ~abroad)
+            # Place ids are per process, hosts resolve guests' points by coordinates
+            visitors = {
+                int(host): select(present, abroad & (domain == host), drop=('place',))
+                for host in np.unique(domain[abroad])
+            }
+            connection.send(visitors)
+
+        elif command == 'spread':
+            for guests in payload:
+                guests['place'] = population.points.ids(guests['x'], guests['y'])
+            present = Population.join_present([local, *payload])
+            targets, primary = population.spread(present)
+
+            owners = present['owner'][targets]
+            indexes = present['index'][targets]
+            mine = owners == own
+            local_infections = (indexes[mine], primary[mine])
+            connection.send({
+                int(owner): (indexes[owners == owner], primary[owners == owner])
+                for owner in np.unique(owners[~mine])
+            })
+
+        elif command == 'finish':
+            parts = [local_infections, *payload]
+            population.finish(np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts]))
+            model.complete_step()
+            connection.send(counters_snapshot(model))
+
+        elif command == 'stop':
+            connection.close()
+            return
+
+        else:
+            raise Exception(f'[DistributedRunner] Unknown command: {command}')
+
+
+class DistributedRunner:
+    """
+    Runs one `TuberculosisSpread` with the humans of every raion stepped in their own worker process.
+
+    Agents are assigned to the process of their home raion. Every step runs in lockstep in three phases:
+        advance: workers update their agents and send agents standing in another raion
+                 (global scope places) to the process of that raion
+        spread:  every worker computes infections of agents standing in its raion, guests included,
+                 and sends infections of guests back to their owners
+        finish:  workers apply infections, step sectors and newborns, and report their counters
+    Per-raion counters are merged into `counters` and one row of `data` per step.
+
+    Requires the vectorized engine with grid or co-location contacts. Random draws are keyed by agent,
+    so results match a single-process run, except for contacts across raion borders with grid contacts
+    and for newborns, which are scheduled per raion.
+    """
+
+    def __init__(self, store: dict, arguments: dict):
+        arguments = {'engine': TuberculosisSpread.ENGINE_VECTORIZED, **arguments}
+        if arguments['engine'] != TuberculosisSpread.ENGINE_VECTORIZED:
+            raise Exception('[DistributedRunner] Invalid engine value. Expected: vectorized')
+        if arguments.get('contacts', TuberculosisSpread.CONTACTS_GEOSPACE) == TuberculosisSpread.CONTACTS_GEOSPACE \
+                and arguments.get('infection') != TuberculosisSpread.INFECTION_COLOCATION:
+            raise Exception('[DistributedRunner] Invalid contacts value. Expected: grid | infection: colocation')
+        if arguments.get('fast_forward'):
+            raise Exception('[DistributedRunner] Fast-forward is not supported. Expected: fast_forward: false')
+
+        self.store = store
+        self.arguments = arguments
+        self.raions = list(store.keys())
+        self.step_per_day = None
+        self.steps = 0
+        self.counters = {}
+        self.data = []
+
+        self.__connections = []
+        self.__processes = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        context = multiprocessing.get_context()
+        for raion in self.raions:
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=raion_worker,
+                args=(worker_connection, self.store, raion, self.arguments),
+                daemon=True,
+            )
+            process.start()
+            self.__connections.append(connection)
+            self.__processes.append(process)
+
+        snapshots = self.__receive()
+        self.step_per_day = snapshots[0]['step_per_day']
+        self.__merge(snapshots)
+        print(f'[DistributedRunner] {len(self.raions)} raion workers ready. Total agents: {self.counters["total"]}')
+
+    def stop(self):
+        for connection in self.__connections:
+            connection.send(('stop', None))
+        for process in self.__processes:
+            process.join()
+        self.__connections = []
+        self.__processes = []
+
+    def __send(self, command: str, payloads: list):
+        for connection, payload in zip(self.__connections, payloads):
+            connection.send((command, payload))
+
+    def __receive(self) -> list:
+        return [connection.recv() for connection in self.__connections]
+
+    def __merge(self, snapshots: list[dict]):
+        by_state = dict.fromkeys(HumanState.all(), 0)
+        by_raion = {}
+        for snapshot in snapshots:
+            for state, amount in snapshot['by_state'].items():
+                by_state[state] += amount
+            by_raion.update(snapshot['by_raion'])
+
+        self.counters = {'by_state': by_state, 'by_raion': by_raion, 'total': sum(by_state.values())}
+        self.data.append({str(state): amount for state, amount in by_state.items()})
+
+    def step(self, max_steps: int | None = None) -> int:
+        """
+        Advance all raions by one step, `max_steps` is accepted for `TuberculosisSpread.step` compatibility.
+        """
+        self.__send('advance', [None] * len(self.raions))
+        guests = [[] for _ in self.raions]
+        for visitors in self.__receive():
+            for host, payload in visitors.items():
+                guests[host].append(payload)
+
+        self.__send('spread', guests)
+        infections = [[] for _ in self.raions]
+        for hosted in self.__receive():
+            for owner, payload in hosted.items():
+                infections[owner].append(payload)
+
+        self.__send('finish', infections)
+        self.__merge(self.__receive())
+        self.steps += 1
+        return 1
+
+    def count(self, human_condition, invert=False):
+        if invert:
+            return self.counters['total'] - self.counters['by_state'][human_condition]
+        return self.counters['by_state'][human_condition]
+
+    def dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.data)
@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import pandas as pd
+
+from src.batch.distributed import DistributedRunner
+from src.batch.scenario import Scenario
+from src.config import Config
+from src.disease_spread.model import TuberculosisSpread
+from src.disease_spread.profiler import StepProfiler
+from src.disease_spread.snapshot import Snapshot, SnapshotLibrary
+from src.disease_spread.stream_collector import StreamCollector
+from src.openstreetmap.preloader import OSMPreloader
+from src.openstreetmap.tags import TagsConfig
+from src.utils.agent_places import AgentPlaces
+from src.utils.agent_routines import AgentRoutine
+from src.utils.human_state import HumanState
+
+# Per-process data, set once by `init_worker` so the store is not pickled for every run
+WORKER = {}
+
+
+def init_worker(store: dict):
+    WORKER['store'] = store
+    WORKER['tags'] = TagsConfig(Config.TAGS_PATH)
+    WORKER['routine_creator'] = AgentRoutine(config_path=Config.ROUTINES_PATH, store=store)
+
+
+def run_worker(run: dict) -> dict:
+    started = time.perf_counter()
+
+    # A checkpoint of this run, else the scenario snapshot, else new humans
+    snapshot, progress = None, {}
+    if run['resume'] and run['checkpoint'] and os.path.exists(run['checkpoint']):
+        snapshot = Snapshot.load(run['checkpoint'])
+        progress = snapshot.meta['extra']
+        print(f'[BatchRunner] Run {run["run_id"]}: resuming from step {progress["run_step"]}')
+    elif run['snapshot']:
+        snapshot = SnapshotLibrary().load(run['snapshot'])
+
+    collector = None
+    if run['series']:
+        collector = StreamCollector(run['series'], append=bool(progress), **run['series_arguments'])
+    profiler = StepProfiler(**run['profile_arguments']) if run['profile'] else None
+
+    model = TuberculosisSpread(
+        store=WORKER['store'],
+        tags=WORKER['tags'],
+        routine_creator=WORKER['routine_creator'],
+        disease_parameters=run['disease_parameters'],
+        seed=run['seed'],
+        snapshot=snapshot,
+        collector=collector,
+        profiler=profiler,
+        **run['model'],
+    )
+    init_time = time.perf_counter() - started
+
+    result = simulate(run, model, model.counters, init_time, progress)
+    if collector is not None:
+        collector.close()
+    if profiler is not None:
+        print(f'[BatchRunner] Run {run["run_id"]}: profile saved to {profiler.save(run["profile"])}')
+    return result
+
+
+def run_distributed(run: dict, store: dict) -> dict:
+    """
+    Run with every raion of `store` in its own process, see `DistributedRunner`.
+    """
+    started = time.perf_counter()
+    arguments = {**run['model'], 'disease_parameters': run['disease_parameters'], 'seed': run['seed']}
+    with DistributedRunner(store, arguments) as runner:
+        init_time = time.perf_counter() - started
+        return simulate(run, runner, runner, init_time)
+
+
+def simulate(run: dict, model, counters, init_time: float, progress: dict | None = None) -> dict:
+    """
+    Step `model` for the run length and summarize the run.
+    `counters` is anything with `count(condition)`: the model counters or a `DistributedRunner`.
+    :param progress: `run_step` and `peak_infected` of the checkpoint the run resumes from
+    """
+    steps = run['steps'] if run['steps'] is not None else int(run['years'] * 365 * model.step_per_day)
+    report_every = max(1, steps // 10)
+    progress = progress or {}
+    first_step = progress.get('run_step', 0) + 1
+    peak_infected = progress.get('peak_infected', 0)
+
+    started = time.perf_counter()
+    step = first_step - 1
+    while step < steps:
+        # Fast-forward models advance several steps at once
+        previous_step = step
+        step += model.step(steps - step)
+        infected = counters.count(HumanState.PrimaryTuberculosis) + \
+            counters.count(HumanState.PostPrimaryTuberculosis)
+        peak_infected = max(peak_infected, infected)
+
+        if step // report_every > previous_step // report_every:
+            elapsed = time.perf_counter() - started
+            print(f'[BatchRunner] Run {run["run_id"]}: {step}/{steps} steps, '
+                  f'{(step - first_step + 1) / elapsed:.1f} steps/sec')
+        checkpoint_every = run.get('checkpoint_every')
+        if checkpoint_every and step // checkpoint_every > previous_step // checkpoint_every and step < steps:
+            model.save_snapshot(run['checkpoint'], run_step=step, peak_infected=peak_infected)
+    run_time = time.perf_counter() - started
+    steps_run = steps - first_step + 1
+
+    return {
+        'run_id': run['run_id'],
+        'seed': run['seed'],
+        **run['swept'],
+        'steps': steps,
+        'init_time': init_time,
+        'run_time': run_time,
+        'steps_per_sec': steps_run / run_time if run_time else float('inf'),
+        'peak_infected': peak_infected,
+        **{str(state): counters.count(state) for state in HumanState.all()},
+    }
+
+
+class BatchRunner:
+    """
+    Runs `TuberculosisSpread` without the UI for every run of a `Scenario`, spread across a process pool.
+    """
+
+    def __init__(self, scenario: Scenario, store: dict | None = None):
+        self.scenario = scenario
+        self.store = store
+
+    def __preload(self):
+        Config.configure_osmnx()
+        tags = TagsConfig(Config.TAGS_PATH)
+        places = AgentPlaces.new(Config.ROUTINES_PATH)
+        return OSMPreloader(tags, places, extract=self.scenario.extract).preload(self.scenario.locations)
+
+    def run(self, processes: int | None = None) -> pd.DataFrame:
+        store = self.store if self.store is not None else self.__preload()
+        runs = self.scenario.runs()
+        processes = min(processes or self.scenario.processes or multiprocessing.cpu_count(), len(runs))
+
+        print(f'[BatchRunner] {len(runs)} runs on {processes} processes')
+        started = time.perf_counter()
+        rows = []
+
+        if self.scenario.distributed:
+            if self.scenario.snapshot or self.scenario.checkpoint_every:
+                raise Exception('[BatchRunner] Snapshots are not supported in distributed mode. Expected: distributed: false')
+            if self.scenario.series:
+                raise Exception('[BatchRunner] Series are not supported in distributed mode. Expected: distributed: false')
+            if self.scenario.profile is not None:
+                raise Exception('[BatchRunner] Profiles are not supported in distributed mode. Expected: distributed: false')
+            # Raions already use a process each, runs go one after another
+            print(f'[BatchRunner] Distributed mode: {len(store)} raion processes per run')
+            for run in runs:
+                row = run_distributed(run, store)
+                rows.append(row)
+                self.__report(row, len(rows), len(runs), started)
+        elif processes <= 1:
+            init_worker(store)
+            results = map(run_worker, runs)
+            for row in results:
+                rows.append(row)
+                self.__report(row, len(rows), len(runs), started)
+        else:
+            with Pool(processes, initializer=init_worker, initargs=(store,)) as pool:
+                for row in pool.imap_unordered(run_worker, runs):
+                    rows.append(row)
+                    self.__report(row, len(rows), len(runs), started)
+
+        return pd.DataFrame(rows).sort_values('run_id').reset_index(drop=True)
+
+    @staticmethod
+    def __report(row: dict, done: int, total: int, started: float):
+        elapsed = time.perf_counter() - started
+        print(f'[BatchRunner] {done}/{total} runs done ({elapsed:.1f}s). '
+              f'Run {row["run_id"]}: {row["steps_per_sec"]:.1f} steps/sec')
+
+    def save(self, results: pd.DataFrame) -> str:
+        os.makedirs(self.scenario.output, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        file_path = os.path.join(self.scenario.output, f'{self.scenario.name}_{timestamp}.csv')
+        results.to_csv(file_path, index=False)
+        return file_path
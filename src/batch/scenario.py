@@ -0,0 +1,114 @@
+import itertools
+import os
+
+from src.disease_spread.parameters import DiseaseParameters
+from src.utils.yaml_reader import YamlReader
+
+
+class Scenario:
+    """
+    Batch run description loaded from a scenario file. See `scenarios/example.yaml`.
+    """
+
+    # Keys of `sweep` that are passed to `TuberculosisSpread`, the rest are `DiseaseParameters`
+    MODEL_ARGUMENTS = [
+        'exposure_distance',
+        'infected_percentage',
+        'engine',
+        'contacts',
+        'infection',
+        'scheduler',
+        'debug_counters',
+        'sector_tolerance',
+        'fast_forward',
+        'history',
+    ]
+
+    def __init__(self, config: dict):
+        self.name = config.get('name', 'scenario')
+        self.locations = [tuple(location) if isinstance(location, list) else location
+                          for location in config['locations']]
+        # Local `.osm` or `.osm.pbf` file places are read from instead of Nominatim and Overpass
+        self.extract = config.get('extract')
+
+        self.steps = config.get('steps')
+        self.years = config.get('years')
+        if (self.steps is None) == (self.years is None):
+            raise Exception('[Scenario] Expected exactly one of: steps | years')
+
+        self.seeds = config.get('seeds') or [None]
+        self.processes = config.get('processes', 1)
+        # Step every raion of a run in its own process instead of running several runs at once
+        self.distributed = config.get('distributed', False)
+        self.output = config.get('output', 'results')
+        # Snapshot name in `snapshots/` or path every run starts from instead of placing new humans
+        self.snapshot = config.get('snapshot')
+        # Save a checkpoint of every run each N steps, runs resume from it with `resume`
+        self.checkpoint_every = config.get('checkpoint_every')
+        self.resume = False
+        # `StreamCollector` arguments, series of every run are streamed to `<output>/series/<name>_run<id>`
+        self.series = config.get('series')
+        # `StepProfiler` arguments, profiles of every run are saved to `<output>/profiles/<name>_run<id>.json`
+        self.profile = config.get('profile')
+
+        self.model = config.get('model') or {}
+        self.disease_parameters = config.get('disease_parameters') or {}
+        self.sweep = config.get('sweep') or {}
+
+        for key in self.model:
+            if key not in Scenario.MODEL_ARGUMENTS:
+                raise Exception(f'[Scenario] Unknown model argument: {key}')
+        DiseaseParameters.check([
+            *self.disease_parameters, *[key for key in self.sweep if key not in Scenario.MODEL_ARGUMENTS]
+        ])
+
+    @staticmethod
+    def load(file_path: str):
+        return Scenario(YamlReader(file_path).read(with_root='scenario'))
+
+    def checkpoint_path(self, run_id: int) -> str:
+        return os.path.join(self.output, 'checkpoints', f'{self.name}_run{run_id}.npz')
+
+    def profile_path(self, run_id: int) -> str:
+        return os.path.join(self.output, 'profiles', f'{self.name}_run{run_id}.json')
+
+    def series_directory(self, run_id: int) -> str:
+        return os.path.join(self.output, 'series', f'{self.name}_run{run_id}')
+
+    def runs(self) -> list[dict]:
+        """
+        Every combination of swept values with every seed.
+        """
+        keys = list(self.sweep.keys())
+        combinations = itertools.product(*[self.sweep[key] for key in keys]) if keys else [()]
+
+        runs = []
+        for values in combinations:
+            swept = dict(zip(keys, values))
+            for seed in self.seeds:
+                model = dict(self.model)
+                disease_parameters = dict(self.disease_parameters)
+                for key, value in swept.items():
+                    if key in Scenario.MODEL_ARGUMENTS:
+                        model[key] = value
+                    else:
+                        disease_parameters[key] = value
+
+                runs.append({
+                    'run_id': len(runs),
+                    'seed': seed,
+                    'swept': swept,
+                    'model': model,
+                    'disease_parameters': disease_parameters,
+                    'steps': self.steps,
+                    'years': self.years,
+                    'snapshot': self.snapshot,
+                    'checkpoint_every': self.checkpoint_every,
+                    'checkpoint': self.checkpoint_path(len(runs)) if self.checkpoint_every else None,
+                    'resume': self.resume,
+                    'series': self.series_directory(len(runs)) if self.series else None,
+                    'series_arguments': self.series or {},
+                    'profile': self.profile_path(len(runs)) if self.profile is not None else None,
+                    'profile_arguments': self.profile or {},
+                })
+        return runs
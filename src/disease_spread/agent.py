@@ -1,5 +1,3 @@
-import random
-
 import mesa
 import mesa_geo as mg
 import numpy as np
@@ -7,8 +5,8 @@ import shapely
 
 from src.disease_spread.sector_agent import SectorAgent
 from src.utils.agent_routines import Routine
-from src.utils.computation import get_rand_in_range
-from src.utils.human_age import HumanAgeGroup
+from src.utils.computation import choose_weighted, get_rand_in_range
+from src.utils.human_age import HumanAge, HumanAgeGroup
 from src.utils.human_state import HumanState
 
 
@@ -20,19 +18,46 @@ class Human(mg.GeoAgent):
     HEALTHY_OPTIONS = [HumanState.Sustainable, HumanState.Latent, HumanState.PrimaryTuberculosis]
     PATIENT_OPTIONS = [HumanState.Recovered, HumanState.Death]
 
+    # Geometry, id and model live in the `GeoAgent` instance dict, own state is kept in slots
+    __slots__ = (
+        'raion',
+        'counted',
+        '__condition',
+        '__human_age_group',
+        'parameters',
+        'routines',
+        'steps_lived',
+        'steps_infected',
+        'random_day_in_life',
+        'flag_reinfection',
+        'flag_latent_recovery',
+        'flag_latent_infection',
+        'reinfection_step',
+        'latent_recovery_step',
+        'latent_infection_step',
+        'countagious_rate',
+        'max_countagious_rate',
+        'population_index',
+        'position_slot',
+        'contact_slot',
+        'clock_step',
+    )
+
     def __init__(self,
                  unique_id,
                  model: mesa.Model,
                  geometry: 'shapely.Geometry',
                  crs,
-                 exposure_distance: int,
-                 routines: Routine
+                 routines: Routine,
+                 raion: str = None,
+                 rng: np.random.Generator = None,
                  ):
         """
         Create a new human.
         Args:
             pos: The human's location on the grid.
             model: Reference to the model the agent belongs to.
+            rng: Generator of the initial state, the model agents stream if not given
         Conditions:
             Sustainable (Healthy)
             Latent
@@ -42,40 +67,24 @@ class Human(mg.GeoAgent):
             Death
         """
         super().__init__(unique_id, model, geometry, crs)
-        self.exposure_distance = exposure_distance
-        self.condition = HumanState.Sustainable
-
-        # TODO: constant values should be moved to the config
-        self.step_per_day = self.model.step_per_day
-        self.year_in_steps = 365 * self.step_per_day
-        self.lifespan_steps = 96 * self.year_in_steps
-
-        self.healthy_contagious_rate = 0.017
+        self.raion = raion
 
-        self.latent_chance = 0.9
-        self.primary_chance = 0.1
-        self.latent_recovery_chance = 0.1
-        self.tuberculosis_recovery_chance = 0.896
-        self.mortality_chance = 0.104
-        self.post_primary_latent_chance = (0.05, 0.15)
-        self.repeated_infection_chance = 0.14
+        # Set by `StateCounters.add`, changes are reported to the model counters only after that
+        self.counted = False
+        self.__condition = HumanState.Sustainable
+        self.__human_age_group = None
 
-        self.latent_recovery_day_range = (42, 56)
+        # Disease constants are the same for every agent, so they are shared through the model
+        self.parameters = self.model.parameters
 
-        self.incubation_period_days = 60
-        self.IR_constant = 0.0024
-        self.constant_a = 90
-        self.constant_b = 50
-        self.time_spend_with_in_minutes = 1 * 60  # 1-hour step in minutes
-
-
-        self.steps_lived = HumanAgeGroup.set_random_init_age() * self.year_in_steps # For 24h simulation clock
-        # self.steps_lived = HumanAgeGroup.set_random_init_age() * self.year_in_steps + random.randint(0, self.year_in_steps) # For 24h agent clock (more rng)
-        self.human_age_group = HumanAgeGroup.set_age_group(self.steps_lived / self.year_in_steps)
+        rng = self.model.rng if rng is None else rng
+        self.steps_lived = HumanAgeGroup.set_random_init_age(rng) * self.parameters.year_in_steps # For 24h simulation clock
+        # self.steps_lived = HumanAgeGroup.set_random_init_age(rng) * self.parameters.year_in_steps + get_rand_in_range(0, self.parameters.year_in_steps, rng) # For 24h agent clock (more rng)
+        self.human_age_group = HumanAgeGroup.set_age_group(self.steps_lived / self.parameters.year_in_steps)
         self.routines = routines
         self.steps_infected = 0
 
-        self.random_day_in_life = random.randint(0, int(self.lifespan_steps / self.year_in_steps))
+        self.random_day_in_life = get_rand_in_range(0, int(self.parameters.lifespan_steps / self.parameters.year_in_steps), rng)
 
         self.flag_reinfection = False
         self.flag_latent_recovery = False
@@ -88,17 +97,51 @@ class Human(mg.GeoAgent):
         self.countagious_rate = 0
         self.max_countagious_rate = 0
 
+        # Index in the `Population` arrays, set only when the vectorized engine is used
+        self.population_index = None
+        # Slot in the model `PositionStore`
+        self.position_slot = None
+        # Slot in the `ContactIndex`, set only when the grid contact index is used
+        self.contact_slot = None
+        # Last model step the agent is up to date with, set only by the `EventScheduler`
+        self.clock_step = None
+
+    @property
+    def condition(self) -> HumanState:
+        return self.__condition
+
+    @condition.setter
+    def condition(self, new_condition: HumanState):
+        if self.counted:
+            self.model.counters.change_condition(self, self.__condition, new_condition)
+        if self.position_slot is not None:
+            self.model.positions.set_condition(self.position_slot, new_condition)
+        self.__condition = new_condition
+
+    @property
+    def human_age_group(self) -> HumanAge:
+        return self.__human_age_group
+
+    @human_age_group.setter
+    def human_age_group(self, new_age_group: HumanAge):
+        if self.counted:
+            self.model.counters.change_age_group(self, self.__human_age_group, new_age_group)
+        self.__human_age_group = new_age_group
+
     def __move(self, new_location: shapely.Point):
-        self.geometry = new_location
+        # `geometry` is synced from the store only when it is needed
+        self.model.positions.move(self.position_slot, new_location)
 
     def __location_routine(self):
-        week_day = self.steps_lived % (7 * self.step_per_day)  # 168 hours in a week
-        hour = self.steps_lived % (1 * self.step_per_day)  # 0-23. So can be used as a reference for hours
+        week_day = self.steps_lived % (7 * self.parameters.step_per_day)  # 168 hours in a week
+        hour = self.steps_lived % (1 * self.parameters.step_per_day)  # 0-23. So can be used as a reference for hours
 
-        self.routines.update(
+        reset = self.routines.update(
             age_group=self.human_age_group,
-            day_type='weekday' if week_day < 5 * self.step_per_day else 'weekend',
+            day_type='weekday' if week_day < 5 * self.parameters.step_per_day else 'weekend',
         )
+        if reset and self.model.profiler is not None:
+            self.model.profiler.count('routine_resets')
 
         current_routine = self.routines.current_place(hour)
 
@@ -114,37 +157,38 @@ class Human(mg.GeoAgent):
         """
         Assigns the latent flag to the human.
         """
-        inf_chance = random.uniform(*self.post_primary_latent_chance)
+        rng = self.model.rng
+        inf_chance = rng.uniform(*self.parameters.post_primary_latent_chance)
 
-        might_be_infected = 1 - self.latent_recovery_chance
+        might_be_infected = 1 - self.parameters.latent_recovery_chance
         will_be_infected = might_be_infected * inf_chance
 
-        self.flag_latent_recovery: bool = self.latent_recovery_chance > random.random()
-        self.flag_latent_infection: bool = will_be_infected > random.random()
+        self.flag_latent_recovery = self.parameters.latent_recovery_chance > rng.random()
+        self.flag_latent_infection = will_be_infected > rng.random()
 
         if self.flag_latent_recovery:
-            self.latent_recovery_step = get_rand_in_range(*self.latent_recovery_day_range) * self.step_per_day
+            self.latent_recovery_step = get_rand_in_range(*self.parameters.latent_recovery_day_range, rng) * self.parameters.step_per_day
         if self.flag_latent_infection:
-            self.latent_infection_step = get_rand_in_range(self.steps_lived, self.lifespan_steps)
+            self.latent_infection_step = get_rand_in_range(self.steps_lived, self.parameters.lifespan_steps, rng)
 
     def __set_reinfection_flags(self):
-        self.flag_reinfection: bool = random.random() < self.repeated_infection_chance
+        self.flag_reinfection = self.model.rng.random() < self.parameters.repeated_infection_chance
         if self.flag_reinfection:
-            self.reinfection_step = get_rand_in_range(self.steps_lived, self.lifespan_steps)
+            self.reinfection_step = get_rand_in_range(self.steps_lived, self.parameters.lifespan_steps, self.model.rng)
 
     def __set_contagious_rate(self,):
         """
         Calculate the contagious rate of the human for the day.
         :return:
         """
-        if self.model.schedule.steps % self.step_per_day == 0:
-            if self.steps_infected <= self.incubation_period_days:
-                value = 1 - ((self.incubation_period_days - self.random_day_in_life) / self.constant_a)
+        if self.model.schedule.steps % self.parameters.step_per_day == 0:
+            if self.steps_infected <= self.parameters.incubation_period_days:
+                value = 1 - ((self.parameters.incubation_period_days - self.random_day_in_life) / self.parameters.constant_a)
                 value = np.real(value) if np.isreal(value) and value >= 0 else 0
                 sqrt_value = np.sqrt(value)
                 self.countagious_rate = max(0, sqrt_value)
             else:
-                value = np.abs((self.random_day_in_life - self.incubation_period_days) / self.constant_b)
+                value = np.abs((self.random_day_in_life - self.parameters.incubation_period_days) / self.parameters.constant_b)
                 value = np.power(value, 3)
                 self.countagious_rate = np.exp(-value)
 
@@ -155,13 +199,12 @@ class Human(mg.GeoAgent):
         for neighbor in neighbors:
             if isinstance(neighbor, SectorAgent):
                 continue
-            if neighbor.condition == HumanState.PrimaryTuberculosis and \
-               neighbor.condition == HumanState.PostPrimaryTuberculosis:
+            if neighbor.condition in [HumanState.PrimaryTuberculosis, HumanState.PostPrimaryTuberculosis]:
                 total_infected_near += 1
                 total_contagious_near += neighbor.countagious_rate
             total_near += 1
 
-        p_inf = self.time_spend_with_in_minutes * (self.IR_constant / 360) * (
+        p_inf = self.parameters.time_spend_with_in_minutes * (self.parameters.IR_constant / 360) * (
                     total_infected_near / total_near) * total_contagious_near
 
         return p_inf
@@ -172,8 +215,10 @@ class Human(mg.GeoAgent):
         :return: Returns the state of the human after contact with infected agent.
         """
 
-        contagious_latent = patient_contagious_rate * self.latent_chance
-        contagious_primary = patient_contagious_rate * self.primary_chance
+        self.catch_up()
+
+        contagious_latent = patient_contagious_rate * self.parameters.latent_chance
+        contagious_primary = patient_contagious_rate * self.parameters.primary_chance
 
         weights = [
             1 - contagious_latent - contagious_primary,
@@ -181,11 +226,14 @@ class Human(mg.GeoAgent):
             contagious_primary,
         ]
 
-        self.condition = random.choices(Human.HEALTHY_OPTIONS, weights=weights).pop()
+        self.condition = choose_weighted(Human.HEALTHY_OPTIONS, weights, self.model.rng)
 
         if self.condition == HumanState.Latent:
             self.__set_latent_flags()
 
+        if self.clock_step is not None and self.condition != HumanState.Sustainable:
+            self.model.schedule.reschedule(self)
+
 
     def __set_recovery_state(self):
         """
@@ -194,10 +242,10 @@ class Human(mg.GeoAgent):
         """
 
         weights = [
-            self.tuberculosis_recovery_chance,
-            self.mortality_chance,
+            self.parameters.tuberculosis_recovery_chance,
+            self.parameters.mortality_chance,
         ]
-        self.condition = random.choices(Human.PATIENT_OPTIONS, weights=weights).pop()
+        self.condition = choose_weighted(Human.PATIENT_OPTIONS, weights, self.model.rng)
         # If the patient recovers, check if he will be reinfected
         if self.condition == HumanState.Recovered:
             self.steps_infected = 0
@@ -210,8 +258,8 @@ class Human(mg.GeoAgent):
         self.steps_lived += 1
 
     def __update_age_group(self):
-        if self.steps_lived % self.year_in_steps == 0:
-            agent_age = self.steps_lived / self.year_in_steps
+        if self.steps_lived % self.parameters.year_in_steps == 0:
+            agent_age = self.steps_lived / self.parameters.year_in_steps
             self.human_age_group = HumanAgeGroup.set_age_group(agent_age)
 
     def __handle_natural_death(self):
@@ -221,13 +269,12 @@ class Human(mg.GeoAgent):
     def __handle_infected_state(self):
         self.__update_infected_steps_count()
         self.__set_contagious_rate()
-        neighbors_gen = self.model.space.get_neighbors_within_distance(self, self.exposure_distance, center=True)
-        neighbors = [neighbor for neighbor in neighbors_gen if not isinstance(neighbor, SectorAgent)]
+        neighbors = self.model.get_contacts(self)
 
         # If the countagious rate is lower than healthy contagious rate, the patient recovers
         self.max_countagious_rate = max(self.max_countagious_rate, self.countagious_rate)
 
-        if self.max_countagious_rate > self.countagious_rate and self.countagious_rate < self.healthy_contagious_rate:
+        if self.max_countagious_rate > self.countagious_rate and self.countagious_rate < self.parameters.healthy_contagious_rate:
             self.__set_recovery_state()
             return
 
@@ -237,12 +284,17 @@ class Human(mg.GeoAgent):
         p_inf = self.get_chance_of_infection(neighbors)
 
         # Influence over neighbors
+        draws = 0
         for neighbor in neighbors:
             if isinstance(neighbor, SectorAgent):
                 continue
 
             if neighbor.condition == HumanState.Sustainable:
                 neighbor.set_contagious_state(p_inf)
+                draws += 1
+
+        if self.model.profiler is not None:
+            self.model.profiler.count('infection_draws', draws)
 
     def __handle_latent_state(self):
         # Overcomes infection
@@ -274,9 +326,65 @@ class Human(mg.GeoAgent):
 
         if self.condition in [HumanState.PrimaryTuberculosis, HumanState.PostPrimaryTuberculosis]:
             self.__handle_infected_state()
-        elif self.steps_lived >= self.lifespan_steps:
+        elif self.steps_lived >= self.parameters.lifespan_steps:
             self.__handle_natural_death()
         elif self.condition == HumanState.Latent:
             self.__handle_latent_state()
         elif self.condition == HumanState.Recovered:
             self.__handle_recovered_state()
+
+    def catch_up(self):
+        """
+        Add the steps skipped by the `EventScheduler` since the agent was stepped last time.
+        """
+        if self.clock_step is None:
+            return
+
+        skipped = self.model.schedule.steps - 1 - self.clock_step
+        if self.model.schedule.passed(self):
+            # Idle in the current step as well, which `BaseScheduler` has already run for it
+            skipped += 1
+        if skipped > 0:
+            self.steps_lived += skipped
+            self.clock_step += skipped
+
+    def wake(self):
+        """
+        Perform a step after being woken up by the `EventScheduler`.
+        """
+        self.catch_up()
+        self.step()
+        self.clock_step = self.model.schedule.steps
+
+    def next_wake_in(self) -> int:
+        """
+        Amount of steps until the next step that can change the agent:
+        routine transition, day type change, birthday, latent/reinfection timer or natural death.
+        """
+        if self.routines.redraws():
+            # `Routine.update` picks a routine on every step while the day has none
+            return 1
+
+        candidates = [
+            self.parameters.year_in_steps - self.steps_lived % self.parameters.year_in_steps,
+            self.parameters.lifespan_steps - self.steps_lived,
+        ]
+
+        if self.condition == HumanState.Latent:
+            if self.flag_latent_recovery:
+                candidates.append(self.latent_recovery_step - self.steps_lived)
+            if self.flag_latent_infection:
+                candidates.append(self.latent_infection_step - self.steps_lived)
+        elif self.condition == HumanState.Recovered and self.flag_reinfection:
+            candidates.append(self.reinfection_step - self.steps_lived)
+
+        week_day = self.steps_lived % (7 * self.parameters.step_per_day)
+        if week_day < 5 * self.parameters.step_per_day:
+            candidates.append(5 * self.parameters.step_per_day - week_day)
+        else:
+            candidates.append(7 * self.parameters.step_per_day - week_day)
+
+        for hour in self.routines.hours():
+            candidates.append((hour - self.steps_lived) % self.parameters.step_per_day or self.parameters.step_per_day)
+
+        return max(1, min(candidates))
@@ -0,0 +1,178 @@
+import math
+
+import numpy as np
+import shapely
+
+
+class ContactIndex:
+    """
+    Uniform grid over human positions with cells sized to the exposure distance.
+
+    The grid is rebuilt once per step from the agents' current positions,
+    so every radius query only has to look at the 3x3 block of cells around a point.
+    Unlike the GeoSpace R-tree it never contains `SectorAgent`s.
+
+    Queries see the positions of the last `build()`. The vectorized engine builds after it moved everybody.
+    The agent engine moves humans inside `Human.step`, so it builds before the step: its contacts use the
+    positions of the previous step, one hour behind the vectorized engine whenever somebody changes place.
+    """
+
+    # Offsets of the 3x3 block of cells around a query cell
+    NEIGHBOR_CELLS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+    def __init__(self, cell_size: float):
+        if cell_size <= 0:
+            raise Exception('Invalid cell size. Expected a positive number')
+
+        self.cell_size = cell_size
+        self.agents = []
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+
+        self.__order = np.empty(0, dtype=np.int64)
+        self.__cell_keys = np.empty(0, dtype=np.int64)
+        self.__cell_starts = np.empty(0, dtype=np.int64)
+        self.__cell_ends = np.empty(0, dtype=np.int64)
+        self.__origin = (0, 0)
+        self.__height = 1
+        # Cells of single agent queries since the last `build()`
+        self.__cell_members = {}
+
+    def __len__(self):
+        return len(self.agents)
+
+    def add(self, agent):
+        """
+        Register an agent. Positions are passed to `build()` or read from `agent.geometry`.
+        """
+        agent.contact_slot = len(self.agents)
+        self.agents.append(agent)
+
+    def __cells(self, x, y):
+        return np.floor(x / self.cell_size).astype(np.int64), np.floor(y / self.cell_size).astype(np.int64)
+
+    def __keys(self, ix, iy):
+        return (ix - self.__origin[0]) * self.__height + (iy - self.__origin[1])
+
+    def build(self, x: np.ndarray = None, y: np.ndarray = None):
+        """
+        Rebuild the grid. If coordinates are not given they are read from the agents' geometries.
+        """
+        if x is None or y is None:
+            coordinates = shapely.get_coordinates([agent.geometry for agent in self.agents])
+            x, y = coordinates[:, 0], coordinates[:, 1]
+
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.__cell_members = {}
+
+        if len(self.x) == 0:
+            self.__order = np.empty(0, dtype=np.int64)
+            self.__cell_keys = np.empty(0, dtype=np.int64)
+            return
+
+        ix, iy = self.__cells(self.x, self.y)
+        # Keep a one cell margin, so keys of the neighbor cells never collide
+        self.__origin = (ix.min() - 1, iy.min() - 1)
+        self.__height = int(iy.max() - self.__origin[1] + 2)
+
+        keys = self.__keys(ix, iy)
+        self.__order = np.argsort(keys, kind='stable')
+        self.__cell_keys, self.__cell_starts, counts = np.unique(
+            keys[self.__order], return_index=True, return_counts=True
+        )
+        self.__cell_ends = self.__cell_starts + counts
+
+    def query(self, indexes: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Batched radius query.
+        :param indexes: Indexes of the agents to query around.
+        :param radius:  Contact radius, must not exceed the cell size.
+        :return: Pairs (query position in `indexes`, neighbor index), self included.
+        """
+        if radius > self.cell_size:
+            raise Exception('Invalid radius. Expected a value not greater than the cell size')
+
+        indexes = np.asarray(indexes, dtype=np.int64)
+        if len(indexes) == 0 or len(self.__cell_keys) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        qx, qy = self.x[indexes], self.y[indexes]
+        ix, iy = self.__cells(qx, qy)
+
+        sources = []
+        candidates = []
+        for dx, dy in ContactIndex.NEIGHBOR_CELLS:
+            keys = self.__keys(ix + dx, iy + dy)
+            positions = np.searchsorted(self.__cell_keys, keys)
+            positions = np.minimum(positions, len(self.__cell_keys) - 1)
+            found = self.__cell_keys[positions] == keys
+
+            starts = self.__cell_starts[positions[found]]
+            counts = self.__cell_ends[positions[found]] - starts
+            if counts.sum() == 0:
+                continue
+
+            # Expand every (start, count) range into the candidate positions
+            query_positions = np.repeat(np.flatnonzero(found), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            sources.append(query_positions)
+            candidates.append(self.__order[np.repeat(starts, counts) + offsets])
+
+        if not sources:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        sources = np.concatenate(sources)
+        candidates = np.concatenate(candidates)
+
+        distance_x = self.x[candidates] - qx[sources]
+        distance_y = self.y[candidates] - qy[sources]
+        within = distance_x * distance_x + distance_y * distance_y <= radius * radius
+
+        sources, candidates = sources[within], candidates[within]
+        order = np.argsort(sources, kind='stable')
+        return sources[order], candidates[order]
+
+    def __cell_lookup(self, keys: list[int]) -> list[list[tuple[int, float, float]]]:
+        """
+        (agent index, x, y) of the agents in the cells with `keys`. Cells are looked up on the first request after
+        `build()` and kept for the next ones.
+        """
+        missing = [key for key in keys if key not in self.__cell_members]
+        if missing:
+            positions = np.minimum(np.searchsorted(self.__cell_keys, missing), len(self.__cell_keys) - 1)
+            found = (self.__cell_keys[positions] == missing).tolist()
+            for key, position, is_found in zip(missing, positions.tolist(), found):
+                members = []
+                if is_found:
+                    indexes = self.__order[self.__cell_starts[position]:self.__cell_ends[position]]
+                    members = list(zip(indexes.tolist(), self.x[indexes].tolist(), self.y[indexes].tolist()))
+                self.__cell_members[key] = members
+        return [self.__cell_members[key] for key in keys]
+
+    def neighbors(self, agent, radius: float) -> list:
+        """
+        Agents within `radius` of `agent`, the agent itself included. The same agents in the same order as `query`.
+        The agent engine asks once per infected human, so only cells not looked up since `build()` cost array
+        operations. Infected humans at the same places share them.
+        """
+        if radius > self.cell_size:
+            raise Exception('Invalid radius. Expected a value not greater than the cell size')
+        if len(self.__cell_keys) == 0:
+            return []
+
+        slot = agent.contact_slot
+        x, y = float(self.x[slot]), float(self.y[slot])
+        ix = math.floor(x / self.cell_size) - self.__origin[0]
+        iy = math.floor(y / self.cell_size) - self.__origin[1]
+        squared_radius = radius * radius
+
+        neighbors = []
+        keys = [(ix + dx) * self.__height + iy + dy for dx, dy in ContactIndex.NEIGHBOR_CELLS]
+        for members in self.__cell_lookup(keys):
+            for i, neighbor_x, neighbor_y in members:
+                distance_x = neighbor_x - x
+                distance_y = neighbor_y - y
+                if distance_x * distance_x + distance_y * distance_y <= squared_radius:
+                    neighbors.append(self.agents[i])
+        return neighbors
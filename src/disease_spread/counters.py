@@ -0,0 +1,67 @@
+from src.utils.human_age import HumanAge
+from src.utils.human_state import HumanState
+
+
+class StateCounters:
+    """
+    Live number of humans per state, per (age group, state) and per (raion, state).
+    Updated by `Human` whenever its condition or age group changes, so reading is O(1).
+    """
+
+    def __init__(self):
+        self.by_state = dict.fromkeys(HumanState.all(), 0)
+        self.by_age_group = {age_group: dict.fromkeys(HumanState.all(), 0) for age_group in HumanAge}
+        self.by_raion = {}
+        self.total = 0
+        # Condition changes so far, read by the `StepProfiler`
+        self.transitions = 0
+
+    def add(self, agent):
+        condition = agent.condition
+        self.by_state[condition] += 1
+        self.by_age_group[agent.human_age_group][condition] += 1
+        self.__raion(agent.raion)[condition] += 1
+        self.total += 1
+        agent.counted = True
+
+    def change_condition(self, agent, old_condition, new_condition):
+        if old_condition == new_condition:
+            return
+
+        self.transitions += 1
+        for counter in [self.by_state, self.by_age_group[agent.human_age_group], self.__raion(agent.raion)]:
+            counter[old_condition] -= 1
+            counter[new_condition] += 1
+
+    def change_age_group(self, agent, old_age_group, new_age_group):
+        if old_age_group == new_age_group:
+            return
+
+        self.by_age_group[old_age_group][agent.condition] -= 1
+        self.by_age_group[new_age_group][agent.condition] += 1
+
+    def __raion(self, raion):
+        if raion not in self.by_raion:
+            self.by_raion[raion] = dict.fromkeys(HumanState.all(), 0)
+        return self.by_raion[raion]
+
+    def count(self, human_condition, invert=False):
+        if invert:
+            return self.total - self.by_state[human_condition]
+        return self.by_state[human_condition]
+
+    def check(self, humans):
+        """
+        Cross-check the counters against a full scan of `humans`.
+        """
+        expected = StateCounters()
+        for agent in humans:
+            counted = agent.counted
+            expected.add(agent)
+            agent.counted = counted
+
+        for name in ['by_state', 'by_age_group', 'by_raion', 'total']:
+            actual_value = getattr(self, name)
+            expected_value = getattr(expected, name)
+            if actual_value != expected_value:
+                raise Exception(f'[StateCounters] Counters mismatch in {name}: {actual_value} != {expected_value}')
@@ -0,0 +1,155 @@
+import heapq
+import itertools
+
+import mesa
+
+from src.utils.human_state import HumanState
+
+
+class EventCalendar:
+    """
+    Priority queues of future events keyed by model step. Every kind of event has its own queue.
+    """
+
+    BIRTH = 'birth'
+    WAKE = 'wake'
+
+    def __init__(self):
+        self.__queues = {}
+        self.__sequence = itertools.count()  # Keeps insertion order for events on the same step
+
+    def push(self, step: int, kind: str, item=None):
+        queue = self.__queues.setdefault(kind, [])
+        heapq.heappush(queue, (step, next(self.__sequence), item))
+
+    def pop_due(self, step: int, kind: str) -> list:
+        """
+        Remove and return items of `kind` scheduled at or before `step`.
+        """
+        queue = self.__queues.get(kind)
+        due = []
+        while queue and queue[0][0] <= step:
+            due.append(heapq.heappop(queue)[2])
+        return due
+
+    def items(self, kind: str) -> list[tuple[int, object]]:
+        """
+        Pending (step, item) pairs of `kind` in the order they are due.
+        """
+        return [(step, item) for step, _, item in sorted(self.__queues.get(kind, []))]
+
+    def pending(self, kind: str) -> int:
+        return len(self.__queues.get(kind, []))
+
+    def next_step(self, kind: str) -> int | None:
+        queue = self.__queues.get(kind)
+        return queue[0][0] if queue else None
+
+
+class EventScheduler(mesa.time.BaseScheduler):
+    """
+    Scheduler that only steps agents with a due event or an active infection.
+
+    Humans register their next wake-up (routine transition, birthday, latent/reinfection timers,
+    natural death) in the calendar and catch up skipped steps when woken.
+    Agents without a `next_wake_in` method (sectors) are stepped every step.
+    """
+
+    INFECTED_STATES = [HumanState.PrimaryTuberculosis, HumanState.PostPrimaryTuberculosis]
+
+    def __init__(self, model: mesa.Model):
+        super().__init__(model)
+        self.calendar = EventCalendar()
+        self.__always_active = {}
+        self.__infected = {}
+        self.__order = {}  # Registration order, agents are stepped in it like in BaseScheduler
+        self.__stepping = None  # Order of the agent being stepped
+        self.__due = {}  # Agents of the current step
+        self.__queue = []  # (order, unique id) of the agents of the current step not stepped yet
+
+    def add(self, agent):
+        super().add(agent)
+        self.__order[agent.unique_id] = len(self.__order)
+
+        if not hasattr(agent, 'next_wake_in'):
+            self.__always_active[agent.unique_id] = agent
+            return
+
+        agent.clock_step = self.steps - 1
+        if agent.condition in EventScheduler.INFECTED_STATES:
+            self.__infected[agent.unique_id] = agent
+        else:
+            # First wake-up picks the routine for the current day
+            self.calendar.push(self.steps, EventCalendar.WAKE, agent)
+
+    def remove(self, agent):
+        super().remove(agent)
+        self.__always_active.pop(agent.unique_id, None)
+        self.__infected.pop(agent.unique_id, None)
+
+    def passed(self, agent) -> bool:
+        """
+        Whether `BaseScheduler` would have stepped `agent` already in the current step: it comes before the agent
+        being stepped in the activation order.
+        """
+        return self.__stepping is not None and self.__order[agent.unique_id] < self.__stepping
+
+    def reschedule(self, agent):
+        """
+        Register the next wake-up of `agent` after its state was changed.
+        """
+        queued = self.__queue_in_step(agent)
+        if agent.condition in EventScheduler.INFECTED_STATES:
+            self.__infected[agent.unique_id] = agent
+            return
+
+        self.__infected.pop(agent.unique_id, None)
+        if agent.condition == HumanState.Death or queued:
+            # A queued agent is rescheduled after its wake-up
+            return
+
+        self.calendar.push(self.steps + agent.next_wake_in(), EventCalendar.WAKE, agent)
+
+    def __queue_in_step(self, agent) -> bool:
+        """
+        Wake `agent` later in the current step if it comes after the agent being stepped. `BaseScheduler` still
+        steps it in this step, so a state changed by an agent stepped before it takes effect right away.
+        :return: Whether `agent` is stepped later in the current step
+        """
+        order = self.__order[agent.unique_id]
+        if self.__stepping is None or order <= self.__stepping:
+            return False
+        if agent.unique_id not in self.__due:
+            self.__due[agent.unique_id] = agent
+            heapq.heappush(self.__queue, (order, agent.unique_id))
+        return True
+
+    def step(self):
+        due = {agent.unique_id: agent for agent in self.calendar.pop_due(self.steps, EventCalendar.WAKE)}
+        due.update(self.__infected)
+        due.update(self.__always_active)
+
+        profiler = getattr(self.model, 'profiler', None)
+        if profiler is not None:
+            profiler.count('wakes', len(due) - len(self.__always_active))
+
+        self.__due = due
+        self.__queue = [(self.__order[unique_id], unique_id) for unique_id in due]
+        heapq.heapify(self.__queue)
+        while self.__queue:
+            self.__stepping, unique_id = heapq.heappop(self.__queue)
+            agent = due[unique_id]
+            if unique_id not in self._agents:
+                continue
+
+            if unique_id in self.__always_active:
+                agent.step()
+            elif agent.clock_step < self.steps:
+                # Stale calendar entries might wake an agent twice in a step
+                agent.wake()
+                self.reschedule(agent)
+        self.__stepping = None
+        self.__due = {}
+
+        self.steps += 1
+        self.time += 1
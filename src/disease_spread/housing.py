@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.openstreetmap.custompolygon import PolygonUtils
+from src.openstreetmap.mapping.housing import HOUSING_MAPPING
+
+
+class HousingIndex:
+    """
+    Homes of the simulated raions, built once from the store when the model is created and never changed.
+
+    Every home has its point, coordinates and capacity from `HOUSING_MAPPING`. Homes of all raions are in one
+    array, raion by raion. Each home is repeated once per resident in a slot table, so a home drawn with weight
+    equal to its capacity is one random slot: O(1) per newborn and one array draw for many.
+    The cumulative capacities give the slot range of every raion.
+    """
+
+    def __init__(self, store: dict, raions: list[str], tags, housing_key: str = 'home'):
+        self.raions = list(raions)
+
+        points, capacities, homes = [], [], []
+        for raion in self.raions:
+            housing_df = PolygonUtils.prepare_housing_df(store[raion]['places'][housing_key], tags[housing_key])
+            points.append(np.asarray(housing_df['representative_point'].values, dtype=object))
+            # In this case, we can omit try-except construction, because we expect error here ;D
+            capacities.append(np.array([HOUSING_MAPPING[home] for home in housing_df['home']], dtype=np.int64))
+            homes.append(len(housing_df))
+
+        self.points = np.concatenate(points) if points else np.empty(0, dtype=object)
+        self.x = np.array([point.x for point in self.points], dtype=np.float64)
+        self.y = np.array([point.y for point in self.points], dtype=np.float64)
+        self.capacities = np.concatenate(capacities) if capacities else np.empty(0, dtype=np.int64)
+
+        # Home ranges and slot ranges of every raion
+        self.__home_starts = np.concatenate([[0], np.cumsum(homes)]).astype(np.int64)
+        self.cumulative_capacities = np.cumsum(self.capacities)
+        self.__slot_starts = np.concatenate([[0], self.cumulative_capacities])[self.__home_starts]
+        self.__slots = np.repeat(np.arange(len(self.points), dtype=np.int64), self.capacities)
+
+        # Raions newborns can be placed in
+        self.__with_homes = np.flatnonzero(np.diff(self.__slot_starts) > 0)
+
+        for array in (self.points, self.x, self.y, self.capacities, self.cumulative_capacities,
+                      self.__home_starts, self.__slot_starts, self.__slots, self.__with_homes):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.points)
+
+    def homes(self, raion: str) -> slice:
+        """
+        Positions of the homes of `raion` in the index arrays.
+        """
+        number = self.raions.index(raion)
+        return slice(int(self.__home_starts[number]), int(self.__home_starts[number + 1]))
+
+    def draw(self, amount: int, rng: np.random.Generator) -> tuple[list[str], np.ndarray]:
+        """
+        Homes of `amount` newborns: a random raion each, then a home of the raion weighted by its capacity.
+        :return: Raion of every newborn and the positions of their homes in the index arrays
+        """
+        if not len(self.__with_homes):
+            raise Exception('[HousingIndex] No homes to place newborns in')
+
+        raions = self.__with_homes[rng.integers(len(self.__with_homes), size=amount)]
+        slots = rng.integers(self.__slot_starts[raions], self.__slot_starts[raions + 1])
+        return [self.raions[raion] for raion in raions.tolist()], self.__slots[slots]
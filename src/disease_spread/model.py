@@ -1,21 +1,37 @@
-import random
+import contextlib
+import time
 
 import mesa
 import mesa_geo as mg
 import geopandas as gpd
+import numpy as np
 import shapely
 from geopandas import GeoDataFrame
 
 from src.config import Config
 from src.disease_spread.agent import Human
+from src.disease_spread.contact_index import ContactIndex
+from src.disease_spread.counters import StateCounters
+from src.disease_spread.events import EventCalendar, EventScheduler
+from src.disease_spread.housing import HousingIndex
+from src.disease_spread.parameters import DiseaseParameters
+from src.disease_spread.population import Population
+from src.disease_spread.positions import PositionStore
+from src.disease_spread.profiler import StepProfiler
 from src.disease_spread.sector_agent import SectorAgent
-from src.openstreetmap.custompolygon import CustomPolygon, PolygonUtils
-from src.openstreetmap.mapping.housing import HOUSING_MAPPING
+from src.disease_spread.sector_map import SectorMap
+from src.disease_spread.snapshot import Snapshot
+from src.disease_spread.stream_collector import StreamCollector
+from src.openstreetmap.custompolygon import CustomPolygon
 from src.openstreetmap.tags import TagsConfig
 from src.utils.agent_routines import AgentRoutine, Routine
 from src.utils.human_age import HumanAgeGroup, HumanAge
 from src.utils.human_state import HumanState
-from src.utils.random_points import RandomPoint
+from src.utils.random_streams import RandomStreams
+
+
+# Shared no-op phase context, used when profiling is off
+NO_PHASE = contextlib.nullcontext()
 
 
 class TuberculosisSpread(mesa.Model):
@@ -23,81 +39,330 @@ class TuberculosisSpread(mesa.Model):
     A model for simulating the spread of tuberculosis.
     """
 
+    ENGINE_AGENT = 'agent'  # Reference engine: every `Human` steps itself
+    ENGINE_VECTORIZED = 'vectorized'  # `Population` steps all humans at once
+
+    CONTACTS_GEOSPACE = 'geospace'  # Neighbor query per infected agent through the GeoSpace R-tree
+    CONTACTS_GRID = 'grid'  # `ContactIndex` rebuilt once per step over human positions
+
+    INFECTION_NEIGHBORS = 'neighbors'  # Every infected agent rolls for each of its neighbors
+    INFECTION_COLOCATION = 'colocation'  # One force of infection per shared place point
+
+    SCHEDULER_BASE = 'base'  # Every agent is stepped every step
+    SCHEDULER_EVENT = 'event'  # Only agents with a due event or an active infection are stepped
+
     def __init__(
             self,
             store: dict[str, dict[str, gpd.GeoDataFrame | CustomPolygon]],
             tags: TagsConfig,
             exposure_distance,
             infected_percentage,
-            routine_creator: AgentRoutine
+            routine_creator: AgentRoutine,
+            engine: str = ENGINE_AGENT,
+            contacts: str = CONTACTS_GEOSPACE,
+            infection: str = INFECTION_NEIGHBORS,
+            debug_counters: bool = False,
+            scheduler: str = SCHEDULER_BASE,
+            disease_parameters: dict | None = None,
+            sector_tolerance: float = 0.0,
+            seed: int | None = None,
+            raions: list[str] | None = None,
+            snapshot: str | Snapshot | None = None,
+            fast_forward: bool = False,
+            collector: StreamCollector | None = None,
+            history: bool = True,
+            profiler: StepProfiler | None = None,
     ):
         """
         Create a new tuberculosis spread model.
         Args:
             width, height: The size of the grid to model
+            engine: Population engine. `agent` | `vectorized`
+            contacts: Contact lookup. `geospace` | `grid`
+            infection: Infection kernel. `neighbors` | `colocation` (vectorized engine only)
+            debug_counters: Cross-check state counters against a full scan after every step
+            scheduler: Agent activation. `base` | `event` (agent engine only)
+            disease_parameters: Overrides of the `DiseaseParameters` defaults
+            sector_tolerance: Simplification tolerance of sector polygons for the place-to-sector mapping
+            seed: Master seed of all random streams, fresh entropy if not given
+            raions: Raions of `store` to populate, all by default. Workers of `DistributedRunner` populate one
+            snapshot: Snapshot (or its path) to resume from instead of placing new humans (vectorized engine only).
+                      Its random streams are restored unless a different `seed` is given
+            fast_forward: Advance several steps at once when no agent can change besides aging and new infections
+                          (vectorized engine only). Infection chances are compounded over the skipped steps
+            collector: Streams model series to files in chunks, see `StreamCollector`
+            history: Keep every step in the in-memory `datacollector`, used by the UI charts.
+                     Long headless runs turn it off and use `collector`
+            profiler: Records time per step phase and hot-path counters, see `StepProfiler`
         """
         super().__init__()
         self.store = store
         self.tags = tags
+        self.raions = list(store.keys()) if raions is None else list(raions)
+        # Draws of a human are keyed by (raion number, number within the raion), the same in every process
+        self.__raion_numbers = {raion: number for number, raion in enumerate(store.keys())}
+        self.__raion_humans = dict.fromkeys(store.keys(), 0)
 
         # Preload data from files
         HumanAgeGroup.init(Config.POPULATION_PATH)
 
-        # self.schedule = mesa.time.RandomActivation(self)
-        self.schedule = mesa.time.BaseScheduler(self)
-        self.space = mg.GeoSpace('epsg:4326')
+        # Every subsystem draws from its own stream, derived from the master seed
+        self.streams = RandomStreams(seed)
+        self.rng = self.streams.stream('agents')
+
+        # Homes of the simulated raions, for placing humans and newborns
+        self.housing = HousingIndex(store, self.raions, tags)
 
         self.step_per_day = 24  # Simulation step set to 24 hours. Base value is 1 corresponding to a day
         self.birth_coefficient = 9.2
+        self.parameters = DiseaseParameters(self.step_per_day, disease_parameters)
+
+        # self.schedule = mesa.time.RandomActivation(self)
+        if scheduler == TuberculosisSpread.SCHEDULER_BASE:
+            self.schedule = mesa.time.BaseScheduler(self)
+            self.calendar = EventCalendar()
+        elif scheduler == TuberculosisSpread.SCHEDULER_EVENT:
+            if engine != TuberculosisSpread.ENGINE_AGENT:
+                raise Exception('Event scheduler requires the agent engine')
+            self.schedule = EventScheduler(self)
+            self.calendar = self.schedule.calendar
+        else:
+            raise Exception('Invalid scheduler value. Expected: base | event')
+        self.space = mg.GeoSpace('epsg:4326')
+        self.counters = StateCounters()
+        self.debug_counters = debug_counters
+        self.positions = PositionStore()
+        self.sector_map = SectorMap(self.positions.points, simplify_tolerance=sector_tolerance)
+        self.__sector_map_step = None
+
+        if infection not in [TuberculosisSpread.INFECTION_NEIGHBORS, TuberculosisSpread.INFECTION_COLOCATION]:
+            raise Exception('Invalid infection value. Expected: neighbors | colocation')
+        colocation = infection == TuberculosisSpread.INFECTION_COLOCATION
+
+        if engine == TuberculosisSpread.ENGINE_AGENT:
+            if colocation:
+                raise Exception('Co-location infection requires the vectorized engine')
+            self.population = None
+        elif engine == TuberculosisSpread.ENGINE_VECTORIZED:
+            self.population = Population(self, routine_creator.compile(), colocation=colocation)
+        else:
+            raise Exception('Invalid engine value. Expected: agent | vectorized')
+        self.engine = engine
+        self.infection = infection
+        self.contacts = contacts
+
+        if fast_forward and self.population is None:
+            raise Exception('Fast-forward requires the vectorized engine')
+        self.fast_forward = fast_forward
+
+        if contacts == TuberculosisSpread.CONTACTS_GEOSPACE:
+            self.contact_index = None
+        elif contacts == TuberculosisSpread.CONTACTS_GRID:
+            self.contact_index = ContactIndex(cell_size=exposure_distance)
+        else:
+            raise Exception('Invalid contacts value. Expected: geospace | grid')
 
         self.exposure_distance = exposure_distance
         self.routine_creator = routine_creator
 
         self.datacollector = mesa.DataCollector(self.__data_collector())
-        self.pending_newborns = []
+        self.history = history
+        self.collector = collector
+        self.profiler = profiler
+        self.__transitions = 0
 
         # Add sectors
 
+        if isinstance(snapshot, str):
+            snapshot = Snapshot.load(snapshot)
+
         # Add people to the model
         print('[TuberculosisSpread] Placing Human Agents...', end=' ')
-        self.__place_agents(infected_percentage)
-        print('Done!')
+        started = time.perf_counter()
+        if snapshot is None:
+            humans = self.__place_agents(infected_percentage)
+        else:
+            humans = self.__restore_agents(snapshot)
+        print(f'Done! {time.perf_counter() - started:.2f}s')
 
         # Add sectors to the model | Sectors are added after people to avoid intersection checks
         print('[TuberculosisSpread] Placing Sector Agents...', end=' ')
+        started = time.perf_counter()
+        sectors = []
+        for raion_name in self.raions:
+            sectors += self.__add_sector(store[raion_name]['polygon'].gdf, raion_name)
+        print(f'Done! {time.perf_counter() - started:.2f}s')
 
-        for raion_name, raion in store.items():
-            self.__add_sector(raion['polygon'].gdf, raion_name)
-
-        print('Done!')
+        print('[TuberculosisSpread] Indexing GeoSpace...', end=' ')
+        started = time.perf_counter()
+        self.__index_space(humans + sectors)
+        print(f'Done! {time.perf_counter() - started:.2f}s')
 
         self.running = True
-        self.datacollector.collect(self)
+        if snapshot is None:
+            self.__collect()
+        else:
+            self.__restore_state(snapshot, seed)
+            if self.collector is not None:
+                self.collector.baseline(self)
         print(f'Total agents: {len(self.space.agents)}')
         print('Model is ready')
 
-    def __place_agents(self, infected_percentage: float):
+    def __place_agents(self, infected_percentage: float) -> list[Human]:
+        """
+        Create all humans. They are added to the GeoSpace later in one batch by `__index_space`.
+        """
+        humans = []
         person_index = 0
         self.sector_factory = mg.AgentCreator(SectorAgent, model=self)
-        for raion_name, raion in self.store.items():
-            housing_df = PolygonUtils.prepare_housing_df(raion['places']['home'], self.tags['home'])
-
-            for row in housing_df.itertuples():
-                # In this case, we can omit try-except construction, because we expect error here ;D
-                amount_per_building = HOUSING_MAPPING[row.home]
-                home_point = row.representative_point
-                human_life_routine = self.routine_creator.generate(home_point, raion_name)
-
+        for raion_name in self.raions:
+            # Streams per raion, so a raion is populated the same way when it is placed alone
+            routines_rng = self.streams.stream(f'routines/{raion_name}')
+            infections_rng = self.streams.stream(f'initial_infections/{raion_name}')
+            homes = self.housing.homes(raion_name)
+
+            home_points = self.housing.points[homes]
+            # Places of all buildings of the raion are drawn at once
+            building_routines = self.routine_creator.generate_batch(home_points, raion_name, routines_rng)
+
+            for amount_per_building, home_point, human_life_routine in zip(
+                    self.housing.capacities[homes].tolist(), home_points, building_routines
+            ):
                 for i in range(amount_per_building):
-                    agent: Human = self.__add_human(f"H_{i}_{person_index}", home_point, human_life_routine)
+                    agent: Human = self.__add_human(
+                        f"H_{i}_{person_index}", home_point, human_life_routine, raion_name
+                    )
+                    humans.append(agent)
 
                     # Change to normal infected distribution
                     # TODO Change to distribution all_agents * 11/25000
-                    if random.uniform(a=0, b=100) < infected_percentage:
-                        agent.condition = HumanState.PrimaryTuberculosis
+                    if infections_rng.uniform(0, 100) < infected_percentage:
+                        self.__set_condition(agent, HumanState.PrimaryTuberculosis)
 
                     person_index += 1
 
+        return humans
+
+    def __index_space(self, agents: list):
+        """
+        Add agents to the GeoSpace at once and bulk load its R-tree.
+
+        Adding a list only registers the agents, the R-tree is then packed from all geometries in one pass
+        instead of growing with an insert per agent.
+        """
+        self.space.add_agents(agents)
+        if self.contact_index is None and agents:
+            # Neighbor queries go through the R-tree every step, so build it now rather than on the first query.
+            # Every public query builds a missing R-tree first, a point lookup is the cheapest of them
+            next(self.space.agents_at(agents[0].geometry), None)
+
+    def save_snapshot(self, path: str, **extra):
+        """
+        Save the full simulation state, see `Snapshot`. Streamed series are flushed, so they match the snapshot.
+        :param extra: JSON serializable values stored with the snapshot, e.g. the progress of a batch run
+        """
+        if self.population is None:
+            raise Exception('[TuberculosisSpread] Snapshots require the vectorized engine')
+        if self.collector is not None:
+            self.collector.flush()
+
+        store_raions = list(self.store.keys())
+        points = self.positions.points
+        points_x, points_y = points.coordinates(np.arange(len(points)))
+        agents = self.population.agents
+
+        arrays = {
+            'humans.unique_id': np.array([str(agent.unique_id) for agent in agents]),
+            'humans.raion': np.array([store_raions.index(agent.raion) for agent in agents], dtype=np.int16),
+            'humans.place': self.positions.place[:len(self.positions)].copy(),
+            'points.x': points_x,
+            'points.y': points_y,
+            'data': np.array(
+                [self.datacollector.model_vars[state] for state in HumanState.all()], dtype=np.int64
+            ).T,
+            **{f'population.{name}': values for name, values in self.population.state().items()},
+        }
+        meta = {
+            'version': Snapshot.VERSION,
+            'steps': self.schedule.steps,
+            'time': self.schedule.time,
+            'step_per_day': self.step_per_day,
+            'engine': self.engine,
+            'contacts': self.contacts,
+            'infection': self.infection,
+            'exposure_distance': self.exposure_distance,
+            'store_raions': store_raions,
+            'raions': self.raions,
+            'raion_humans': self.__raion_humans,
+            'parameters': self.parameters.as_dict(),
+            'streams': self.streams.state(),
+            'births': [step for step, _ in self.calendar.items(EventCalendar.BIRTH)],
+            'extra': extra,
+        }
+        Snapshot(meta, arrays).save(path)
+
+    def __restore_agents(self, snapshot: Snapshot) -> list[Human]:
+        """
+        Recreate humans saved in `snapshot`. They are added to the GeoSpace later in one batch by `__index_space`.
+        """
+        meta = snapshot.meta
+        if self.population is None:
+            raise Exception('[TuberculosisSpread] Snapshots require the vectorized engine')
+        if meta['store_raions'] != list(self.store.keys()) or meta['raions'] != self.raions:
+            raise Exception(f'[TuberculosisSpread] Snapshot raions mismatch. Expected: {meta["raions"]}')
+        if meta['step_per_day'] != self.step_per_day:
+            raise Exception(f'[TuberculosisSpread] Snapshot step mismatch. Expected: {meta["step_per_day"]} steps per day')
+
+        # Registered in the saved order, so place point ids stay the same
+        points = self.positions.points
+        points.ids(snapshot['points.x'], snapshot['points.y'])
+
+        population = snapshot.group('population')
+        store_raions = meta['store_raions']
+        self.sector_factory = mg.AgentCreator(SectorAgent, model=self)
+
+        humans = []
+        for i, (unique_id, raion_number, place) in enumerate(zip(
+                snapshot['humans.unique_id'].tolist(),
+                snapshot['humans.raion'].tolist(),
+                snapshot['humans.place'].tolist(),
+        )):
+            agent = Human(
+                unique_id=unique_id,
+                model=self,
+                geometry=points.point(place),
+                crs=self.space.crs,
+                routines=None,
+                raion=store_raions[raion_number],
+            )
+            agent.condition = Population.STATES[population['condition'][i]]
+            agent.human_age_group = HumanAge(population['age_group'][i])
+
+            self.counters.add(agent)
+            self.positions.add(agent)
+            if self.contact_index is not None:
+                self.contact_index.add(agent)
+            humans.append(agent)
+
+        self.population.restore(humans, population)
+        self.__raion_humans.update(meta['raion_humans'])
+        return humans
+
+    def __restore_state(self, snapshot: Snapshot, seed: int | None):
+        meta = snapshot.meta
+        self.schedule.steps = meta['steps']
+        self.schedule.time = meta['time']
+
+        if seed is None or seed == meta['streams']['seed']:
+            self.streams.set_state(meta['streams'])
+
+        for step in meta['births']:
+            self.calendar.push(step, EventCalendar.BIRTH)
+
+        data = snapshot['data']
+        for column, state in enumerate(HumanState.all()):
+            self.datacollector.model_vars[state] = data[:, column].tolist()
+
     def __data_collector(self):
         keys = HumanState.all()
         values = map(lambda key: (lambda m: self.count_type(m, key)), keys)
@@ -109,82 +374,252 @@ class TuberculosisSpread(mesa.Model):
 
         for agent in sector_agents:
             agent.unique_id = f"{group_prefix}_{agent.unique_id}"
-            self.space.add_agents(agent)
+            self.sector_map.add(agent)
             self.schedule.add(agent)
 
         return sector_agents
 
-    def __add_human(self, unique_id, point: shapely.Point, agent_routines: Routine):
+    def __add_human(self, unique_id, point: shapely.Point, agent_routines: Routine, raion: str, newborn=False):
+        """
+        Create a human and register it everywhere but in the GeoSpace, callers add humans to it.
+        """
         agent = Human(
             unique_id=unique_id,
             model=self,
             geometry=point,
             crs=self.space.crs,
-            exposure_distance=self.exposure_distance,
-            routines=agent_routines
+            routines=agent_routines,
+            raion=raion,
+            rng=self.streams.stream(f'agents/{raion}'),
         )
+        if newborn:
+            agent.steps_lived = 0
+            agent.human_age_group = HumanAge.Newborn
 
-        self.space.add_agents(agent)
-        self.schedule.add(agent)
+        self.counters.add(agent)
+        # Position slots, contact slots and population indexes are assigned in the same order and match
+        self.positions.add(agent)
+
+        if self.contact_index is not None:
+            self.contact_index.add(agent)
+        if self.population is None:
+            self.schedule.add(agent)
+        else:
+            stream_index = self.__raion_numbers[raion] << 32 | self.__raion_humans[raion]
+            self.population.add(agent, stream_index)
+        self.__raion_humans[raion] += 1
 
         return agent
 
-    def __add_newborn_agent(self, newborn_id: str, housing_key='home'):
+    def get_contacts(self, agent: Human) -> list[Human]:
         """
-        Add a new agents to the model.
-        Args:
+        Humans within the exposure distance of `agent`, the agent itself included.
+        The agent engine indexes positions before humans move in `Human.step`, so both contact lookups see
+        where humans were at the end of the previous step, see `ContactIndex`.
         """
-        raion = random.choice(list(self.store.keys()))
-        housing_df = PolygonUtils.prepare_housing_df(self.store[raion]['places'][housing_key], self.tags[housing_key])
+        with self.phase('neighbors'):
+            if self.contact_index is not None:
+                neighbors = self.contact_index.neighbors(agent, self.exposure_distance)
+            else:
+                neighbors_gen = self.space.get_neighbors_within_distance(agent, self.exposure_distance, center=True)
+                neighbors = [neighbor for neighbor in neighbors_gen if not isinstance(neighbor, SectorAgent)]
 
-        home_point = RandomPoint.single(housing_df)
-        agent_routine = self.routine_creator.generate(home_point, raion)
-        agent = self.__add_human(newborn_id, home_point, agent_routine)
-        agent.steps_lived = 0
-        agent.human_age_group = HumanAge.Newborn
+        if self.profiler is not None:
+            self.profiler.count('neighbor_queries')
+            self.profiler.count('neighbor_candidates', len(neighbors))
+        return neighbors
+
+    def __set_condition(self, agent: Human, condition: HumanState):
+        if self.population is None:
+            agent.condition = condition
+        else:
+            self.population.set_condition(agent, condition)
+
+        if isinstance(self.schedule, EventScheduler):
+            self.schedule.reschedule(agent)
+
+    def __add_newborn_agents(self, newborn_ids: list[str]):
+        """
+        Add newborns to the model at once. Homes come from the housing index, places of all of them are drawn
+        in one batch.
+        """
+        raions, homes = self.housing.draw(len(newborn_ids), self.streams.stream('births'))
+        home_points = self.housing.points[homes]
+        agent_routines = self.routine_creator.generate_batch(home_points, raions, self.streams.stream('routines'))
+        newborns = [
+            self.__add_human(newborn_id, home_point, agent_routine, raion, newborn=True)
+            for newborn_id, home_point, agent_routine, raion in zip(newborn_ids, home_points, agent_routines, raions)
+        ]
+        # Added one by one: a single agent is inserted into the R-tree, while mesa-geo registers a list first
+        # and then rebuilds the tree over the registered agents and the list again, indexing it twice
+        for newborn in newborns:
+            self.space.add_agents(newborn)
 
     def __generate_newborn_birthdays(self):
         year_duration = 365 * self.step_per_day
-        total_alive = self.count_type(self, HumanState.Death, invert=True)
+        total_alive = self.counters.count(HumanState.Death, invert=True)
         total_newborns_per_year = int(total_alive / 1000 * self.birth_coefficient)
-        return [
-            random.randint(self.schedule.steps, year_duration + self.schedule.steps - 1)
-            for _ in range(total_newborns_per_year)
-        ]
+        rng = self.streams.stream('births')
+        return rng.integers(
+            self.schedule.steps, year_duration + self.schedule.steps, size=total_newborns_per_year
+        ).tolist()
 
     def __try_to_add_newborn(self):
-        if self.schedule.steps in self.pending_newborns:
+        amount = len(self.calendar.pop_due(self.schedule.steps, EventCalendar.BIRTH))
+        if amount:
             total_agents = len(self.space.agents)
-            amount = self.pending_newborns.count(self.schedule.steps)
             print(f'Adding {amount} newborns to the model. Total agents: {total_agents}')
-            for i in range(amount):
-                self.__add_newborn_agent(f"NB_{total_agents}_{i}")
+            self.__add_newborn_agents([f"NB_{total_agents}_{i}" for i in range(amount)])
 
     def __schedule_newborns(self):
         birthdays = self.__generate_newborn_birthdays()
-        self.pending_newborns.extend(birthdays)
+        for birthday in birthdays:
+            self.calendar.push(birthday, EventCalendar.BIRTH)
         return len(birthdays)
 
-    def step(self):
+    def step(self, max_steps: int | None = None) -> int:
         """
-        Advance the model by one step.
+        Advance the model by one step, or by several quiet steps at once in fast-forward mode.
+        :param max_steps: Limit of steps advanced at once in fast-forward mode
+        :return: Amount of steps advanced
         """
         # print(f'Infected: {self.count_type(self, HumanState.PrimaryTuberculosis), self.count_type(self, HumanState.PostPrimaryTuberculosis)}')
-        self.schedule.step()
+        steps = self.__fast_forward_steps(max_steps) if self.fast_forward else 1
+        if self.population is not None:
+            self.population.step(steps)
+        else:
+            # Before the humans move: agent engine contacts lag one step behind the vectorized engine
+            with self.phase('neighbors'):
+                if self.contact_index is not None:
+                    self.contact_index.build(*self.positions.coordinates())
+                else:
+                    self.sync_geometries()
+
+        if steps > 1:
+            if self.history:
+                # Conditions only change at the end of the skipped steps, their data rows are the last collected one
+                for values in self.datacollector.model_vars.values():
+                    values.extend([values[-1]] * (steps - 1))
+            self.schedule.steps += steps - 1
+            self.schedule.time += steps - 1
+        self.complete_step(steps)
+        return steps
+
+    def phase(self, name: str):
+        """
+        Context timing a step phase with the profiler, does nothing when profiling is off.
+        """
+        if self.profiler is None:
+            return NO_PHASE
+        return self.profiler.phase(name)
+
+    def __fast_forward_steps(self, max_steps: int | None) -> int:
+        """
+        Amount of steps the next step can cover. Newborns and the yearly birth schedule are handled
+        in `complete_step`, so they may fall on the last covered step only.
+        """
+        year_duration = 365 * self.step_per_day
+        limit = year_duration - self.schedule.steps % year_duration
+        if max_steps is not None:
+            limit = min(limit, max_steps)
+
+        next_birth = self.calendar.next_step(EventCalendar.BIRTH)
+        if next_birth is not None:
+            limit = min(limit, next_birth - self.schedule.steps)
+
+        return max(1, self.population.quiet_steps(limit))
+
+    def complete_step(self, steps: int = 1):
+        """
+        Rest of the step after the population update: sectors and other scheduled agents, data, newborns.
+        Called separately by `DistributedRunner` workers, which update the population in phases.
+        :param steps: Amount of steps the step covered, for the profiler
+        """
+        with self.phase('schedule'):
+            self.schedule.step()
         # collect data
-        self.datacollector.collect(self)
+        with self.phase('collect'):
+            self.__collect()
 
         # Check for newborns and add them
-        if self.schedule.steps % (365 * self.step_per_day) == 0:
-            amount = self.__schedule_newborns()
-            print(f'Newborns for this year: {amount}')
+        with self.phase('newborns'):
+            if self.schedule.steps % (365 * self.step_per_day) == 0:
+                amount = self.__schedule_newborns()
+                print(f'Newborns for this year: {amount}')
 
-        self.__try_to_add_newborn()
+            self.__try_to_add_newborn()
+
+        if self.debug_counters:
+            with self.phase('debug_counters'):
+                self.__check_counters()
+
+        if self.profiler is not None:
+            self.profiler.count('transitions', self.counters.transitions - self.__transitions)
+            self.__transitions = self.counters.transitions
+            self.profiler.end_step(steps)
 
         # if self.count_type(self, HumanState.PrimaryTuberculosis) == 0 and \
         #    self.count_type(self, HumanState.PostPrimaryTuberculosis) == 0:
         #     self.running = False
 
+    def __check_counters(self):
+        self.counters.check(self.humans())
+        condition = [Population.STATE_CODES[agent.condition] for agent in self.positions.agents]
+        if not np.array_equal(self.positions.condition[:len(self.positions)], condition):
+            raise Exception('[TuberculosisSpread] Position store conditions and humans mismatch')
+        if self.population is None:
+            return
+
+        for state in HumanState.all():
+            if self.population.count(state) != self.counters.count(state):
+                raise Exception(f'[TuberculosisSpread] Population arrays and counters mismatch for {state}')
+
+    def __collect(self):
+        if self.history:
+            self.datacollector.collect(self)
+        if self.collector is not None:
+            self.collector.collect(self)
+
+    def sector_counts(self, sector: SectorAgent) -> dict:
+        """
+        Healthy, infected, dead and total humans standing in `sector`.
+        Counts for all sectors are aggregated once per step, on the first request.
+        """
+        return self.update_sector_map().counts(sector.sector_index)
+
+    def update_sector_map(self) -> SectorMap:
+        """
+        Sector map with the counts of the current step.
+        """
+        if self.__sector_map_step != self.schedule.steps:
+            if self.population is not None:
+                condition = self.population.condition[:len(self.population)]
+            else:
+                condition = self.positions.condition[:len(self.positions)]
+            self.sector_map.update(self.positions.place[:len(self.positions)], condition)
+            self.__sector_map_step = self.schedule.steps
+
+        return self.sector_map
+
+    def sync_geometries(self) -> int:
+        """
+        Write current positions into the geometries of humans, for GeoSpace contacts, the map and GIS exports.
+
+        With GeoSpace contacts the R-tree is rebuilt as well: mesa-geo indexes a geometry only when its agent is
+        added. The tree is rebuilt once over the registered agents, adding an empty list rebuilds it in mesa-geo.
+        Moving agents one by one with `remove_agent` and `add_agents` would cost O(N) per agent.
+        :return: Amount of synced humans
+        """
+        synced = self.positions.sync_geometries()
+        if synced and self.contact_index is None:
+            self.space.add_agents([])
+        return synced
+
+    def humans(self) -> list[Human]:
+        if self.population is not None:
+            return self.population.agents
+        return [agent for agent in self.schedule.agents if isinstance(agent, Human)]
+
     @staticmethod
     def count_type(model, human_condition, invert=False):
         """
@@ -194,15 +629,4 @@ class TuberculosisSpread(mesa.Model):
             human_condition: The condition to count.
             invert: If True, count the number of humans not in the given condition.
         """
-        count = 0
-        for agent in model.schedule.agents:
-            if not isinstance(agent, Human):
-                continue
-
-            if invert:
-                if agent.condition != human_condition:
-                    count += 1
-            else:
-                if agent.condition == human_condition:
-                    count += 1
-        return count
+        return model.counters.count(human_condition, invert)
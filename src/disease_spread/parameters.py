@@ -0,0 +1,80 @@
+class DiseaseParameters:
+    """
+    Disease constants shared by all `Human` agents of a model.
+    """
+
+    __slots__ = (
+        'step_per_day',
+        'year_in_steps',
+        'lifespan_years',
+        'lifespan_steps',
+        'healthy_contagious_rate',
+        'latent_chance',
+        'primary_chance',
+        'latent_recovery_chance',
+        'tuberculosis_recovery_chance',
+        'mortality_chance',
+        'post_primary_latent_chance',
+        'repeated_infection_chance',
+        'latent_recovery_day_range',
+        'incubation_period_days',
+        'IR_constant',
+        'constant_a',
+        'constant_b',
+        'time_spend_with_in_minutes',
+    )
+
+    # Set from the model arguments, not by overrides
+    RESERVED = ('step_per_day',)
+
+    def __init__(self, step_per_day: int = 24, overrides: dict | None = None):
+        """
+        Args:
+            step_per_day: Simulation steps in a day.
+            overrides: Values to use instead of the defaults, e.g. from a batch sweep.
+        """
+        overrides = overrides or {}
+        self.step_per_day = step_per_day
+        self.lifespan_years = 96
+
+        self.healthy_contagious_rate = 0.017
+
+        self.latent_chance = 0.9
+        self.primary_chance = 0.1
+        self.latent_recovery_chance = 0.1
+        self.tuberculosis_recovery_chance = 0.896
+        self.mortality_chance = 0.104
+        self.post_primary_latent_chance = (0.05, 0.15)
+        self.repeated_infection_chance = 0.14
+
+        self.latent_recovery_day_range = (42, 56)
+
+        self.incubation_period_days = 60
+        self.IR_constant = 0.0024
+        self.constant_a = 90
+        self.constant_b = 50
+        self.time_spend_with_in_minutes = 1 * 60  # 1-hour step in minutes
+
+        DiseaseParameters.check(overrides)
+        for name, value in overrides.items():
+            setattr(self, name, tuple(value) if isinstance(value, list) else value)
+
+        # Derived values, unless overridden directly
+        if 'year_in_steps' not in overrides:
+            self.year_in_steps = 365 * self.step_per_day
+        if 'lifespan_steps' not in overrides:
+            self.lifespan_steps = self.lifespan_years * self.year_in_steps
+
+    @staticmethod
+    def check(names):
+        """
+        Reject override names that are not disease parameters or are set from the model arguments.
+        """
+        for name in names:
+            if name in DiseaseParameters.RESERVED:
+                raise Exception(f'[DiseaseParameters] Reserved disease parameter: {name}. Expected: model argument')
+            if name not in DiseaseParameters.__slots__:
+                raise Exception(f'[DiseaseParameters] Unknown disease parameter: {name}')
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in DiseaseParameters.__slots__}
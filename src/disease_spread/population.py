@@ -0,0 +1,626 @@
+import numpy as np
+import shapely
+
+from src.disease_spread.sector_agent import SectorAgent
+from src.utils.human_age import HumanAge, HumanAgeGroup
+from src.utils.human_state import HumanState
+from src.utils.routine_table import RoutineTable
+
+NONE_STEP = -1
+
+
+class Population:
+    """
+    Struct-of-arrays population engine.
+
+    Keeps the state of every `Human` in contiguous NumPy arrays and runs a whole step
+    (aging, natural death, latent recovery/activation, reinfection, recovery/mortality)
+    as batched operations. Locations are resolved for the whole population from the compiled
+    `RoutineTable` with an array gather and written to the model `PositionStore`.
+    `Human` objects are kept for the GeoSpace, their `condition` is synced back after every step.
+    """
+
+    STATES = HumanState.all()
+    STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+    SUSTAINABLE = STATE_CODES[HumanState.Sustainable]
+    LATENT = STATE_CODES[HumanState.Latent]
+    PRIMARY = STATE_CODES[HumanState.PrimaryTuberculosis]
+    POST_PRIMARY = STATE_CODES[HumanState.PostPrimaryTuberculosis]
+    RECOVERED = STATE_CODES[HumanState.Recovered]
+    DEATH = STATE_CODES[HumanState.Death]
+
+    # Fill values of the arrays, the rest are filled with zeros
+    FILL = {
+        'reinfection_step': NONE_STEP,
+        'latent_recovery_step': NONE_STEP,
+        'latent_infection_step': NONE_STEP,
+        'routine_day_type': -1,
+        'stream_index': -1,
+    }
+
+    def __init__(self, model, routine_table: RoutineTable, colocation=False, capacity=1024):
+        self.model = model
+        self.routine_table = routine_table
+        self.colocation = colocation
+        self.size = 0
+        self.agents = []
+        self.positions = model.positions
+        self.points = self.positions.points
+        self.streams = model.streams
+        self.max_places_per_slot = 1
+
+        self.condition = np.zeros(capacity, dtype=np.int8)
+        self.steps_lived = np.zeros(capacity, dtype=np.int64)
+        self.age_group = np.zeros(capacity, dtype=np.int8)
+        self.steps_infected = np.zeros(capacity, dtype=np.int64)
+        self.random_day_in_life = np.zeros(capacity, dtype=np.int64)
+
+        self.flag_reinfection = np.zeros(capacity, dtype=bool)
+        self.flag_latent_recovery = np.zeros(capacity, dtype=bool)
+        self.flag_latent_infection = np.zeros(capacity, dtype=bool)
+
+        self.reinfection_step = np.full(capacity, NONE_STEP, dtype=np.int64)
+        self.latent_recovery_step = np.full(capacity, NONE_STEP, dtype=np.int64)
+        self.latent_infection_step = np.full(capacity, NONE_STEP, dtype=np.int64)
+
+        self.countagious_rate = np.zeros(capacity, dtype=np.float64)
+        self.max_countagious_rate = np.zeros(capacity, dtype=np.float64)
+
+        # Key of the agent's random draws, see `RandomStreams.uniform`
+        self.stream_index = np.full(capacity, -1, dtype=np.int64)
+        # Conditions at the start of the step and agents spreading the infection, set by `advance()`
+        self.__previous_condition = np.zeros(0, dtype=np.int8)
+        self.__spreading = np.zeros(0, dtype=bool)
+
+        # Routine variant and the (age group, day type) it was picked for
+        slots = len(routine_table.places)
+        self.routine_variant = np.zeros(capacity, dtype=np.int16)
+        self.routine_age_group = np.zeros(capacity, dtype=np.int8)
+        self.routine_day_type = np.full(capacity, -1, dtype=np.int8)
+        # Place point ids of every agent per place slot, `multiple` places have several points
+        self.place_points = np.zeros((capacity, slots, 1), dtype=np.int32)
+        self.place_counts = np.zeros((capacity, slots), dtype=np.int8)
+
+        self.parameters = model.parameters
+
+    def __len__(self):
+        return self.size
+
+    def __arrays(self):
+        return (
+            'condition', 'steps_lived', 'age_group', 'steps_infected', 'random_day_in_life',
+            'flag_reinfection', 'flag_latent_recovery', 'flag_latent_infection',
+            'reinfection_step', 'latent_recovery_step', 'latent_infection_step',
+            'countagious_rate', 'max_countagious_rate', 'stream_index',
+            'routine_variant', 'routine_age_group', 'routine_day_type',
+            'place_points', 'place_counts',
+        )
+
+    def __grow(self, required):
+        capacity = len(self.condition)
+        if required <= capacity:
+            return
+
+        new_capacity = max(required, capacity * 2)
+        for name in self.__arrays():
+            array = getattr(self, name)
+            grown = np.full((new_capacity, *array.shape[1:]), Population.FILL.get(name, 0), dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+    def __grow_places(self, required):
+        if required <= self.max_places_per_slot:
+            return
+
+        grown = np.zeros((*self.place_points.shape[:2], required), dtype=self.place_points.dtype)
+        grown[:, :, :self.max_places_per_slot] = self.place_points
+        self.place_points = grown
+        self.max_places_per_slot = required
+
+    def __add_places(self, index, agent):
+        for tag, points in agent.routines.places().items():
+            if points is None:
+                continue
+            if isinstance(points, shapely.Point):
+                points = [points]
+
+            slot = self.routine_table.slot(tag)
+            self.__grow_places(len(points))
+            self.place_points[index, slot, :len(points)] = [self.points.id(point) for point in points]
+            self.place_counts[index, slot] = len(points)
+
+    def add(self, agent, stream_index: int = None):
+        """
+        Register a `Human` in the population and copy its state into the arrays.
+        :param stream_index: Key of the agent's random draws, the population index if not given
+        """
+        self.__grow(self.size + 1)
+        i = self.size
+        agent.population_index = i
+        self.agents.append(agent)
+
+        self.condition[i] = Population.STATE_CODES[agent.condition]
+        self.steps_lived[i] = agent.steps_lived
+        self.age_group[i] = agent.human_age_group
+        self.steps_infected[i] = agent.steps_infected
+        self.random_day_in_life[i] = agent.random_day_in_life
+        self.flag_reinfection[i] = agent.flag_reinfection
+        self.flag_latent_recovery[i] = agent.flag_latent_recovery
+        self.flag_latent_infection[i] = agent.flag_latent_infection
+        self.reinfection_step[i] = NONE_STEP if agent.reinfection_step is None else agent.reinfection_step
+        self.latent_recovery_step[i] = NONE_STEP if agent.latent_recovery_step is None else agent.latent_recovery_step
+        self.latent_infection_step[i] = NONE_STEP if agent.latent_infection_step is None else agent.latent_infection_step
+        self.countagious_rate[i] = agent.countagious_rate
+        self.max_countagious_rate[i] = agent.max_countagious_rate
+        self.stream_index[i] = i if stream_index is None else stream_index
+
+        self.__add_places(i, agent)
+
+        self.size += 1
+
+    def state(self) -> dict[str, np.ndarray]:
+        """
+        Copy of the population arrays, for snapshots.
+        """
+        return {name: getattr(self, name)[:self.size].copy() for name in self.__arrays()}
+
+    def restore(self, agents: list, state: dict[str, np.ndarray]):
+        """
+        Register restored `Human`s with the arrays saved by `state()` instead of copying their attributes.
+        """
+        start, end = self.size, self.size + len(agents)
+        self.__grow(end)
+        self.__grow_places(state['place_points'].shape[2])
+
+        for i, agent in enumerate(agents, start):
+            agent.population_index = i
+        self.agents.extend(agents)
+
+        for name in self.__arrays():
+            values = state[name]
+            if name == 'place_points':
+                getattr(self, name)[start:end, :, :values.shape[2]] = values
+            else:
+                getattr(self, name)[start:end] = values
+        self.size = end
+
+    def set_condition(self, agent, condition: HumanState):
+        self.condition[agent.population_index] = Population.STATE_CODES[condition]
+        agent.condition = condition
+
+    def count(self, human_condition, invert=False):
+        matches = np.count_nonzero(self.condition[:self.size] == Population.STATE_CODES[human_condition])
+        return self.size - matches if invert else matches
+
+    def __count(self, name, amount):
+        if self.model.profiler is not None:
+            self.model.profiler.count(name, amount)
+
+    def __uniform(self, name, indexes, keys=0):
+        """
+        Per-agent draws of this step, see `RandomStreams.uniform`.
+        """
+        return self.streams.uniform(name, self.model.schedule.steps, self.stream_index[indexes], keys)
+
+    def __rand_in_range(self, name, indexes, low, high):
+        """
+        Vectorized `get_rand_in_range`, both ends inclusive.
+        """
+        low = np.asarray(low, dtype=np.int64)
+        high = np.maximum(np.asarray(high, dtype=np.int64), low)
+        return low + (self.__uniform(name, indexes) * (high - low + 1)).astype(np.int64)
+
+    def __set_latent_flags(self, indexes):
+        c = self.parameters
+        low, high = c.post_primary_latent_chance
+        inf_chance = low + self.__uniform('latent_chance', indexes) * (high - low)
+        will_be_infected = (1 - c.latent_recovery_chance) * inf_chance
+
+        recovery = c.latent_recovery_chance > self.__uniform('latent_recovery', indexes)
+        infection = will_be_infected > self.__uniform('latent_infection', indexes)
+
+        self.flag_latent_recovery[indexes] = recovery
+        self.flag_latent_infection[indexes] = infection
+
+        recovering = indexes[recovery]
+        self.latent_recovery_step[recovering] = self.__rand_in_range(
+            'latent_recovery_day', recovering, *c.latent_recovery_day_range
+        ) * c.step_per_day
+
+        infecting = indexes[infection]
+        self.latent_infection_step[infecting] = self.__rand_in_range(
+            'latent_infection_step', infecting, self.steps_lived[infecting], c.lifespan_steps
+        )
+
+    def __set_reinfection_flags(self, indexes):
+        c = self.parameters
+        reinfection = self.__uniform('reinfection', indexes) < c.repeated_infection_chance
+        self.flag_reinfection[indexes] = reinfection
+
+        reinfecting = indexes[reinfection]
+        self.reinfection_step[reinfecting] = self.__rand_in_range(
+            'reinfection_step', reinfecting, self.steps_lived[reinfecting], c.lifespan_steps
+        )
+
+    def __set_contagious_rate(self, indexes):
+        c = self.parameters
+        if self.model.schedule.steps % c.step_per_day != 0:
+            return
+
+        day_in_life = self.random_day_in_life[indexes]
+        incubating = self.steps_infected[indexes] <= c.incubation_period_days
+
+        value = 1 - ((c.incubation_period_days - day_in_life) / c.constant_a)
+        incubation_rate = np.sqrt(np.maximum(value, 0))
+
+        value = np.power(np.abs((day_in_life - c.incubation_period_days) / c.constant_b), 3)
+        active_rate = np.exp(-value)
+
+        self.countagious_rate[indexes] = np.where(incubating, incubation_rate, active_rate)
+
+    def __set_recovery_state(self, indexes):
+        c = self.parameters
+        total = c.tuberculosis_recovery_chance + c.mortality_chance
+        recovered = self.__uniform('recovery', indexes) * total < c.tuberculosis_recovery_chance
+
+        self.condition[indexes] = np.where(recovered, Population.RECOVERED, Population.DEATH)
+
+        recovered_indexes = indexes[recovered]
+        self.steps_infected[recovered_indexes] = 0
+        self.__set_reinfection_flags(recovered_indexes)
+
+    def present(self, indexes: np.ndarray = None, owner: int = 0) -> dict:
+        """
+        Contact arrays of local agents standing in this domain, all agents if `indexes` is not given.
+        Available after `advance()`. Guests from other processes are passed to `spread()` in the same format.
+        """
+        if indexes is None:
+            indexes = np.arange(self.size)
+        x, y = self.points.coordinates(self.positions.place[indexes])
+        return {
+            'index': indexes,
+            'owner': np.full(len(indexes), owner, dtype=np.int32),
+            'stream': self.stream_index[indexes],
+            'place': self.positions.place[indexes],
+            'x': x,
+            'y': y,
+            'condition': self.__previous_condition[indexes],
+            'rate': self.countagious_rate[indexes],
+            'spreading': self.__spreading[indexes],
+        }
+
+    @staticmethod
+    def join_present(parts: list[dict]) -> dict:
+        """
+        Concatenate contact arrays, ordered by stream index so results do not depend on how agents were split.
+        """
+        joined = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        order = np.argsort(joined['stream'], kind='stable')
+        return {key: values[order] for key, values in joined.items()}
+
+    def __contacts(self, present, infected):
+        """
+        Pairs (position in `infected`, neighbor position in `present`) of every contact of the `infected` agents.
+        """
+        with self.model.phase('neighbors'):
+            sources, neighbors = self.__query_contacts(present, infected)
+
+        self.__count('neighbor_queries', len(infected))
+        self.__count('neighbor_candidates', len(sources))
+        return sources, neighbors
+
+    def __query_contacts(self, present, infected):
+        if self.model.contact_index is not None:
+            self.model.contact_index.build(present['x'], present['y'])
+            return self.model.contact_index.query(infected, self.model.exposure_distance)
+
+        # GeoSpace queries only see local agents, `present` is the whole population in this case
+        self.model.sync_geometries()
+        sources = []
+        neighbors = []
+        for position, index in enumerate(present['index'][infected].tolist()):
+            agent = self.agents[index]
+            neighbors_gen = self.model.space.get_neighbors_within_distance(agent, self.model.exposure_distance, center=True)
+            for neighbor in neighbors_gen:
+                if not isinstance(neighbor, SectorAgent):
+                    sources.append(position)
+                    neighbors.append(neighbor.population_index)
+
+        return np.array(sources, dtype=np.int64), np.array(neighbors, dtype=np.int64)
+
+    def __spread_infection(self, present, steps=1):
+        """
+        Infect susceptible neighbors of spreading agents.
+        Conditions in `present` are the snapshot at the start of the infection phase.
+        :param steps: Amount of steps the contacts last, chances are compounded over them
+        :return: Positions of infected agents in `present` and whether they got primary tuberculosis
+        """
+        c = self.parameters
+        condition = present['condition']
+        infected = np.flatnonzero(present['spreading'])
+        sources, neighbors = self.__contacts(present, infected)
+        if len(sources) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+        neighbors_condition = condition[neighbors]
+        contagious = (neighbors_condition == Population.PRIMARY) | (neighbors_condition == Population.POST_PRIMARY)
+
+        total_near = np.bincount(sources, minlength=len(infected))
+        total_infected_near = np.bincount(sources, weights=contagious, minlength=len(infected))
+        total_contagious_near = np.bincount(
+            sources, weights=np.where(contagious, present['rate'][neighbors], 0), minlength=len(infected)
+        )
+
+        p_inf = c.time_spend_with_in_minutes * (c.IR_constant / 360) * (
+                total_infected_near / np.maximum(total_near, 1)) * total_contagious_near
+
+        susceptible = neighbors_condition == Population.SUSTAINABLE
+        targets = neighbors[susceptible]
+        chances = np.clip(p_inf[sources[susceptible]], 0, 1)
+        if len(targets) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+        # Every contact is a separate draw, the first one that infects the target wins.
+        # Contacts are ordered by (target, source agent), so draws do not depend on the order of agents
+        stream = present['stream']
+        contact_sources = stream[infected[sources[susceptible]]]
+        order = np.lexsort((contact_sources, stream[targets]))
+        targets, chances = targets[order], chances[order]
+        first_of_target = np.searchsorted(stream[targets], stream[targets], side='left')
+        ranks = np.arange(len(targets)) - first_of_target
+        draws = self.streams.uniform('infection', self.model.schedule.steps, stream[targets], ranks)
+        self.__count('infection_draws', len(draws))
+        if steps == 1:
+            latent = draws >= 1 - chances * (c.latent_chance + c.primary_chance)
+            primary = draws >= 1 - chances * c.primary_chance
+        else:
+            any_chance = 1 - np.power(1 - chances * (c.latent_chance + c.primary_chance), steps)
+            primary_share = c.primary_chance / (c.latent_chance + c.primary_chance)
+            latent = draws >= 1 - any_chance
+            primary = draws >= 1 - any_chance * primary_share
+        infected_contacts = np.flatnonzero(latent)
+
+        first_targets, first = np.unique(targets[infected_contacts], return_index=True)
+        return first_targets, primary[infected_contacts[first]]
+
+    def __spread_colocated(self, present, steps=1):
+        """
+        Infect susceptible agents that share a place with spreading agents.
+        Agents on the same place point form one group, every group gets one force of infection
+        and every susceptible member gets one draw instead of one per infected member.
+        :param steps: Amount of steps the groups stay together, the force is compounded over them
+        :return: Positions of infected agents in `present` and whether they got primary tuberculosis
+        """
+        c = self.parameters
+        condition = present['condition']
+        spreading = np.flatnonzero(present['spreading'])
+        if len(spreading) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+        _, group = np.unique(present['place'], return_inverse=True)
+        groups = group.max() + 1
+
+        contagious = (condition == Population.PRIMARY) | (condition == Population.POST_PRIMARY)
+        members = np.bincount(group, minlength=groups)
+        infected_members = np.bincount(group, weights=contagious, minlength=groups)
+        contagious_members = np.bincount(
+            group, weights=np.where(contagious, present['rate'], 0), minlength=groups
+        )
+        sources = np.bincount(group[spreading], minlength=groups)
+
+        # Chance of a single infected contact, same as `Human.get_chance_of_infection`
+        p_inf = c.time_spend_with_in_minutes * (c.IR_constant / 360) * (
+                infected_members / members) * contagious_members
+        p_contact = np.clip(p_inf * (c.latent_chance + c.primary_chance), 0, 1)
+        force = 1 - np.power(1 - p_contact, sources * steps)
+
+        targets = np.flatnonzero((condition == Population.SUSTAINABLE) & (sources[group] > 0))
+        chances = force[group[targets]]
+        draws = self.streams.uniform('colocation', self.model.schedule.steps, present['stream'][targets])
+        self.__count('infection_draws', len(draws))
+        infected = draws < chances
+        primary_share = c.primary_chance / (c.latent_chance + c.primary_chance)
+
+        return targets[infected], draws[infected] < chances[infected] * primary_share
+
+    def spread(self, present: dict, steps=1) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Infection phase over the agents standing in this domain.
+        :param steps: Amount of quiet steps advanced at once, see `quiet_steps`
+        :return: Positions of infected agents in `present` and whether they got primary tuberculosis
+        """
+        if self.colocation:
+            return self.__spread_colocated(present, steps)
+        return self.__spread_infection(present, steps)
+
+    def __infect(self, targets, primary):
+        new_primary = targets[primary]
+        new_latent = targets[~primary]
+
+        self.condition[new_primary] = Population.PRIMARY
+        self.condition[new_latent] = Population.LATENT
+        self.__set_latent_flags(new_latent)
+
+    def step(self, steps=1):
+        """
+        Perform a step for the whole population.
+        :param steps: Amount of quiet steps to advance at once, see `quiet_steps`
+        """
+        with self.model.phase('advance'):
+            self.advance(steps)
+        with self.model.phase('spread'):
+            present = self.present()
+            targets, primary = self.spread(present, steps)
+        with self.model.phase('finish'):
+            self.finish(present['index'][targets], primary)
+
+    def quiet_steps(self, limit: int) -> int:
+        """
+        Amount of upcoming steps, at most `limit`, in which agents only age and get infected:
+        no routine transition, day type change, birthday, latent/reinfection timer, natural death,
+        recovery or contagious rate update. Same wake-ups as `Human.next_wake_in` of the event scheduler.
+        """
+        c = self.parameters
+        n = self.size
+        alive = np.flatnonzero(self.condition[:n] != Population.DEATH)
+        if len(alive) == 0:
+            return limit
+
+        steps_lived = self.steps_lived[alive]
+        condition = self.condition[alive]
+        week_day = steps_lived % (7 * c.step_per_day)
+        day_types = self.routine_day_type[alive]
+        # Agents without a routine for the day pick one on the next step
+        if (day_types < 0).any() or \
+                self.routine_table.redraws(self.routine_age_group[alive], day_types, self.routine_variant[alive]).any():
+            return 0
+
+        candidates = [
+            c.year_in_steps - steps_lived % c.year_in_steps,
+            c.lifespan_steps - steps_lived,
+            np.where(week_day < 5 * c.step_per_day, 5 * c.step_per_day - week_day, 7 * c.step_per_day - week_day),
+            self.routine_table.steps_to_transition(
+                self.routine_age_group[alive], day_types, self.routine_variant[alive], steps_lived % c.step_per_day
+            ),
+        ]
+
+        latent = condition == Population.LATENT
+        recovering = alive[latent & self.flag_latent_recovery[alive]]
+        infecting = alive[latent & self.flag_latent_infection[alive]]
+        reinfecting = alive[(condition == Population.RECOVERED) & self.flag_reinfection[alive]]
+        candidates += [
+            self.latent_recovery_step[recovering] - self.steps_lived[recovering],
+            self.latent_infection_step[infecting] - self.steps_lived[infecting],
+            self.reinfection_step[reinfecting] - self.steps_lived[reinfecting],
+        ]
+
+        infected = alive[(condition == Population.PRIMARY) | (condition == Population.POST_PRIMARY)]
+        if len(infected):
+            # Rates are updated at the start of every model day, recoveries are checked against them every step
+            candidates.append(np.array([(-self.model.schedule.steps) % c.step_per_day + 1]))
+            if ((self.max_countagious_rate[infected] > self.countagious_rate[infected]) &
+                    (self.countagious_rate[infected] < c.healthy_contagious_rate)).any():
+                return 0
+
+        wake_in = max(1, min(int(candidate.min()) for candidate in candidates if len(candidate)))
+        return min(limit, wake_in - 1)
+
+    def advance(self, steps=1):
+        """
+        First phase of a step: aging, locations and every transition except new infections.
+        :param steps: Amount of quiet steps to advance at once, see `quiet_steps`
+        """
+        c = self.parameters
+        n = self.size
+        condition = self.condition[:n]
+        previous_condition = condition.copy()
+        self.__previous_condition = previous_condition
+        self.__spreading = np.zeros(n, dtype=bool)
+
+        alive = np.flatnonzero(condition != Population.DEATH)
+
+        # Aging
+        self.steps_lived[alive] += steps
+        steps_lived = self.steps_lived[:n]
+        birthdays = alive[steps_lived[alive] % c.year_in_steps == 0]
+        self.age_group[birthdays] = HumanAgeGroup.set_age_groups(steps_lived[birthdays] / c.year_in_steps)
+        for index, age_group in zip(birthdays.tolist(), self.age_group[birthdays].tolist()):
+            self.agents[index].human_age_group = HumanAge(age_group)
+
+        self.__location_routine(alive)
+
+        alive_condition = condition[alive]
+        is_infected = (alive_condition == Population.PRIMARY) | (alive_condition == Population.POST_PRIMARY)
+
+        # Infected agents
+        infected = alive[is_infected]
+        self.steps_infected[infected] += steps
+        self.__set_contagious_rate(infected)
+        self.max_countagious_rate[infected] = np.maximum(self.max_countagious_rate[infected],
+                                                         self.countagious_rate[infected])
+
+        recovering = (self.max_countagious_rate[infected] > self.countagious_rate[infected]) & \
+                     (self.countagious_rate[infected] < c.healthy_contagious_rate)
+        self.__spreading[infected[~recovering]] = True
+        self.__set_recovery_state(infected[recovering])
+
+        # Natural death
+        others = alive[~is_infected]
+        dying = steps_lived[others] >= c.lifespan_steps
+        condition[others[dying]] = Population.DEATH
+        others = others[~dying]
+
+        # Latent agents
+        latent = others[previous_condition[others] == Population.LATENT]
+        recovers = self.flag_latent_recovery[latent] & (steps_lived[latent] >= self.latent_recovery_step[latent])
+        activates = ~recovers & self.flag_latent_infection[latent] & \
+            (steps_lived[latent] >= self.latent_infection_step[latent])
+        condition[latent[recovers]] = Population.SUSTAINABLE
+        condition[latent[activates]] = Population.POST_PRIMARY
+
+        # Recovered agents
+        recovered = others[previous_condition[others] == Population.RECOVERED]
+        reinfected = recovered[self.flag_reinfection[recovered] & (steps_lived[recovered] >= self.reinfection_step[recovered])]
+        condition[reinfected] = Population.POST_PRIMARY
+        self.flag_reinfection[reinfected] = False
+
+    def finish(self, targets: np.ndarray, primary: np.ndarray):
+        """
+        Last phase of a step: apply new infections of local agents `targets` and sync changed agents.
+        Infections are based on the conditions at the start of the step.
+        """
+        self.__infect(np.asarray(targets, dtype=np.int64), np.asarray(primary, dtype=bool))
+        self.__sync_agents(np.flatnonzero(self.condition[:self.size] != self.__previous_condition))
+
+    def __location_routine(self, indexes):
+        c = self.parameters
+        steps_lived = self.steps_lived[indexes]
+        day_types = (steps_lived % (7 * c.step_per_day) >= 5 * c.step_per_day).astype(np.int8)
+        hours = steps_lived % c.step_per_day
+        age_groups = self.age_group[indexes]
+
+        # Pick a new routine when the age group or the day type changes, and on every step of a day without
+        # routine, like `Routine.update` does
+        reset = (self.routine_age_group[indexes] != age_groups) | (self.routine_day_type[indexes] != day_types)
+        kept = np.flatnonzero(~reset)
+        reset[kept] = self.routine_table.redraws(
+            age_groups[kept], day_types[kept], self.routine_variant[indexes[kept]]
+        )
+        if reset.any():
+            resetting = indexes[reset]
+            self.__count('routine_resets', len(resetting))
+            self.routine_variant[resetting] = self.routine_table.draw_variants(
+                age_groups[reset], day_types[reset], self.__uniform('routine_variant', resetting)
+            )
+            self.routine_age_group[resetting] = age_groups[reset]
+            self.routine_day_type[resetting] = day_types[reset]
+
+        slots = self.routine_table.slots(age_groups, day_types, self.routine_variant[indexes], hours)
+        moving = slots != RoutineTable.STAY
+        moving_indexes = indexes[moving]
+        if len(moving_indexes) == 0:
+            return
+
+        slots = slots[moving]
+        # Lists of places pick one of them on every step, like `Routine.current_place` does
+        choosing = np.flatnonzero(slots <= RoutineTable.CHOICE)
+        if len(choosing):
+            slots[choosing] = self.routine_table.choose(
+                slots[choosing], self.__uniform('routine_choice', moving_indexes[choosing])
+            )
+        counts = self.place_counts[moving_indexes, slots]
+        known = counts > 0
+        moving_indexes, slots, counts = moving_indexes[known], slots[known], counts[known]
+
+        # `multiple` places pick one of the agent's points at random
+        choices = (self.__uniform('routine_place', moving_indexes) * counts).astype(np.int64)
+        self.positions.move_ids(moving_indexes, self.place_points[moving_indexes, slots, choices])
+
+    def __sync_agents(self, changed):
+        """
+        Write back conditions of agents whose condition changed this step.
+        """
+        for index in changed.tolist():
+            agent = self.agents[index]
+            agent.condition = Population.STATES[self.condition[index]]
@@ -0,0 +1,78 @@
+import numpy as np
+import shapely
+
+from src.disease_spread.population import Population
+from src.utils.place_points import PlacePoints
+
+
+class PositionStore:
+    """
+    Current place point and condition of every human, kept as point ids and state codes in arrays.
+
+    The store is the source of truth for movement and contacts. `Human.geometry` is only written on
+    `sync_geometries()`, which GeoSpace contacts, the map and GIS exports call when they need shapely geometries.
+    """
+
+    def __init__(self, capacity=1024):
+        self.points = PlacePoints()
+        self.agents = []
+        self.size = 0
+
+        self.place = np.zeros(capacity, dtype=np.int32)
+        self.dirty = np.zeros(capacity, dtype=bool)
+        # `Population.STATE_CODES` of the conditions, updated by `Human` on every change
+        self.condition = np.zeros(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return self.size
+
+    def __grow(self, required):
+        capacity = len(self.place)
+        if required <= capacity:
+            return
+
+        new_capacity = max(required, capacity * 2)
+        for name in ['place', 'dirty', 'condition']:
+            array = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+    def add(self, agent):
+        """
+        Register a `Human` at its current geometry.
+        """
+        self.__grow(self.size + 1)
+        agent.position_slot = self.size
+        self.agents.append(agent)
+        self.place[self.size] = self.points.id(agent.geometry)
+        self.condition[self.size] = Population.STATE_CODES[agent.condition]
+        self.size += 1
+
+    def set_condition(self, slot: int, condition):
+        self.condition[slot] = Population.STATE_CODES[condition]
+
+    def move(self, slot: int, point: shapely.Point):
+        self.place[slot] = self.points.id(point)
+        self.dirty[slot] = True
+
+    def move_ids(self, slots: np.ndarray, point_ids: np.ndarray):
+        """
+        Batched move to already registered place points.
+        """
+        self.place[slots] = point_ids
+        self.dirty[slots] = True
+
+    def coordinates(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.points.coordinates(self.place[:self.size])
+
+    def sync_geometries(self) -> int:
+        """
+        Write the current place points into `Human.geometry` of agents moved since the last sync.
+        :return: Amount of synced agents
+        """
+        moved = np.flatnonzero(self.dirty[:self.size])
+        for slot, point_id in zip(moved.tolist(), self.place[moved].tolist()):
+            self.agents[slot].geometry = self.points.point(point_id)
+        self.dirty[moved] = False
+        return len(moved)
@@ -0,0 +1,110 @@
+import contextlib
+import json
+import os
+import time
+
+
+class StepProfiler:
+    """
+    Opt-in instrumentation of `TuberculosisSpread.step`: wall time per phase and hot-path counters
+    (neighbor queries, candidates, routine resets, infection draws, state transitions).
+
+    Phases can be nested, e.g. `sectors` runs inside `schedule`. Times are exclusive, a phase does not include
+    the phases nested in it, so shares add up to the measured time.
+    The model keeps `profiler = None` when profiling is off, hot paths only check for it.
+    With `log_every` a line with the throughput and phase shares of the last window is printed.
+    """
+
+    PHASES = [
+        'advance', 'spread', 'neighbors', 'finish', 'schedule', 'sectors', 'collect', 'newborns', 'debug_counters',
+    ]
+    COUNTERS = ['neighbor_queries', 'neighbor_candidates', 'routine_resets', 'infection_draws', 'transitions']
+
+    def __init__(self, log_every: int | None = None):
+        self.log_every = log_every
+        self.steps = 0
+        self.started = time.perf_counter()
+        self.phases = {}  # name -> [total seconds, calls, max seconds]
+        self.counters = dict.fromkeys(StepProfiler.COUNTERS, 0)
+        self.__nested = [0.0]  # Time of finished nested phases, one entry per open phase
+
+        self.__window_started = self.started
+        self.__window_steps = 0
+        self.__window_phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        self.__nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self.__nested.pop()
+            self.__nested[-1] += elapsed
+            self.add_time(name, elapsed - nested)
+
+    def add_time(self, name: str, seconds: float):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = [0.0, 0, 0.0]
+        stats[0] += seconds
+        stats[1] += 1
+        stats[2] = max(stats[2], seconds)
+        self.__window_phases[name] = self.__window_phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_step(self, steps: int = 1):
+        """
+        Called by the model after every step, `steps` is more than one for fast-forward steps.
+        """
+        self.steps += steps
+        self.__window_steps += steps
+        if self.log_every and self.steps // self.log_every > (self.steps - steps) // self.log_every:
+            self.__log()
+
+    def __log(self):
+        elapsed = time.perf_counter() - self.__window_started
+        measured = sum(self.__window_phases.values()) or 1.0
+        shares = ', '.join(
+            f'{name} {seconds / measured:.0%}'
+            for name, seconds in sorted(self.__window_phases.items(), key=lambda item: -item[1])
+        )
+        print(f'[StepProfiler] Step {self.steps}: {self.__window_steps / elapsed:.1f} steps/sec | {shares}')
+
+        self.__window_started = time.perf_counter()
+        self.__window_steps = 0
+        self.__window_phases = {}
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        measured = sum(stats[0] for stats in self.phases.values()) or 1.0
+        return {
+            'steps': self.steps,
+            'elapsed': elapsed,
+            'steps_per_sec': self.steps / elapsed if elapsed else 0.0,
+            'phases': {
+                name: {
+                    'total': total,
+                    'per_step': total / self.steps if self.steps else 0.0,
+                    'max': longest,
+                    'calls': calls,
+                    'share': total / measured,
+                }
+                for name, (total, calls, longest) in self.phases.items()
+            },
+            'counters': {
+                name: {'total': value, 'per_step': value / self.steps if self.steps else 0.0}
+                for name, value in self.counters.items()
+            },
+        }
+
+    def save(self, path: str) -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.summary(), file, indent=2)
+        return path
@@ -2,11 +2,12 @@ import mesa
 import mesa_geo as mg
 import shapely
 
-from src.utils.human_state import HumanState
 
 class SectorAgent(mg.GeoAgent):
     """Neighbourhood agent. Changes color according to number of infected inside it."""
 
+    __slots__ = ('color', 'hotspot_threshold', 'sector_index')
+
     def __init__(
         self, unique_id, model: mesa.Model, geometry: 'shapely.Geometry', crs, hotspot_threshold=1
     ):
@@ -25,42 +26,25 @@ class SectorAgent(mg.GeoAgent):
         self.hotspot_threshold = (
             hotspot_threshold  # When a neighborhood is considered a hot-spot
         )
+        # Index in the model `SectorMap`
+        self.sector_index = None
 
     def step(self):
         """Advance agent one step."""
-        self.color_hotspot()
+        with self.model.phase('sectors'):
+            self.color_hotspot()
 
     def color_hotspot(self):
         # Decide if this region agent is a hot-spot
         # (if more than threshold person agents are infected)
-        neighbors = self.model.space.get_intersecting_agents(self)
-
-        status = {
-            "Green": 0,
-            "Red": 0,
-        }
-
-        total = 0
-        dead = 0
-
-        for neighbor in neighbors:
-            if isinstance(neighbor, SectorAgent):
-                continue
-
-            condition = neighbor.condition
-            total += 1
-
-            if condition in [HumanState.Sustainable, HumanState.Latent, HumanState.Recovered]:
-                status['Green'] += 1
-            elif condition == HumanState.Death:
-                dead += 1
-            else:
-                status['Red'] += 1
+        counts = self.model.sector_counts(self)
 
-        if total == dead:
+        if counts['total'] == counts['dead']:
             self.color = 'Black'
+        elif counts['healthy'] >= counts['infected']:
+            self.color = 'Green'
         else:
-            self.color = max(status, key=status.get)
+            self.color = 'Red'
 
     def __repr__(self):
         return "Sector " + str(self.unique_id)
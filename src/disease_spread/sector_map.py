@@ -0,0 +1,104 @@
+import numpy as np
+import shapely
+
+from src.disease_spread.population import Population
+from src.utils.place_points import PlacePoints
+
+NO_SECTOR = -1
+
+
+class SectorMap:
+    """
+    Sector of every place point, so `SectorAgent` hotspots are aggregated from positions
+    without geometric queries during stepping.
+
+    Place points are assigned once, with a vectorized point-in-polygon query against an STRtree
+    of (optionally simplified) sector geometries. Points registered later are assigned on the next update.
+    """
+
+    def __init__(self, points: PlacePoints, simplify_tolerance: float = 0.0):
+        self.points = points
+        self.simplify_tolerance = simplify_tolerance
+        self.sectors = []
+        self.geometries = []
+
+        self.__tree = None
+        self.__point_sector = np.empty(0, dtype=np.int32)
+
+        self.healthy = np.empty(0, dtype=np.int64)
+        self.infected = np.empty(0, dtype=np.int64)
+        self.dead = np.empty(0, dtype=np.int64)
+        self.total = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.sectors)
+
+    def add(self, sector):
+        sector.sector_index = self.add_geometry(sector.geometry)
+        self.sectors.append(sector)
+
+    def add_geometry(self, geometry: shapely.Geometry) -> int:
+        """
+        Add an area without a `SectorAgent`, e.g. a raion polygon.
+        :return: Index of the area
+        """
+        if self.simplify_tolerance > 0:
+            geometry = shapely.simplify(geometry, self.simplify_tolerance, preserve_topology=True)
+        self.geometries.append(geometry)
+
+        # New sector, every point has to be assigned again
+        self.__tree = None
+        self.__point_sector = np.empty(0, dtype=np.int32)
+        return len(self.geometries) - 1
+
+    def __map_points(self):
+        mapped = len(self.__point_sector)
+        if mapped == len(self.points):
+            return
+
+        if self.__tree is None:
+            self.__tree = shapely.STRtree(self.geometries)
+
+        x, y = self.points.coordinates(np.arange(mapped, len(self.points)))
+        point_sector = np.full(len(x), NO_SECTOR, dtype=np.int32)
+        if len(self.geometries):
+            # Points on a shared border belong to the sector with the lowest index
+            points, sectors = self.__tree.query(shapely.points(x, y), predicate='intersects')
+            order = np.lexsort((sectors, points))[::-1]
+            point_sector[points[order]] = sectors[order]
+
+        self.__point_sector = np.concatenate([self.__point_sector, point_sector])
+
+    def point_sectors(self, place_ids: np.ndarray) -> np.ndarray:
+        """
+        Sector index of every place point id, `NO_SECTOR` for points outside all sectors.
+        """
+        self.__map_points()
+        return self.__point_sector[place_ids]
+
+    def update(self, place_ids: np.ndarray, condition: np.ndarray):
+        """
+        Count humans per sector.
+        :param place_ids: Current place point id of every human
+        :param condition: `Population` state code of every human
+        """
+        sectors = self.point_sectors(place_ids)
+        inside = sectors != NO_SECTOR
+        sectors, condition = sectors[inside], condition[inside]
+
+        dead = condition == Population.DEATH
+        infected = (condition == Population.PRIMARY) | (condition == Population.POST_PRIMARY)
+
+        size = len(self.geometries)
+        self.total = np.bincount(sectors, minlength=size)
+        self.dead = np.bincount(sectors[dead], minlength=size)
+        self.infected = np.bincount(sectors[infected], minlength=size)
+        self.healthy = self.total - self.dead - self.infected
+
+    def counts(self, sector_index: int) -> dict:
+        return {
+            'healthy': int(self.healthy[sector_index]),
+            'infected': int(self.infected[sector_index]),
+            'dead': int(self.dead[sector_index]),
+            'total': int(self.total[sector_index]),
+        }
@@ -1,5 +1,3 @@
-import random
-
 import mesa
 import mesa_geo as mg
 
@@ -31,12 +29,22 @@ class Colors:
             return default
 
 
+class SyncedMapModule(mg.visualization.MapModule):
+    """
+    Map that syncs human geometries from the model position store before rendering.
+    """
+
+    def render(self, model):
+        model.sync_geometries()
+        return super().render(model)
+
+
 class Server:
 
     # TODO: rewrite into location ids
-    def __init__(self, locations: list[str | tuple[str, int]]):
-        # Set random seed for reproducibility
-        random.seed(3232211)
+    def __init__(self, locations: list[str | tuple[str, int]], extract: str | None = None):
+        # Master seed of the model random streams, for reproducibility
+        self.seed = 3232211
 
         # Configure OSMnx
         Config.configure_osmnx()
@@ -44,7 +52,7 @@ class Server:
         self.tags = TagsConfig(Config.TAGS_PATH)
         places = AgentPlaces.new(Config.ROUTINES_PATH)
 
-        self.store = OSMPreloader(self.tags, places).preload(locations)
+        self.store = OSMPreloader(self.tags, places, extract=extract).preload(locations)
 
         self.routine_creator = AgentRoutine(
             config_path=Config.ROUTINES_PATH,
@@ -87,7 +95,7 @@ class Server:
             }
 
     def __ui_map(self):
-        return mg.visualization.MapModule(self.__map_renderer, map_width=800, map_height=800)
+        return SyncedMapModule(self.__map_renderer, map_width=800, map_height=800)
 
     def __model_params(self):
         return {
@@ -98,7 +106,9 @@ class Server:
             # UI
             "exposure_distance": 0.000015,  # about 12m
             "infected_percentage": 0.044,
-            "routine_creator": self.routine_creator
+            "routine_creator": self.routine_creator,
+            "engine": TuberculosisSpread.ENGINE_AGENT,
+            "seed": self.seed,
         }
 
     def launch(self, port=8521, open_browser=False):
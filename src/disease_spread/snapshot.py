@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+
+from src.utils.path_finder import PathFinder
+
+
+class Snapshot:
+    """
+    Full state of a `TuberculosisSpread` run in one `.npz` file: population arrays, positions,
+    place points, random stream states, pending births and collected data.
+
+    Written by `TuberculosisSpread.save_snapshot` and restored with `TuberculosisSpread(..., snapshot=...)`.
+    Agents are stored as plain arrays, shapely geometries are rebuilt from the place point coordinates.
+    """
+
+    VERSION = 1
+
+    def __init__(self, meta: dict, arrays: dict[str, np.ndarray]):
+        self.meta = meta
+        self.arrays = arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def group(self, prefix: str) -> dict[str, np.ndarray]:
+        """
+        Arrays saved under `prefix.`, without the prefix.
+        """
+        return {name[len(prefix) + 1:]: values for name, values in self.arrays.items()
+                if name.startswith(f'{prefix}.')}
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Written next to the target first, so a crash while saving never leaves a broken checkpoint
+        temporary_path = f'{path}.tmp.npz'
+        np.savez(temporary_path, meta=np.array(json.dumps(self.meta)), **self.arrays)
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def load(path: str):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in data.files if name != 'meta'}
+
+        if meta.get('version') != Snapshot.VERSION:
+            raise Exception(f'[Snapshot] Unsupported snapshot version: {meta.get("version")}. Expected: {Snapshot.VERSION}')
+        return Snapshot(meta, arrays)
+
+    @staticmethod
+    def read_meta(path: str) -> dict:
+        """
+        Only the metadata, without reading the arrays.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return json.loads(str(data['meta']))
+
+
+class SnapshotLibrary:
+    """
+    Named snapshots, e.g. populations burned in for 10 simulated years, that new runs can start from.
+    """
+
+    FOLDER = 'snapshots'
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory or PathFinder.find(SnapshotLibrary.FOLDER)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f'{name}.npz')
+
+    def names(self) -> list[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(file[:-len('.npz')] for file in os.listdir(self.directory) if file.endswith('.npz'))
+
+    def resolve(self, name_or_path: str) -> str:
+        """
+        Path of a snapshot given by a file path or by a name in the library.
+        """
+        if os.path.exists(name_or_path):
+            return name_or_path
+
+        path = self.path(name_or_path)
+        if not os.path.exists(path):
+            raise Exception(f'[SnapshotLibrary] Unknown snapshot: {name_or_path}. Expected a file path | one of {self.names()}')
+        return path
+
+    def save(self, model, name: str, **extra) -> str:
+        path = self.path(name)
+        model.save_snapshot(path, **extra)
+        return path
+
+    def load(self, name: str) -> Snapshot:
+        return Snapshot.load(self.resolve(name))
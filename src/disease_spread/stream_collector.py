@@ -0,0 +1,181 @@
+import glob
+import os
+
+import pandas as pd
+
+from src.utils.human_state import HumanState
+
+
+class StreamCollector:
+    """
+    Model-level series streamed to CSV or Parquet files in chunks of bounded size, so memory stays
+    constant over any run length and written chunks survive a crash.
+
+    Stocks (humans per state, raion and sector) are sampled at the end of every cadence period,
+    flows (births and deaths) are summed over it. Tables in `directory`:
+        states:  step, humans per state, births, deaths
+        raions:  step, raion, humans per state
+        sectors: step, sector, healthy, infected, dead, total
+    CSV tables are appended to `<table>.csv`, Parquet chunks are written to `<table>/part-<n>.parquet`.
+    """
+
+    CADENCES = ['hour', 'day', 'week']
+    FORMATS = ['csv', 'parquet']
+    TABLES = ['states', 'raions', 'sectors']
+
+    def __init__(self,
+                 directory: str,
+                 cadence: str = 'day',
+                 file_format: str = 'csv',
+                 chunk_rows: int = 10000,
+                 tables: list[str] = ('states', 'raions'),
+                 append: bool = False,
+                 ):
+        """
+        :param chunk_rows: Rows of a table kept in memory before they are written
+        :param append: Continue existing tables (resumed runs) instead of replacing them
+        """
+        if cadence not in StreamCollector.CADENCES:
+            raise Exception(f'[StreamCollector] Invalid cadence value. Expected: {" | ".join(StreamCollector.CADENCES)}')
+        if file_format not in StreamCollector.FORMATS:
+            raise Exception(f'[StreamCollector] Invalid format value. Expected: {" | ".join(StreamCollector.FORMATS)}')
+        for table in tables:
+            if table not in StreamCollector.TABLES:
+                raise Exception(f'[StreamCollector] Unknown table: {table}. Expected: {" | ".join(StreamCollector.TABLES)}')
+
+        self.directory = directory
+        self.cadence = cadence
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.tables = list(tables)
+
+        os.makedirs(directory, exist_ok=True)
+        self.__buffers = {table: {} for table in self.tables}
+        self.__chunks = {table: len(self.__parts(table)) if append else 0 for table in self.tables}
+        if not append:
+            self.__remove_outputs()
+
+        self.__period_steps = None
+        self.__last_step = None
+        self.__total = 0
+        self.__dead = 0
+
+    def __parts(self, table: str) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.directory, table, 'part-*.parquet')))
+
+    def __csv_path(self, table: str) -> str:
+        return os.path.join(self.directory, f'{table}.csv')
+
+    def __remove_outputs(self):
+        for table in self.tables:
+            for path in self.__parts(table) + [self.__csv_path(table)]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def baseline(self, model):
+        """
+        Start counting flows from the current model state without writing a sample, e.g. after a restore.
+        """
+        if self.__period_steps is None:
+            self.__period_steps = {'hour': 1, 'day': model.step_per_day, 'week': 7 * model.step_per_day}[self.cadence]
+        self.__last_step = model.schedule.steps
+        self.__total = model.counters.total
+        self.__dead = model.counters.count(HumanState.Death)
+
+    def collect(self, model):
+        """
+        Called after every model step, writes a sample when the step ends a cadence period.
+        Periods ending inside a fast-forward span are sampled once, with the state at its end.
+        """
+        steps = model.schedule.steps
+        if self.__last_step is None:
+            self.baseline(model)
+        elif steps // self.__period_steps == self.__last_step // self.__period_steps:
+            return
+        self.__sample(model, steps)
+
+    def __sample(self, model, steps: int):
+        counters = model.counters
+        dead = counters.count(HumanState.Death)
+
+        if 'states' in self.__buffers:
+            self.__append('states', {
+                'step': [steps],
+                **{str(state): [counters.by_state[state]] for state in HumanState.all()},
+                # Humans are never removed, so every new human is a birth
+                'births': [counters.total - self.__total],
+                'deaths': [dead - self.__dead],
+            })
+
+        if 'raions' in self.__buffers:
+            raions = list(counters.by_raion.keys())
+            self.__append('raions', {
+                'step': [steps] * len(raions),
+                'raion': raions,
+                **{str(state): [counters.by_raion[raion][state] for raion in raions] for state in HumanState.all()},
+            })
+
+        if 'sectors' in self.__buffers:
+            sector_map = model.update_sector_map()
+            self.__append('sectors', {
+                'step': [steps] * len(sector_map),
+                'sector': [sector.unique_id for sector in sector_map.sectors],
+                'healthy': sector_map.healthy[:len(sector_map)].tolist(),
+                'infected': sector_map.infected[:len(sector_map)].tolist(),
+                'dead': sector_map.dead[:len(sector_map)].tolist(),
+                'total': sector_map.total[:len(sector_map)].tolist(),
+            })
+
+        self.__last_step = steps
+        self.__total = counters.total
+        self.__dead = dead
+
+    def __append(self, table: str, columns: dict[str, list]):
+        buffer = self.__buffers[table]
+        for name, values in columns.items():
+            buffer.setdefault(name, []).extend(values)
+
+        if len(buffer['step']) >= self.chunk_rows:
+            self.__write(table)
+
+    def __write(self, table: str):
+        buffer = self.__buffers[table]
+        if not buffer.get('step'):
+            return
+
+        frame = pd.DataFrame(buffer)
+        if self.file_format == 'csv':
+            path = self.__csv_path(table)
+            frame.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+        else:
+            # Every chunk is a complete file, a crash never leaves a half-written Parquet footer behind
+            os.makedirs(os.path.join(self.directory, table), exist_ok=True)
+            frame.to_parquet(os.path.join(self.directory, table, f'part-{self.__chunks[table]:05d}.parquet'), index=False)
+        self.__chunks[table] += 1
+        self.__buffers[table] = {}
+
+    def flush(self):
+        """
+        Write buffered rows of every table.
+        """
+        for table in self.tables:
+            self.__write(table)
+
+    def close(self):
+        self.flush()
+
+    @staticmethod
+    def read(directory: str, table: str = 'states') -> pd.DataFrame:
+        """
+        Load a table written by a collector. Rows repeated by a run resumed from a checkpoint are dropped.
+        """
+        csv_path = os.path.join(directory, f'{table}.csv')
+        if os.path.exists(csv_path):
+            frame = pd.read_csv(csv_path)
+        elif os.path.isdir(os.path.join(directory, table)):
+            frame = pd.read_parquet(os.path.join(directory, table))
+        else:
+            raise Exception(f'[StreamCollector] No {table} table in {directory}')
+
+        key = {'states': ['step'], 'raions': ['step', 'raion'], 'sectors': ['step', 'sector']}[table]
+        return frame.drop_duplicates(subset=key, keep='last').sort_values(key).reset_index(drop=True)
@@ -10,7 +10,18 @@ class CustomPolygon:
     def __init__(self, location: str | list, match_result: int = 1):
         self.location = location
         self.gdf = ox.geocode_to_gdf(self.location, which_result=match_result)
-        self.polygon = self.gdf.unary_union
+        self.polygon = self.gdf.union_all()
+
+    @staticmethod
+    def from_gdf(location: str, gdf: gpd.GeoDataFrame):
+        """
+        Polygon of an already loaded boundary, without geocoding.
+        """
+        custom_polygon = CustomPolygon.__new__(CustomPolygon)
+        custom_polygon.location = location
+        custom_polygon.gdf = gdf
+        custom_polygon.polygon = gdf.union_all()
+        return custom_polygon
 
     def get_bounds(self):
         return dict(zip(['x_min', 'y_min', 'x_max', 'y_max'], self.polygon.bounds))
@@ -51,66 +62,121 @@ class PolygonUtils:
 
 
     @staticmethod
-    def __filter_dataframe(df: gpd.GeoDataFrame, dict_values: dict) -> gpd.GeoDataFrame:
+    def __filter_columns(df: pd.DataFrame, dict_values: dict) -> dict[str, pd.Series]:
         """
-        Filter dataframe by values in dict_values
-        :param df:
-        :param dict_values:
-        :return:
+        Tag columns with values outside `dict_values` set to NaN, `true` keeps every value.
+        Columns missing in `df` (no feature has the key) are all NaN.
         """
-        for key in dict_values:
-            value = dict_values[key]
+        columns = {}
+        for key, value in dict_values.items():
+            if key not in df.columns:
+                columns[key] = pd.Series(np.nan, index=df.index, dtype=object)
+            elif isinstance(value, bool) and value:
+                columns[key] = df[key]
+            else:
+                columns[key] = df[key].where(df[key].isin(value), np.nan)
+        return columns
 
-            if isinstance(value, bool) and value:
-                continue
-            elif key not in df.columns:
-                continue
-
-            df[key] = df[key].where(df[key].isin(value), np.nan)
-        return df
+    @staticmethod
+    def get_features_geometry_points(polygon, tags: dict) -> gpd.GeoDataFrame:
+        return PolygonUtils.process_features(ox.features_from_polygon(polygon, tags), tags)
 
     @staticmethod
-    def __check_overlap(df: gpd.GeoDataFrame, dict_values: dict) -> gpd.GeoDataFrame:
+    def fetch_features(polygon, tags: dict) -> gpd.GeoDataFrame:
         """
-        Delete rows with any overlaps
-        :param df:
-        :param dict_values:
-        :return:
+        Raw features of `tags` in `polygon` from Overpass.
+        Unlike `ox.features_from_polygon`, which raises `InsufficientResponseError`, no features give an empty frame:
+        a raion without places of some tag gets empty place frames instead of failing the preloader.
         """
-        columns = list(dict_values.keys())
-        overlap_indexes = []
-        for i, row in df.iterrows():
-            non_null_columns = [col for col in columns if pd.notna(row[col])]
-            if len(non_null_columns) > 1:
-                overlap_indexes.append(i)
-
-        df_without_overlap = df.drop(overlap_indexes)
-        return df_without_overlap
+        try:
+            # osmnx does not export its errors publicly
+            from osmnx._errors import InsufficientResponseError
+        except ImportError:
+            # Older osmnx versions raise other errors for empty responses, they are not caught
+            InsufficientResponseError = ()
+
+        try:
+            return ox.features_from_polygon(polygon, tags)
+        except InsufficientResponseError:
+            return gpd.GeoDataFrame(geometry=[], crs=4326)
 
     @staticmethod
-    def get_features_geometry_points(polygon, tags: dict) -> gpd.GeoDataFrame:
-
-        features = ox.features_from_polygon(polygon, tags)
-
-        tags_columns = list(tags.keys())
-
-        features = features[['geometry', *tags_columns]]
-
-        features['representative_point'] = features['geometry'].apply(PolygonUtils.get_representative_point)
+    def union_tags(selections: dict[str, dict]) -> dict:
+        """
+        One selection matching every feature any of `selections` matches, `true` wins over value lists.
+        """
+        union = {}
+        for tags in selections.values():
+            for key, values in tags.items():
+                if values is True or union.get(key) is True:
+                    union[key] = True
+                else:
+                    union[key] = sorted(set(union.get(key, [])) | set(values))
+        return union
 
-        features = features.drop(columns=['geometry'], axis=1)
+    @staticmethod
+    def match_features(features: pd.DataFrame, tags: dict) -> np.ndarray:
+        """
+        Rows with a value of `tags` in any key, the features Overpass returns for `tags`.
+        """
+        matched = np.zeros(len(features), dtype=bool)
+        for key, values in tags.items():
+            if key not in features.columns:
+                continue
+            column = features[key]
+            matched |= (column.notna() if values is True else column.isin(values)).to_numpy()
+        return matched
 
-        features = PolygonUtils.__filter_dataframe(features, tags)
-        features = PolygonUtils.__check_overlap(features, tags)
+    @staticmethod
+    def split_features(features: gpd.GeoDataFrame, selections: dict[str, dict]) -> dict[str, gpd.GeoDataFrame]:
+        """
+        Processed frames of every tag of `selections` from raw features fetched once with their `union_tags`,
+        the same frames as a fetch per tag.
+        """
+        return {
+            tag: PolygonUtils.process_features(features[PolygonUtils.match_features(features, tags)], tags)
+            for tag, tags in selections.items()
+        }
 
-        return features
+    @staticmethod
+    def process_features(features: gpd.GeoDataFrame, tags: dict) -> gpd.GeoDataFrame:
+        """
+        Tag columns and representative points of raw features, values outside `tags` dropped and rows matching
+        more than one column (overlaps) removed. `features` is not modified.
+        """
+        columns = PolygonUtils.__filter_columns(features, tags)
+        points = PolygonUtils.get_representative_points(features.geometry.values)
+
+        # Overlap: more than one tag column set
+        set_columns = np.zeros(len(features), dtype=np.int32)
+        for column in columns.values():
+            set_columns += column.notna().to_numpy()
+        keep = set_columns <= 1
+
+        index = features.index[keep]
+        return gpd.GeoDataFrame(
+            {
+                **{key: column.to_numpy()[keep] for key, column in columns.items()},
+                'representative_point': gpd.GeoSeries(points[keep], index=index, crs=features.crs),
+            },
+            index=index,
+        )
 
     @staticmethod
     def prepare_housing_df(df: gpd.GeoDataFrame | pd.DataFrame, tags: dict) -> gpd.GeoDataFrame:
+        """
+        Tag columns of `tags` merged into a `home` column holding the first set value of every row.
+        Returns a new frame, `df` is shared by the store and is not modified.
+        """
         columns_to_marge = list(tags.keys())
-        df['home'] = df[columns_to_marge].bfill(axis=1).iloc[:, 0]
-        return df.drop(columns=columns_to_marge)
+        values = df[columns_to_marge].to_numpy(dtype=object)
+        is_set = pd.notna(values)
+        home = values[np.arange(len(values)), is_set.argmax(axis=1)]
+        home[~is_set.any(axis=1)] = np.nan
 
+        housing_df = df.drop(columns=columns_to_marge)
+        housing_df['home'] = home
+        return housing_df
 
     @staticmethod
     def save_to_csv(df: gpd.GeoDataFrame | pd.DataFrame, file_name: str):
@@ -126,3 +192,10 @@ class PolygonUtils:
             return geometry
         else:
             return geometry.representative_point()
+
+    @staticmethod
+    def get_representative_points(geometries: np.ndarray) -> np.ndarray:
+        """
+        `get_representative_point` of every geometry at once.
+        """
+        return shapely.point_on_surface(np.asarray(geometries, dtype=object))
@@ -0,0 +1,221 @@
+import os
+import xml.etree.ElementTree as ElementTree
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from src.openstreetmap.custompolygon import CustomPolygon, PolygonUtils
+from src.openstreetmap.tags import TagsConfig
+from src.utils.agent_places import AgentPlaces
+
+
+class OSMExtract:
+    """
+    Raion boundaries and places read from a local `.osm` or `.osm.pbf` extract instead of Nominatim and Overpass.
+
+    The file is streamed once for all raions and places: every element matching any place selection of
+    `tags.yaml` is kept as its representative point and tag values, then split by raion and place with array
+    operations and processed like Overpass results (`PolygonUtils.split_features`).
+    `.osm` files are parsed with the standard library, `.pbf` files need pyosmium (`pip install osmium`).
+
+    Boundaries are `boundary=administrative` areas named like the first part of the location, any of
+    `name`, `name:<language>`, `int_name`, `official_name` or `alt_name`, case-insensitive. `match_result` picks
+    between equally named boundaries in file order. Places belong to the raion that contains their
+    representative point.
+    """
+
+    NAME_KEYS = ['name', 'int_name', 'official_name', 'alt_name']
+
+    def __init__(self, path: str, tags: TagsConfig, places: AgentPlaces):
+        if not os.path.exists(path):
+            raise Exception(f'[OSMExtract] File not found: {path}')
+
+        self.path = path
+        self.selections = {place['tag']: tags[place['tag']] for place in places.raw().values()}
+
+        # Union of every selection: key -> True (any value) or set of values
+        self.__union = {
+            key: values if values is True else set(values)
+            for key, values in PolygonUtils.union_tags(self.selections).items()
+        }
+
+        self.__elements = []
+        self.__ids = []
+        self.__points = []
+        self.__values = {key: [] for key in self.__union}
+        self.__boundaries = {}  # lowercase name -> [(element, id, geometry)]
+        self.__names = set()
+
+    def source(self) -> str:
+        """
+        Identity of the extract for `FeatureCache`, changes when the file is replaced.
+        """
+        stat = os.stat(self.path)
+        return f'{os.path.abspath(self.path)}:{stat.st_size}:{int(stat.st_mtime)}'
+
+    @staticmethod
+    def boundary_name(location: str) -> str:
+        return location.split(',')[0].strip().lower()
+
+    def load(self, locations: list[tuple[str, int]]) -> dict:
+        """
+        :return: Store of `locations`: {location: {'polygon': CustomPolygon, 'places': {tag: GeoDataFrame}}}
+        """
+        self.__names = {OSMExtract.boundary_name(location) for location, _ in locations}
+        print(f'[OSMExtract] Reading {self.path}...')
+        if self.path.endswith('.pbf'):
+            self.__read_pbf()
+        else:
+            self.__read_xml()
+
+        features = pd.DataFrame(self.__values)
+        x, y = (np.array(self.__points, dtype=float).reshape(-1, 2).T)
+        points = shapely.points(x, y)
+        index = pd.MultiIndex.from_arrays([self.__elements, self.__ids], names=['element', 'id'])
+        features.index = index
+        print(f'[OSMExtract] {len(features)} features, {sum(map(len, self.__boundaries.values()))} boundaries')
+
+        store = {}
+        for location, match_result in locations:
+            custom_polygon = self.__boundary(location, match_result)
+            inside = shapely.contains_xy(custom_polygon.polygon, x, y)
+
+            raw = gpd.GeoDataFrame(
+                features[inside],
+                geometry=gpd.GeoSeries(points[inside], index=index[inside], crs=4326),
+            )
+            store[location] = {
+                'polygon': custom_polygon,
+                'places': PolygonUtils.split_features(raw, self.selections),
+            }
+        return store
+
+    def __boundary(self, location: str, match_result: int) -> CustomPolygon:
+        candidates = self.__boundaries.get(OSMExtract.boundary_name(location), [])
+        if len(candidates) < match_result:
+            raise Exception(f'[OSMExtract] Boundary not found: {location} (match {match_result}, '
+                            f'{len(candidates)} found in {self.path})')
+        _, _, geometry = candidates[match_result - 1]
+        return CustomPolygon.from_gdf(location, gpd.GeoDataFrame(geometry=[geometry], crs=4326))
+
+    def __is_selected(self, tags: dict) -> bool:
+        for key, value in tags.items():
+            selected = self.__union.get(key)
+            if selected is True or (selected is not None and value in selected):
+                return True
+        return False
+
+    def __boundary_names(self, tags: dict) -> set[str]:
+        if tags.get('boundary') != 'administrative':
+            return set()
+        names = {
+            value.strip().lower() for key, value in tags.items()
+            if key in OSMExtract.NAME_KEYS or key.startswith('name:')
+        }
+        return names & self.__names
+
+    def __add(self, element: str, osm_id: int, tags: dict, geometry_factory):
+        """
+        Keep an element if a place selection or a requested boundary matches it, geometry is only built then.
+        """
+        selected = self.__is_selected(tags)
+        names = self.__boundary_names(tags)
+        if not selected and not names:
+            return
+
+        try:
+            geometry = geometry_factory()
+        except (RuntimeError, ValueError, KeyError, shapely.errors.ShapelyError):
+            return  # Incomplete geometry at the edge of the extract
+        if geometry is None or geometry.is_empty:
+            return
+
+        if selected:
+            point = PolygonUtils.get_representative_point(geometry)
+            self.__elements.append(element)
+            self.__ids.append(osm_id)
+            self.__points.append((point.x, point.y))
+            for key, values in self.__values.items():
+                values.append(tags.get(key, np.nan))
+        for name in names:
+            self.__boundaries.setdefault(name, []).append((element, osm_id, geometry))
+
+    def __read_pbf(self):
+        try:
+            import osmium
+        except ImportError:
+            raise Exception('[OSMExtract] Reading .pbf files needs pyosmium: pip install osmium')
+
+        wkb_factory = osmium.geom.WKBFactory()
+        processor = osmium.FileProcessor(self.path).with_areas() \
+            .with_filter(osmium.filter.KeyFilter(*self.__union.keys(), 'boundary'))
+
+        for item in processor:
+            if item.is_node():
+                location = item.location
+                self.__add('node', item.id, dict(item.tags), lambda: shapely.Point(location.lon, location.lat))
+            elif item.is_way():
+                # Closed ways are returned again as areas
+                if not item.is_closed():
+                    self.__add('way', item.id, dict(item.tags),
+                               lambda: shapely.from_wkb(wkb_factory.create_linestring(item)))
+            elif item.is_area():
+                element = 'way' if item.from_way() else 'relation'
+                self.__add(element, item.orig_id(), dict(item.tags),
+                           lambda: shapely.from_wkb(wkb_factory.create_multipolygon(item)))
+
+    def __read_xml(self):
+        """
+        Elements of `.osm` files come in order (nodes, ways, relations), so coordinates of every node and node
+        references of every way are kept for the geometries of later elements. Prefer `.pbf` for large extracts.
+        """
+        coordinates = {}
+        way_nodes = {}
+
+        for _, element in ElementTree.iterparse(self.path, events=('end',)):
+            if element.tag not in ('node', 'way', 'relation'):
+                continue
+
+            osm_id = int(element.get('id'))
+            tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+
+            if element.tag == 'node':
+                point = (float(element.get('lon')), float(element.get('lat')))
+                coordinates[osm_id] = point
+                self.__add('node', osm_id, tags, lambda: shapely.Point(point))
+
+            elif element.tag == 'way':
+                nodes = [int(nd.get('ref')) for nd in element.iter('nd')]
+                way_nodes[osm_id] = nodes
+                self.__add('way', osm_id, tags, lambda: OSMExtract.__way_geometry(nodes, coordinates))
+
+            elif tags.get('type') in ('multipolygon', 'boundary'):
+                members = [
+                    (int(member.get('ref')), member.get('role') or 'outer')
+                    for member in element.iter('member') if member.get('type') == 'way'
+                ]
+                self.__add('relation', osm_id, tags,
+                           lambda: OSMExtract.__relation_geometry(members, way_nodes, coordinates))
+
+            element.clear()
+
+    @staticmethod
+    def __way_geometry(nodes: list[int], coordinates: dict):
+        points = [coordinates[node] for node in nodes]
+        if len(points) >= 4 and nodes[0] == nodes[-1]:
+            return shapely.Polygon(points)
+        return shapely.LineString(points)
+
+    @staticmethod
+    def __relation_geometry(members: list[tuple[int, str]], way_nodes: dict, coordinates: dict):
+        rings = {'outer': [], 'inner': []}
+        for way, role in members:
+            if way in way_nodes and role in rings:
+                rings[role].append(shapely.LineString([coordinates[node] for node in way_nodes[way]]))
+
+        outer = shapely.union_all(shapely.get_parts(shapely.polygonize(rings['outer'])))
+        if rings['inner']:
+            outer = outer.difference(shapely.union_all(shapely.get_parts(shapely.polygonize(rings['inner']))))
+        return outer
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from src.openstreetmap.custompolygon import CustomPolygon
+from src.openstreetmap.frame_arrays import FrameArrays
+from src.utils.path_finder import PathFinder
+
+
+class FeatureCache:
+    """
+    Disk cache of what `OSMPreloader` builds: raion boundaries and processed place frames (tag columns and
+    `representative_point`) after filtering and the overlap check.
+
+    Every raion has a folder keyed by its location and match result. Boundaries are stored in `polygon.npz`,
+    frames in `<tag>_<hash>.npz` where the hash covers the tag selection of `tags.yaml`, so editing one tag only
+    invalidates that tag. Entries are the arrays of `FrameArrays`, loading needs no pickle.
+    Delete `cache/features` to fetch everything from OSM again.
+    """
+
+    FOLDER = os.path.join('cache', 'features')
+    VERSION = 2  # Bump when the processing or the arrays of frames change
+
+    def __init__(self, folder: str | None = None, source: str | None = None):
+        """
+        :param source: Where features come from when not Overpass, e.g. `OSMExtract.source()`, entries of
+        different sources never mix
+        """
+        self.folder = folder or PathFinder.find(FeatureCache.FOLDER)
+        self.source = source
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def __digest(value) -> str:
+        return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def __raion_folder(self, location: str, match_result: int) -> str:
+        key = [location, match_result] if self.source is None else [location, match_result, self.source]
+        return os.path.join(self.folder, FeatureCache.__digest(key))
+
+    def polygon_path(self, location: str, match_result: int) -> str:
+        return os.path.join(self.__raion_folder(location, match_result), 'polygon.npz')
+
+    def places_path(self, location: str, match_result: int, tag: str, selection: dict) -> str:
+        digest = FeatureCache.__digest([FeatureCache.VERSION, selection])
+        return os.path.join(self.__raion_folder(location, match_result), f'{tag}_{digest}.npz')
+
+    def __load(self, path: str) -> dict | None:
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            with np.load(path) as cached:
+                data = {key: cached[key] for key in cached.files}
+        except (OSError, ValueError) as error:
+            print(f'[FeatureCache] Ignoring unreadable {path}: {error}')
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    @staticmethod
+    def __save(path: str, arrays: dict):
+        """
+        Write to a temporary file first, an interrupted run never leaves a partial cache entry.
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def load_polygon(self, location: str, match_result: int) -> CustomPolygon | None:
+        data = self.__load(self.polygon_path(location, match_result))
+        return FrameArrays.decode_polygon(location, data) if data is not None else None
+
+    def save_polygon(self, location: str, match_result: int, custom_polygon: CustomPolygon):
+        FeatureCache.__save(self.polygon_path(location, match_result), FrameArrays.encode_polygon(custom_polygon))
+
+    def load_places(self, location: str, match_result: int, tag: str, selection: dict) -> gpd.GeoDataFrame | None:
+        data = self.__load(self.places_path(location, match_result, tag, selection))
+        return FrameArrays.decode_places(data) if data is not None else None
+
+    def save_places(self, location: str, match_result: int, tag: str, selection: dict, df: pd.DataFrame):
+        FeatureCache.__save(self.places_path(location, match_result, tag, selection), FrameArrays.encode_places(df))
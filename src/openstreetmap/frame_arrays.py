@@ -0,0 +1,148 @@
+import json
+import os
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from src.openstreetmap.custompolygon import CustomPolygon
+
+
+class FrameArrays:
+    """
+    Boundaries and place frames as plain NumPy arrays without object dtypes, for `FeatureCache` files and
+    preloader worker payloads. Geometries are WKB, points are coordinates and strings (tag values, index levels)
+    are category codes with their categories. Nothing needs pickle or shapely objects to be read back.
+    """
+
+    @staticmethod
+    def __encode_values(arrays: dict, name: str, values: np.ndarray):
+        if values.dtype != object:
+            arrays[name] = values
+            return
+        codes, categories = pd.factorize(values, use_na_sentinel=True)  # Missing values get -1
+        arrays[f'{name}.codes'] = codes.astype(np.int32)
+        arrays[f'{name}.categories'] = np.asarray(categories, dtype=object).astype(str)
+
+    @staticmethod
+    def __decode_values(arrays: dict, name: str) -> np.ndarray:
+        if name in arrays:
+            return arrays[name]
+        codes = arrays[f'{name}.codes']
+        values = np.full(len(codes), np.nan, dtype=object)
+        is_set = codes >= 0
+        values[is_set] = arrays[f'{name}.categories'].astype(object)[codes[is_set]]
+        return values
+
+    @staticmethod
+    def encode_polygon(custom_polygon: CustomPolygon) -> dict[str, np.ndarray]:
+        gdf = custom_polygon.gdf
+        return {
+            'geometry': shapely.to_wkb(gdf.geometry.values, hex=True).astype(str),
+            'crs': np.array(gdf.crs.to_string() if gdf.crs is not None else 'EPSG:4326'),
+        }
+
+    @staticmethod
+    def decode_polygon(location: str, arrays: dict[str, np.ndarray]) -> CustomPolygon:
+        geometry = shapely.from_wkb(arrays['geometry'])
+        return CustomPolygon.from_gdf(location, gpd.GeoDataFrame(geometry=geometry, crs=str(arrays['crs'])))
+
+    @staticmethod
+    def encode_places(df: pd.DataFrame, prefix: str = '') -> dict[str, np.ndarray]:
+        """
+        :param prefix: Prepended to every array name, several frames can share one set of arrays
+        """
+        columns = [column for column in df.columns if column != 'representative_point']
+        points = np.asarray(df['representative_point'].values, dtype=object)
+        index_frame = df.index.to_frame(index=False)
+
+        arrays = {
+            f'{prefix}meta': np.array(json.dumps({
+                'columns': columns,
+                'index': [str(name) if name is not None else None for name in df.index.names],
+            })),
+            f'{prefix}x': shapely.get_x(points),
+            f'{prefix}y': shapely.get_y(points),
+        }
+        for level in range(index_frame.shape[1]):
+            FrameArrays.__encode_values(arrays, f'{prefix}index.{level}', index_frame.iloc[:, level].to_numpy())
+        for column in columns:
+            FrameArrays.__encode_values(arrays, f'{prefix}column.{column}', df[column].to_numpy())
+        return arrays
+
+    @staticmethod
+    def decode_places(arrays: dict[str, np.ndarray], prefix: str = '') -> gpd.GeoDataFrame:
+        meta = json.loads(str(arrays[f'{prefix}meta']))
+        index_levels = [
+            FrameArrays.__decode_values(arrays, f'{prefix}index.{level}') for level in range(len(meta['index']))
+        ]
+        if len(index_levels) > 1:
+            index = pd.MultiIndex.from_arrays(index_levels, names=meta['index'])
+        else:
+            index = pd.Index(index_levels[0], name=meta['index'][0])
+
+        columns = {
+            column: FrameArrays.__decode_values(arrays, f'{prefix}column.{column}') for column in meta['columns']
+        }
+        points = gpd.GeoSeries(shapely.points(arrays[f'{prefix}x'], arrays[f'{prefix}y']), index=index, crs=4326)
+        return gpd.GeoDataFrame({**columns, 'representative_point': points}, index=index)
+
+
+class SharedArrays:
+    """
+    Arrays handed from a worker process to the parent in one shared memory block, only the block name and the
+    layout go through the result pipe. The parent copies the arrays out and frees the block with `unpack`.
+    """
+
+    ALIGNMENT = 8
+    # `SharedMemory` blocks can be created without the resource tracker since Python 3.13
+    UNTRACKED = {'track': False} if sys.version_info >= (3, 13) else {}
+
+    @staticmethod
+    def pack(arrays: dict[str, np.ndarray]) -> dict:
+        layout = []
+        size = 0
+        for name, values in arrays.items():
+            values = np.asarray(values)
+            if values.dtype == object:
+                raise Exception(f'[SharedArrays] Object arrays can not be shared: {name}')
+            layout.append((name, values.dtype.str, values.shape, size))
+            size += -(-values.nbytes // SharedArrays.ALIGNMENT) * SharedArrays.ALIGNMENT
+
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1), **SharedArrays.UNTRACKED)
+        try:
+            for (_, dtype, shape, offset), values in zip(layout, arrays.values()):
+                np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)[...] = values
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+        memory.close()
+        SharedArrays.__untrack(memory)
+        return {'name': memory.name, 'layout': layout}
+
+    @staticmethod
+    def __untrack(memory: shared_memory.SharedMemory):
+        """
+        The parent frees the block, the resource tracker of the worker must not remove it when the worker exits.
+        Before Python 3.13 every created block is tracked and has to be unregistered. The tracker knows it by
+        its POSIX name, `name` with a leading slash. Windows has no tracker for shared memory.
+        """
+        if SharedArrays.UNTRACKED or os.name != 'posix':
+            return
+        resource_tracker.unregister(f'/{memory.name}', 'shared_memory')
+
+    @staticmethod
+    def unpack(payload: dict) -> dict[str, np.ndarray]:
+        memory = shared_memory.SharedMemory(name=payload['name'])
+        try:
+            return {
+                name: np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset).copy()
+                for name, dtype, shape, offset in payload['layout']
+            }
+        finally:
+            memory.close()
+            memory.unlink()
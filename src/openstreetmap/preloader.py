@@ -1,6 +1,14 @@
 import multiprocessing
+import queue
+import time
+from typing import Callable
+
 import shapely
 from src.openstreetmap.custompolygon import CustomPolygon, PolygonUtils
+from src.openstreetmap.extract import OSMExtract
+from src.openstreetmap.feature_cache import FeatureCache
+from src.openstreetmap.frame_arrays import FrameArrays, SharedArrays
+from src.openstreetmap.request_stats import RequestStats
 from src.openstreetmap.tags import TagsConfig
 from src.utils.agent_places import AgentPlaces
 
@@ -9,32 +17,58 @@ from multiprocessing import Pool
 
 def preload_worker_polygon(args: tuple[str, int]):
     location, match_result = args
-    custom_polygon = OSMPreloader.load_polygon(location, match_result)
+    stats = RequestStats()
+    with stats.record():
+        custom_polygon = OSMPreloader.load_polygon(location, match_result)
     return (
+        'polygon',
         location,
-        custom_polygon
+        FrameArrays.encode_polygon(custom_polygon),
+        stats.state()
     )
 
 
-def preload_worker_place(args :tuple[str, CustomPolygon, str, dict]):
-    location, custom_polygon, tag, tags = args
+def preload_worker_place(args: tuple[str, bytes, dict[str, dict], Callable]):
+    """
+    Places of every tag of `selections` from a single fetch with the union of their selections.
+    Frames are returned as `FrameArrays` in shared memory instead of pickled GeoDataFrames.
+    """
+    location, polygon_wkb, selections, fetcher = args
 
-    result = PolygonUtils.get_features_geometry_points(
-        custom_polygon.polygon,
-        tags
-    )
+    stats = RequestStats()
+    with stats.record():
+        features = fetcher(shapely.from_wkb(polygon_wkb), PolygonUtils.union_tags(selections))
+
+    arrays = {}
+    for tag, df in PolygonUtils.split_features(features, selections).items():
+        arrays.update(FrameArrays.encode_places(df, prefix=f'{tag}/'))
 
     return (
+        'places',
         location,
-        tag,
-        result
+        SharedArrays.pack(arrays),
+        stats.state()
     )
 
 
 class OSMPreloader:
-    def __init__(self, tags: TagsConfig, places: AgentPlaces):
+    def __init__(self, tags: TagsConfig, places: AgentPlaces, use_cache: bool = True, extract: str | None = None,
+                 fetcher: Callable | None = None):
+        """
+        :param use_cache: Load boundaries and processed places from `FeatureCache` and store what was fetched
+        :param extract: Local `.osm` or `.osm.pbf` file read by `OSMExtract` instead of Nominatim and Overpass
+        :param fetcher: Picklable `(polygon, tags) -> raw features`, `PolygonUtils.fetch_features` by default
+        """
         self.tags = tags
         self.places = places
+        self.extract = extract
+        self.fetcher = fetcher or PolygonUtils.fetch_features
+        self.stats = RequestStats()
+        source = OSMExtract(extract, tags, places).source() if extract is not None else None
+        self.cache = FeatureCache(source=source) if use_cache else None
+
+    def __load_extract(self, locations: list[tuple[str, int]]) -> dict:
+        return OSMExtract(self.extract, self.tags, self.places).load(locations)
 
     @staticmethod
     def fix_location(location: str | tuple[str, int]):
@@ -48,33 +82,114 @@ class OSMPreloader:
     def load_polygon(location: str, match_result: int):
         return CustomPolygon(location, match_result)
 
-    def chunk_locations_to_places(self, custom_polygons: list[tuple[str, shapely.Polygon]]):
-        for location, polygon in custom_polygons:
+    def chunk_locations_to_places(self, locations: list[str]):
+        for location in locations:
             for place in self.places.raw().values():
                 tag = place['tag']
-                yield location, polygon, tag, self.tags[tag]
+                yield location, tag, self.tags[tag]
+
+    def __save_polygon(self, result: dict, location: str, match_result: int, custom_polygon: CustomPolygon):
+        result[location]["polygon"] = custom_polygon
+        if self.cache is not None:
+            self.cache.save_polygon(location, match_result, custom_polygon)
+
+    def __save_places(self, result: dict, location: str, match_result: int, frames: dict, selections: dict):
+        for tag, tags in selections.items():
+            result[location]["places"][tag] = frames[tag]
+            if self.cache is not None:
+                self.cache.save_places(location, match_result, tag, tags, frames[tag])
+
+    def __preload_extract(self, result: dict, match_results: dict, missing_polygons: list, missing_places: dict):
+        """
+        Polygons and places missing in the cache from one pass over the extract.
+        """
+        needed = list(dict.fromkeys([location for location, _ in missing_polygons] + list(missing_places)))
+        extracted = self.__load_extract([(location, match_results[location]) for location in needed])
+        for location, match_result in missing_polygons:
+            self.__save_polygon(result, location, match_result, extracted[location]["polygon"])
+        for location, selections in missing_places.items():
+            self.__save_places(result, location, match_results[location], extracted[location]["places"], selections)
+
+    def __preload_pool(self, result: dict, match_results: dict, missing_polygons: list, missing_places: dict):
+        """
+        Polygons and places missing in the cache from one worker pool. Results are handled as soon as a job
+        finishes, and the places of a raion are requested as soon as its polygon is there, so geocoding and
+        feature loading overlap.
+        """
+        total = len(missing_polygons) + len(missing_places)
+        finished = queue.Queue()
+        started = time.perf_counter()
+
+        with Pool(min(multiprocessing.cpu_count(), total)) as pool:
+            def submit(worker, args):
+                pool.apply_async(worker, (args,), callback=finished.put, error_callback=finished.put)
+
+            def submit_places(location):
+                polygon_wkb = shapely.to_wkb(result[location]["polygon"].polygon)
+                submit(preload_worker_place, (location, polygon_wkb, missing_places[location], self.fetcher))
+
+            for job in missing_polygons:
+                submit(preload_worker_polygon, job)
+            for location in missing_places:
+                if result[location]["polygon"] is not None:
+                    submit_places(location)
+
+            for done in range(1, total + 1):
+                item = finished.get()
+                if isinstance(item, BaseException):
+                    raise item
+
+                kind, location, payload, stats = item
+                self.stats.merge(stats)
+                if kind == 'polygon':
+                    custom_polygon = FrameArrays.decode_polygon(location, payload)
+                    self.__save_polygon(result, location, match_results[location], custom_polygon)
+                    if location in missing_places:
+                        submit_places(location)
+                else:
+                    arrays = SharedArrays.unpack(payload)
+                    frames = {
+                        tag: FrameArrays.decode_places(arrays, prefix=f'{tag}/') for tag in missing_places[location]
+                    }
+                    self.__save_places(result, location, match_results[location], frames, missing_places[location])
+
+                print(f'[OSMPreloader] {done}/{total} {kind} of {location} ({time.perf_counter() - started:.1f}s)')
 
     def preload(self, locations: list[str | tuple[str, int]]):
         result = {}  # dict[location, {"polygon": CustomPolygon, "Places": dict[tag, DataFrame]}]
         # 0. fix locations
         locations = [self.fix_location(loc) for loc in locations]
+        match_results = dict(locations)
+        self.stats = RequestStats()
+
+        # 1. Cached polygons and places
+        missing_polygons = []
+        missing_places = {}  # location -> {tag: selection} missing in the cache
+        for location, match_result in locations:
+            custom_polygon = self.cache.load_polygon(location, match_result) if self.cache is not None else None
+            if custom_polygon is None:
+                missing_polygons.append((location, match_result))
+            result[location] = {
+                "polygon": custom_polygon,
+                "places": {}
+            }
 
-        # 1. Preload polygons
-        print('[OSMPreloader] Loading Polygons... ', end='')
-        with Pool(multiprocessing.cpu_count()) as pool:
-            for location, custom_polygon in pool.map(preload_worker_polygon, locations):
-                result[location] = {
-                    "polygon": custom_polygon,
-                    "places": {}
-                }
-
-        # 2. Preload places
-        print('Done!\n[OSMPreloader] Loading Places... ', end='')
-        places_to_preload = self.chunk_locations_to_places([(location, result[location]["polygon"]) for location in result])
-        with Pool(multiprocessing.cpu_count()) as pool:
-            for location, tag, df in pool.map(preload_worker_place, places_to_preload):
+        for location, tag, tags in self.chunk_locations_to_places(list(result)):
+            df = self.cache.load_places(location, match_results[location], tag, tags) if self.cache is not None else None
+            if df is None:
+                missing_places.setdefault(location, {})[tag] = tags
+            else:
                 result[location]["places"][tag] = df
 
+        cached = sum(len(raion["places"]) for raion in result.values())
+        print(f'[OSMPreloader] {len(locations) - len(missing_polygons)} polygons and {cached} places cached')
+
+        # 2. Load the rest
+        if self.extract is not None and (missing_polygons or missing_places):
+            self.__preload_extract(result, match_results, missing_polygons, missing_places)
+        elif missing_polygons or missing_places:
+            self.__preload_pool(result, match_results, missing_polygons, missing_places)
+
         # # DEBUG TAGS & PLACES
         #
         # import pandas as pd
@@ -137,6 +252,8 @@ class OSMPreloader:
         #             *str_res
         #         ]))
 
-        print('Done!')
+        print('[OSMPreloader] Done!')
+        if self.stats.requests():
+            print(f'[OSMPreloader] Fetched {self.stats.summary()}')
 
         return result
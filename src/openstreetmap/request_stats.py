@@ -0,0 +1,57 @@
+import contextlib
+from urllib.parse import urlparse
+
+from osmnx import settings
+
+
+class RequestStats:
+    """
+    HTTP requests osmnx sends (Overpass, Nominatim) and bytes received, per endpoint.
+
+    Counted by a `requests` response hook passed to osmnx through `settings.requests_kwargs`, so responses served
+    from the osmnx cache are not counted. Workers return `state()` and the preloader `merge`s them.
+    """
+
+    def __init__(self):
+        self.endpoints = {}  # host/path -> [requests, bytes]
+
+    def __call__(self, response, *args, **kwargs):
+        url = urlparse(response.url)
+        self.add(f'{url.hostname}{url.path}', len(response.content or b''))
+        return response
+
+    def add(self, endpoint: str, size: int, requests: int = 1):
+        stats = self.endpoints.setdefault(endpoint, [0, 0])
+        stats[0] += requests
+        stats[1] += size
+
+    @contextlib.contextmanager
+    def record(self):
+        """
+        Count requests osmnx sends inside the block.
+        """
+        previous = settings.requests_kwargs
+        hooks = dict(previous.get('hooks') or {})
+        response_hooks = hooks.get('response') or []
+        hooks['response'] = [*(response_hooks if isinstance(response_hooks, list) else [response_hooks]), self]
+        settings.requests_kwargs = {**previous, 'hooks': hooks}
+        try:
+            yield self
+        finally:
+            settings.requests_kwargs = previous
+
+    def state(self) -> dict:
+        return {endpoint: list(stats) for endpoint, stats in self.endpoints.items()}
+
+    def merge(self, state: dict):
+        for endpoint, (requests, size) in state.items():
+            self.add(endpoint, size, requests)
+
+    def requests(self) -> int:
+        return sum(requests for requests, _ in self.endpoints.values())
+
+    def bytes(self) -> int:
+        return sum(size for _, size in self.endpoints.values())
+
+    def summary(self) -> str:
+        return f'{self.requests()} requests, {self.bytes() / 1e6:.2f} MB'
@@ -1,18 +1,21 @@
-import random
-
+import numpy as np
 import pandas as pd
 import shapely
 
 from src.config import Config
 from src.utils.agent_places import AgentPlaces
-from src.utils.random_points import RandomPoint
+from src.utils.routine_table import RoutineTable
 from src.utils.yaml_reader import YamlReader
 
 
 class Routine:
-    def __init__(self, places: dict[str, shapely.Point], routines: dict):
+    def __init__(self, places: dict[str, shapely.Point], routines: dict, rng: np.random.Generator):
+        """
+        :param routines: Configured routines, shared by all humans and never modified
+        """
         self.__places = places
         self.__routines = routines
+        self.__rng = rng
         self.__current_routine = None
         self.__current_age_group = None
         self.__current_day_type = None
@@ -20,13 +23,18 @@ class Routine:
         # Routine not defined for weekday or weekend
         self.__no_day_type_routine = False
 
-    def update(self, age_group, day_type):
+    def update(self, age_group, day_type) -> bool:
+        """
+        :return: Whether a new routine was picked
+        """
         if self.__current_age_group is None or \
                 self.__current_routine is None or \
                 self.__current_age_group != age_group or \
                 self.__current_day_type != day_type:
             # Reset
             self.__reset(age_group, day_type)
+            return True
+        return False
 
     def __reset(self, age_group, day_type):
         self.__no_day_type_routine = False
@@ -40,7 +48,7 @@ class Routine:
         if not routines:
             print(f'[Routine] Missing routines: {age} | {day_type}')
 
-        self.__current_routine = random.choice(routines)
+        self.__current_routine = routines[self.__rng.integers(len(routines))]
         if self.__current_routine is None:
             self.__no_day_type_routine = True
 
@@ -50,6 +58,24 @@ class Routine:
         else:
             self.__no_weekend_routine = True
 
+    def redraws(self) -> bool:
+        """
+        Whether the next `update` picks a routine again although the age group and the day type are the same:
+        a day without routine (`~`) is redrawn on every update.
+        """
+        return self.__current_routine is None
+
+    def places(self) -> dict[str, shapely.Point | list[shapely.Point]]:
+        return self.__places
+
+    def hours(self) -> list[int]:
+        """
+        Hours of the current routine at which the place changes.
+        """
+        if self.__no_day_type_routine or not self.__current_routine:
+            return []
+        return list(self.__current_routine.keys())
+
     def current_place(self, hour):
         if self.__no_day_type_routine:
             return None
@@ -61,7 +87,7 @@ class Routine:
 
         place = self.__current_routine[hour]
         if isinstance(place, list):
-            place = random.choice(place)
+            place = place[self.__rng.integers(len(place))]
 
         return self.__place2point(place)
 
@@ -81,10 +107,14 @@ class AgentRoutine:
         self.__places = AgentPlaces.new(Config.ROUTINES_PATH).raw()
         self.__store = store
         self.__locations = list(store.keys())
+        self.__location_index = pd.Index(self.__locations)
 
+        self.__config_path = config_path
         yaml_reader = YamlReader(config_path)
         self.__routines = yaml_reader.read('routines')
 
+        self.__arrays = {}  # tag -> points of all raions, offsets and counts per raion
+
         # load points for each kind of place
         # for tag in self.__places:
         #
@@ -95,49 +125,118 @@ class AgentRoutine:
         #
         #     self.__dfs[tag] = kwargs[tag]
 
-    def __map_routine(self, amount=1):
-        routines = self.__routines.copy()
-        for age, week in self.__routines.items():
-            for day_type, possible_routines in week.items():
-                if possible_routines is not None:
-                    routines[age][day_type] = random.choices(possible_routines, k=amount)
-
-        return routines
-
-    def __map_place(self, place, raion, home_point: shapely.Point) -> shapely.Point | list[shapely.Point]:
+    def __place_arrays(self, tag: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Points of `tag` of all raions in one array, with the offset and the count of every raion.
+        Built once, the store does not change.
+        """
+        arrays = self.__arrays.get(tag)
+        if arrays is None:
+            frames = [self.__store[location]['places'][tag] for location in self.__locations]
+            counts = np.array([len(df) for df in frames], dtype=np.int64)
+            points = np.empty(counts.sum(), dtype=object)
+            offsets = np.zeros(len(frames), dtype=np.int64)
+            offsets[1:] = np.cumsum(counts)[:-1]
+            for df, offset, count in zip(frames, offsets, counts):
+                points[offset:offset + count] = df['representative_point'].values
+            arrays = self.__arrays[tag] = (points, offsets, counts)
+        return arrays
+
+    @staticmethod
+    def __draw_points(points: np.ndarray, offsets: np.ndarray, counts: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        One random point of every row, None where the raion has no points.
+        """
+        picked = np.full(len(counts), None, dtype=object)
+        has_points = counts > 0
+        picked[has_points] = points[offsets[has_points] + rng.integers(0, counts[has_points])]
+        return picked
+
+    @staticmethod
+    def __draw_distinct(points: np.ndarray, offsets: np.ndarray, counts: np.ndarray, amount: int,
+                        rng: np.random.Generator) -> list[list[shapely.Point] | None]:
+        """
+        `amount` different random points of every row (all of them in smaller raions), drawn for all rows at once
+        with Floyd's algorithm: step `i` draws from the first `count - amount + i + 1` points and takes the last
+        one of them when the draw was already taken.
+        """
+        taken = np.minimum(counts, amount)
+        chosen = np.zeros((len(counts), amount), dtype=np.int64)
+        for step in range(amount):
+            rows = np.flatnonzero(step < taken)
+            last = counts[rows] - taken[rows] + step
+            draws = rng.integers(0, last + 1)
+            repeated = (chosen[rows, :step] == draws[:, None]).any(axis=1)
+            chosen[rows, step] = np.where(repeated, last, draws)
+
+        # Raions without points have no valid offset, the last of them starts at the end of `points`
+        picked = np.full(chosen.shape, None, dtype=object)
+        has_points = taken > 0
+        picked[has_points] = points[offsets[has_points, None] + chosen[has_points]]
+        return [list(row[:count]) if count else None for row, count in zip(picked, taken.tolist())]
+
+    def __draw_places(self, place: dict, raion_codes: np.ndarray, home_points: np.ndarray,
+                      rng: np.random.Generator) -> np.ndarray | list:
         if place['type'] == 'home':
-            return home_point
+            return home_points
+        elif place['type'] not in ('single', 'multiple'):
+            raise Exception('Invalid place type. Expected: home | single | multiple')
 
-        scope = place['scope']
-
-        if place['type'] == 'single':
-            df = self.__find_df_in_scope(place['tag'], raion, scope)
-            return RandomPoint.single(df)
-        elif place['type'] == 'multiple':
+        if place['type'] == 'multiple':
             amount = place['amount']
             if not isinstance(amount, int):
                 raise Exception('Invalid amount type. Expected: int')
             elif amount < 1:
                 raise Exception('Invalid amount value. Expected at least 1')
-            if scope == 'local':
-                return RandomPoint.multiple(self.__store[raion]['places'][place['tag']], amount)
-            elif scope == 'global':
-                for i in range(amount):
-                    df = self.__find_df_in_scope(place['tag'], raion, scope)
-                    return RandomPoint.single(df)
-
-    def __find_df_in_scope(self, tag, raion, scope='local') -> pd.DataFrame:
-        if scope == 'local':
-            return self.__store[raion]['places'][tag]
-        elif scope == 'global':
-            random_raion = random.choice(self.__locations)
-            return self.__store[random_raion]['places'][tag]
-        else:
-            raise Exception('Invalid scope value. Expected: local | global')
 
-    def generate(self, home_point: shapely.Point, raion: str):
-        places = {}  # dict[str, shapely.Point | list[shapely.Point]]
-        for _, place in self.__places.items():
-            places[place['tag']] = self.__map_place(place, raion, home_point)
+        points, offsets, counts = self.__place_arrays(place['tag'])
+        scope = place['scope']
+        if scope == 'global':
+            # One point of a random raion, also for `multiple` places
+            with_points = np.flatnonzero(counts)
+            if not len(with_points):
+                return np.full(len(raion_codes), None, dtype=object)
+            raion_codes = with_points[rng.integers(len(with_points), size=len(raion_codes))]
+            return AgentRoutine.__draw_points(points, offsets[raion_codes], counts[raion_codes], rng)
+        elif scope != 'local':
+            raise Exception('Invalid scope value. Expected: local | global')
 
-        return Routine(places, self.__map_routine())
+        if place['type'] == 'single':
+            return AgentRoutine.__draw_points(points, offsets[raion_codes], counts[raion_codes], rng)
+        return AgentRoutine.__draw_distinct(points, offsets[raion_codes], counts[raion_codes], place['amount'], rng)
+
+    def generate_batch(self, home_points, raions, rng: np.random.Generator) -> list[Routine]:
+        """
+        Pick places and routines of many new humans at once. Places of a kind are drawn for all humans in one pass
+        over the points of every raion. The configured routines are shared, a routine is picked on every reset.
+        :param home_points: Home `shapely.Point` of every human
+        :param raions: Raion of every human, or one raion of all of them
+        """
+        home_points = np.asarray(home_points, dtype=object).reshape(-1)
+        size = len(home_points)
+        if isinstance(raions, str):
+            raions = [raions] * size
+        raion_codes = self.__location_index.get_indexer(list(raions))
+        if len(raion_codes) != size:
+            raise Exception(f'[AgentRoutine] Raions mismatch. Expected: {size} raions')
+        if (raion_codes < 0).any():
+            raise Exception(f'[AgentRoutine] Unknown raion. Expected: {" | ".join(self.__locations)}')
+
+        places = {
+            place['tag']: self.__draw_places(place, raion_codes, home_points, rng)
+            for place in self.__places.values()
+        }
+        tags = list(places)
+        return [Routine(dict(zip(tags, row)), self.__routines, rng) for row in zip(*places.values())]
+
+    def generate(self, home_point: shapely.Point, raion: str, rng: np.random.Generator):
+        """
+        Pick places and routines of a new human. All draws are made from `rng`, which the routine keeps.
+        """
+        return self.generate_batch([home_point], [raion], rng)[0]
+
+    def compile(self) -> RoutineTable:
+        """
+        Routines compiled into a `RoutineTable`, cached on disk.
+        """
+        return RoutineTable.load(self.__config_path, [place['tag'] for place in self.__places.values()])
@@ -1,5 +1,17 @@
-import random
+import numpy as np
 
 
-def get_rand_in_range(min_val, max_val):
-    return random.randint(min_val, max_val)
\ No newline at end of file
+def get_rand_in_range(min_val, max_val, rng: np.random.Generator):
+    return int(rng.integers(min_val, max_val + 1))
+
+
+def choose_weighted(options: list, weights: list, rng: np.random.Generator):
+    """
+    Single weighted choice, like `random.choices(options, weights).pop()`.
+    """
+    threshold = rng.random() * sum(weights)
+    for option, weight in zip(options, weights):
+        threshold -= weight
+        if threshold < 0:
+            return option
+    return options[-1]
@@ -1,6 +1,6 @@
-import random
 from enum import IntEnum
 
+import numpy as np
 import pandas as pd
 
 
@@ -42,6 +42,7 @@ class HumanAgeGroup:
     AGE_CUTS = [-1, 2, 5, 17, 21, 64, 100]
     AGE_OPTIONS = list(range(0, 101))
     AGE_DISTRIBUTIONS = None
+    AGE_CUMULATIVE = None
 
     @staticmethod
     def init(population_file_path: str, age_sum_column: str = 'sum'):
@@ -49,6 +50,7 @@ class HumanAgeGroup:
         total_residence = population_distribution[age_sum_column].sum()
         population_distribution['proportion'] = population_distribution[age_sum_column] / total_residence
         HumanAgeGroup.AGE_DISTRIBUTIONS = population_distribution['proportion'].tolist()
+        HumanAgeGroup.AGE_CUMULATIVE = np.cumsum(HumanAgeGroup.AGE_DISTRIBUTIONS)
 
     @staticmethod
     def set_age_group(age: int):
@@ -66,7 +68,15 @@ class HumanAgeGroup:
         return HumanAge.Elderly
 
     @staticmethod
-    def set_random_init_age():
-        if not HumanAgeGroup:
-            raise '[HumanAgeGroup] Not initialized'
-        return random.choices(HumanAgeGroup.AGE_OPTIONS, HumanAgeGroup.AGE_DISTRIBUTIONS).pop()
+    def set_age_groups(ages: np.ndarray) -> np.ndarray:
+        """
+        Vectorized version of `set_age_group`. Returns an array of `HumanAge` values.
+        """
+        return np.searchsorted(HumanAgeGroup.AGE_CUTS[1:-1], ages, side='left').astype(np.int8) + HumanAge.Newborn
+
+    @staticmethod
+    def set_random_init_age(rng: np.random.Generator):
+        if HumanAgeGroup.AGE_CUMULATIVE is None:
+            raise Exception('[HumanAgeGroup] Not initialized')
+        index = np.searchsorted(HumanAgeGroup.AGE_CUMULATIVE, rng.random() * HumanAgeGroup.AGE_CUMULATIVE[-1], side='right')
+        return HumanAgeGroup.AGE_OPTIONS[min(index, len(HumanAgeGroup.AGE_OPTIONS) - 1)]
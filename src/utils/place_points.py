@@ -0,0 +1,50 @@
+import numpy as np
+import shapely
+
+
+class PlacePoints:
+    """
+    Registry of the place points agents can stand on. Every distinct point gets an integer id,
+    so positions can be kept as ids and resolved to coordinates with an array gather.
+    """
+
+    def __init__(self):
+        self.__ids = {}
+        self.__points = []
+        self.__x = []
+        self.__y = []
+        self.__arrays = None
+
+    def __len__(self):
+        return len(self.__points)
+
+    def id(self, point: shapely.Point) -> int:
+        key = (point.x, point.y)
+        point_id = self.__ids.get(key)
+        if point_id is None:
+            point_id = len(self.__points)
+            self.__ids[key] = point_id
+            self.__points.append(point)
+            self.__x.append(point.x)
+            self.__y.append(point.y)
+            self.__arrays = None
+        return point_id
+
+    def ids(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Ids of points given by coordinates, e.g. received from another process. Unknown points are registered.
+        """
+        ids = np.empty(len(x), dtype=np.int32)
+        for i, key in enumerate(zip(np.asarray(x).tolist(), np.asarray(y).tolist())):
+            point_id = self.__ids.get(key)
+            ids[i] = self.id(shapely.Point(key)) if point_id is None else point_id
+        return ids
+
+    def point(self, point_id: int) -> shapely.Point:
+        return self.__points[point_id]
+
+    def coordinates(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self.__arrays is None:
+            self.__arrays = (np.array(self.__x, dtype=np.float64), np.array(self.__y, dtype=np.float64))
+        x, y = self.__arrays
+        return x[ids], y[ids]
@@ -1,9 +1,9 @@
 class RandomPoint:
     @staticmethod
-    def single(geo_df):
-        rows = geo_df.sample(n=1).iloc
+    def single(geo_df, rng=None):
+        rows = geo_df.sample(n=1, random_state=rng).iloc
         return rows[0].representative_point
 
     @staticmethod
-    def multiple(geo_df, amount):
-        return list(geo_df.sample(n=amount)['representative_point'])
\ No newline at end of file
+    def multiple(geo_df, amount, rng=None):
+        return list(geo_df.sample(n=amount, random_state=rng)['representative_point'])
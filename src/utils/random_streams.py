@@ -0,0 +1,79 @@
+import zlib
+
+import numpy as np
+
+
+class RandomStreams:
+    """
+    Independent NumPy random streams derived from one master seed with `SeedSequence`.
+
+    `stream(name)` is a generator per subsystem, for draws made in a fixed sequential order
+    (initialization, births, the agent engine).
+    `uniform(name, step, indexes)` gives per-agent draws for the vectorized engine. A draw depends only
+    on (name, step, agent index, key) through a stream per block of agents, so results are the same whether
+    the population is stepped at once, in batches or split across worker processes.
+    """
+
+    BLOCK_SIZE = 4096
+
+    def __init__(self, seed: int | None = None):
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self.__streams = {}
+
+    @staticmethod
+    def __name_key(name: str) -> int:
+        # `hash()` of strings differs between processes, crc32 does not
+        return zlib.crc32(name.encode())
+
+    def __generator(self, *spawn_key) -> np.random.Generator:
+        return np.random.Generator(np.random.PCG64(np.random.SeedSequence(self.seed, spawn_key=spawn_key)))
+
+    def stream(self, name: str) -> np.random.Generator:
+        if name not in self.__streams:
+            self.__streams[name] = self.__generator(RandomStreams.__name_key(name))
+        return self.__streams[name]
+
+    def state(self) -> dict:
+        """
+        Seed and positions of the generators created so far, JSON serializable.
+        """
+        return {
+            'seed': self.seed,
+            'streams': {name: stream.bit_generator.state for name, stream in self.__streams.items()},
+        }
+
+    def set_state(self, state: dict):
+        """
+        Restore `state()`. Generators are updated in place, so references to them stay valid.
+        """
+        self.seed = state['seed']
+        for name, stream in self.__streams.items():
+            if name not in state['streams']:
+                stream.bit_generator.state = self.__generator(RandomStreams.__name_key(name)).bit_generator.state
+        for name, stream_state in state['streams'].items():
+            self.stream(name).bit_generator.state = stream_state
+
+    def uniform(self, name: str, step: int, indexes: np.ndarray, keys: np.ndarray | int = 0) -> np.ndarray:
+        """
+        Draws in [0, 1) for every agent of `indexes`.
+        :param keys: Separates several draws of the same agent in one step, scalar or one per index
+        """
+        indexes = np.asarray(indexes, dtype=np.int64)
+        draws = np.empty(len(indexes), dtype=np.float64)
+        if len(indexes) == 0:
+            return draws
+
+        keys = np.broadcast_to(np.asarray(keys, dtype=np.int64), indexes.shape)
+        blocks = indexes // RandomStreams.BLOCK_SIZE
+        offsets = indexes % RandomStreams.BLOCK_SIZE
+
+        groups, group = np.unique(np.stack([blocks, keys]), axis=1, return_inverse=True)
+        order = np.argsort(group.ravel(), kind='stable')
+        bounds = np.cumsum(np.bincount(group.ravel(), minlength=groups.shape[1]))[:-1]
+
+        name_key = RandomStreams.__name_key(name)
+        for (block, key), members in zip(groups.T.tolist(), np.split(order, bounds)):
+            block_draws = self.__generator(name_key, step, block, key).random(RandomStreams.BLOCK_SIZE)
+            draws[members] = block_draws[offsets[members]]
+
+        return draws
@@ -0,0 +1,143 @@
+import hashlib
+import os
+
+import numpy as np
+
+from src.utils.human_age import HumanAge
+from src.utils.path_finder import PathFinder
+from src.utils.yaml_reader import YamlReader
+
+
+class RoutineTable:
+    """
+    Routines compiled into a dense table indexed by (age group, day type, routine variant, hour).
+    Every cell holds a place slot (index in `places`), `STAY`, or a list of places to pick from: cells at or below
+    `CHOICE` index `choices` with `CHOICE - cell`.
+    """
+
+    STAY = -1
+    CHOICE = -2
+    HOURS = 24
+    DAY_TYPES = ['weekday', 'weekend']
+    CACHE_FOLDER = 'cache'
+    # Part of the cache key, changes with the cached arrays
+    VERSION = 2
+
+    def __init__(self, places: list[str], table: np.ndarray, variants: np.ndarray, empty: np.ndarray,
+                 choices: np.ndarray):
+        self.places = places
+        self.table = table  # (age group, day type, variant, hour)
+        self.variants = variants  # (age group, day type) -> amount of variants
+        self.empty = empty  # (age group, day type, variant) -> day without routine (`~`)
+        self.choices = choices  # (choice, option) -> place slot, lists shorter than the longest end with `STAY`
+        self.choice_counts = np.count_nonzero(choices != RoutineTable.STAY, axis=1)
+        self.__transition_in = None
+
+    def slot(self, tag: str) -> int:
+        return self.places.index(tag)
+
+    @staticmethod
+    def compile(routines: dict, places: list[str]):
+        ages = list(HumanAge)
+        max_variants = max(
+            len(routines[str(age).lower()][day_type] or [None])
+            for age in ages for day_type in RoutineTable.DAY_TYPES
+        )
+
+        table = np.full((len(ages), len(RoutineTable.DAY_TYPES), max_variants, RoutineTable.HOURS),
+                        RoutineTable.STAY, dtype=np.int16)
+        variants = np.zeros((len(ages), len(RoutineTable.DAY_TYPES)), dtype=np.int16)
+        empty = np.zeros((len(ages), len(RoutineTable.DAY_TYPES), max_variants), dtype=bool)
+        choices = {}  # Lists of place slots -> choice number
+
+        for age_index, age in enumerate(ages):
+            for day_index, day_type in enumerate(RoutineTable.DAY_TYPES):
+                possible_routines = routines[str(age).lower()][day_type] or [None]
+                variants[age_index, day_index] = len(possible_routines)
+
+                for variant, routine in enumerate(possible_routines):
+                    # `~` is a valid variant: no routine for the day
+                    empty[age_index, day_index, variant] = routine is None
+                    for hour, place in (routine or {}).items():
+                        options = place if isinstance(place, list) else [place]
+                        for option in options:
+                            if option not in places:
+                                raise Exception(f'[RoutineTable] Invalid place: {option}')
+                        slots = tuple(places.index(option) for option in options)
+
+                        if len(slots) == 1:
+                            table[age_index, day_index, variant, hour] = slots[0]
+                        else:
+                            choice = choices.setdefault(slots, len(choices))
+                            table[age_index, day_index, variant, hour] = RoutineTable.CHOICE - choice
+
+        choice_table = np.full((len(choices), max([len(slots) for slots in choices], default=1)),
+                               RoutineTable.STAY, dtype=np.int16)
+        for slots, choice in choices.items():
+            choice_table[choice, :len(slots)] = slots
+
+        return RoutineTable(places, table, variants, empty, choice_table)
+
+    @staticmethod
+    def load(config_path: str, places: list[str]):
+        """
+        Compile routines from `config_path`, or load them from the disk cache keyed by the file hash.
+        """
+        with open(config_path, 'rb') as file:
+            key = file.read() + '|'.join([*places, str(RoutineTable.VERSION)]).encode()
+            digest = hashlib.sha256(key).hexdigest()[:16]
+
+        cache_path = PathFinder.find(os.path.join(RoutineTable.CACHE_FOLDER, f'routines_{digest}.npz'))
+        if os.path.exists(cache_path):
+            cached = np.load(cache_path)
+            return RoutineTable(places, cached['table'], cached['variants'], cached['empty'], cached['choices'])
+
+        routine_table = RoutineTable.compile(YamlReader(config_path).read('routines'), places)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        np.savez(cache_path, table=routine_table.table, variants=routine_table.variants, empty=routine_table.empty,
+                 choices=routine_table.choices)
+        return routine_table
+
+    def slots(self, age_groups: np.ndarray, day_types: np.ndarray, variants: np.ndarray, hours: np.ndarray):
+        """
+        Cell of every agent for the given hour: a place slot, `STAY` if the agent does not move, or a list of
+        places to `choose` from.
+        """
+        return self.table[age_groups - HumanAge.Newborn, day_types, variants, hours]
+
+    def choose(self, cells: np.ndarray, uniform: np.ndarray) -> np.ndarray:
+        """
+        A random place slot of every list of places in `cells`, `uniform` are draws in [0, 1).
+        """
+        choices = RoutineTable.CHOICE - cells
+        return self.choices[choices, (uniform * self.choice_counts[choices]).astype(np.int64)]
+
+    def redraws(self, age_groups: np.ndarray, day_types: np.ndarray, variants: np.ndarray) -> np.ndarray:
+        """
+        Whether every agent picks a routine again on the next step, like `Routine.update` does for a day without
+        routine (`~`). Days with `~` as their only variant are left out, they would pick it again.
+        """
+        groups = age_groups - HumanAge.Newborn
+        return self.empty[groups, day_types, variants] & (self.variants[groups, day_types] > 1)
+
+    def draw_variants(self, age_groups: np.ndarray, day_types: np.ndarray, uniform: np.ndarray):
+        """
+        Pick a random routine variant for every agent, `uniform` are draws in [0, 1).
+        """
+        amounts = self.variants[age_groups - HumanAge.Newborn, day_types]
+        return (uniform * amounts).astype(np.int16)
+
+    def steps_to_transition(self, age_groups: np.ndarray, day_types: np.ndarray, variants: np.ndarray,
+                            hours: np.ndarray) -> np.ndarray:
+        """
+        Steps from `hours` until the next hour with a routine transition, `HOURS` if the routine has none.
+        """
+        if self.__transition_in is None:
+            moves = self.table != RoutineTable.STAY
+            transition_in = np.full(self.table.shape, RoutineTable.HOURS, dtype=np.int16)
+            # Nearest transition first, so it overwrites the later ones
+            for steps in range(RoutineTable.HOURS, 0, -1):
+                transition_in[np.roll(moves, -steps, axis=-1)] = steps
+            self.__transition_in = transition_in
+
+        return self.__transition_in[age_groups - HumanAge.Newborn, day_types, variants, hours]
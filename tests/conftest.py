@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.config import Config
+from src.disease_spread.model import TuberculosisSpread
+from src.openstreetmap.tags import TagsConfig
+from src.utils.agent_routines import AgentRoutine
+from tests.stores import make_store
+
+
+@pytest.fixture(scope='session')
+def tags():
+    return TagsConfig(Config.TAGS_PATH)
+
+
+@pytest.fixture(scope='session')
+def store(tags):
+    return make_store(300, tags)
+
+
+@pytest.fixture(scope='session')
+def model_factory(store, tags):
+    """
+    Models on the synthetic store with a new routine creator each, so runs do not share random state.
+    """
+    def create(exposure_distance=0.0003, infected_percentage=5, contacts='grid', seed=3, **kwargs):
+        routine_creator = AgentRoutine(config_path=Config.ROUTINES_PATH, store=store)
+        return TuberculosisSpread(store, tags, exposure_distance, infected_percentage, routine_creator,
+                                  contacts=contacts, seed=seed, **kwargs)
+
+    return create
+
+
+def run(model, steps: int) -> list[dict]:
+    """
+    Step `model` and collect the counts by state and by (age group, state) after every step.
+    """
+    rows = []
+    for _ in range(steps):
+        model.step()
+        rows.append({
+            'state': dict(model.counters.by_state),
+            'age_group': {group: dict(states) for group, states in model.counters.by_age_group.items()},
+        })
+    return rows
+
+
+def near(model, agent, distance: float) -> set[str]:
+    """
+    Ids of the humans within `distance` of the current position of `agent`, by a scan of all positions.
+    """
+    x, y = model.positions.coordinates()
+    slot = agent.position_slot
+    close = np.hypot(x - x[slot], y - y[slot]) <= distance
+    return {model.positions.agents[slot].unique_id for slot in np.flatnonzero(close).tolist()}
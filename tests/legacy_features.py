@@ -0,0 +1,81 @@
+"""
+Row-wise feature post-processing from before the array rewrite of `PolygonUtils`, kept as the reference
+of its results, and raw feature frames shaped like `ox.features_from_polygon` results.
+"""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from src.openstreetmap.custompolygon import PolygonUtils
+from tests.stores import tag_values
+
+OTHER_VALUE = 'yes'  # Value outside most selections, dropped by the filter
+BUILDING_SIZE = 0.0001  # degrees
+
+
+def make_features(size: int, tags: dict, rng: np.random.Generator) -> gpd.GeoDataFrame:
+    """
+    Raw features of one tag: polygons, points and lines with one tag column set per row, some with values outside
+    the selection and some with a second column set (overlaps).
+    """
+    centers = rng.random((size, 2)) * 0.02
+    kinds = rng.choice(['polygon', 'point', 'line'], size, p=[0.7, 0.2, 0.1])
+
+    half = BUILDING_SIZE / 2
+    geometry = shapely.points(centers)
+    polygons = kinds == 'polygon'
+    geometry[polygons] = shapely.box(*(centers[polygons] - half).T, *(centers[polygons] + half).T)
+    lines = kinds == 'line'
+    geometry[lines] = shapely.linestrings(np.stack([centers[lines] - half, centers[lines] + half], axis=1))
+
+    pairs = tag_values(tags)
+    columns = {key: np.full(size, None, dtype=object) for key in tags}
+    for row, pair in enumerate(rng.integers(0, len(pairs), size)):
+        key, value = pairs[pair]
+        columns[key][row] = OTHER_VALUE if rng.random() < 0.2 else value
+    if len(tags) > 1:
+        for row in np.flatnonzero(rng.random(size) < 0.05):
+            key, value = pairs[rng.integers(len(pairs))]
+            columns[key][row] = value
+
+    index = pd.MultiIndex.from_arrays(
+        [np.where(kinds == 'point', 'node', 'way'), np.arange(size)], names=['element', 'id']
+    )
+    return gpd.GeoDataFrame({**columns, 'name': 'feature'}, geometry=geometry, index=index, crs=4326)
+
+
+def process_features(features: gpd.GeoDataFrame, tags: dict) -> gpd.GeoDataFrame:
+    features = features[['geometry', *tags.keys()]]
+    features['representative_point'] = features['geometry'].apply(PolygonUtils.get_representative_point)
+    features = features.drop(columns=['geometry'])
+
+    for key, value in tags.items():
+        if isinstance(value, bool) and value:
+            continue
+        features[key] = features[key].where(features[key].isin(value), np.nan)
+
+    overlap_indexes = []
+    for i, row in features.iterrows():
+        if len([column for column in tags if pd.notna(row[column])]) > 1:
+            overlap_indexes.append(i)
+    return features.drop(overlap_indexes)
+
+
+def prepare_housing_df(df: gpd.GeoDataFrame, tags: dict) -> gpd.GeoDataFrame:
+    df = df.copy()
+    df['home'] = df[list(tags)].bfill(axis=1).iloc[:, 0]
+    return df.drop(columns=list(tags))
+
+
+def same_frames(legacy: pd.DataFrame, new: pd.DataFrame) -> bool:
+    if not legacy.index.equals(new.index) or list(legacy.columns) != list(new.columns):
+        return False
+    for column in legacy.columns:
+        if column == 'representative_point':
+            if not shapely.equals(np.asarray(legacy[column].values), np.asarray(new[column].values)).all():
+                return False
+        elif not legacy[column].isna().equals(new[column].isna()) or \
+                not (legacy[column].dropna() == new[column].dropna()).all():
+            return False
+    return True
@@ -0,0 +1,81 @@
+"""
+Small synthetic stores in the shape `OSMPreloader.preload` returns, so the model runs without osmnx:
+    {raion: {'polygon': CustomPolygon, 'places': {tag: GeoDataFrame}}}
+
+Raions are square polygons side by side, split into sectors. Every place frame has the tag columns of `tags.yaml`,
+one of them set per row, and a `representative_point` column.
+"""
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from src.config import Config
+from src.openstreetmap.custompolygon import CustomPolygon
+from src.openstreetmap.mapping.housing import HOUSING_MAPPING
+from src.utils.agent_places import AgentPlaces
+
+RAION_SIZE = 0.02  # degrees
+SECTORS_PER_SIDE = 2
+PLACES_PER_TAG = 5
+TAG_VALUE = 'yes'  # Value of tag columns set to `true` in `tags.yaml`
+
+
+def tag_values(tags: dict) -> list[tuple[str, str]]:
+    """
+    Every (column, value) pair a place of the tag can have.
+    """
+    pairs = []
+    for column, values in tags.items():
+        if isinstance(values, list):
+            pairs += [(column, value) for value in values]
+        else:
+            pairs.append((column, TAG_VALUE))
+    return pairs
+
+
+def make_places(tags: dict, points: np.ndarray, values: list[tuple[str, str]]) -> gpd.GeoDataFrame:
+    columns = {column: np.full(len(points), None, dtype=object) for column in tags}
+    for row, (column, value) in enumerate(values):
+        columns[column][row] = value
+
+    return gpd.GeoDataFrame({
+        **columns,
+        'representative_point': gpd.GeoSeries(shapely.points(points), crs=4326),
+    })
+
+
+def make_store(agents: int, tags, raions: int = 2, seed: int = 1) -> dict:
+    """
+    Store with about `agents` humans split evenly across `raions`.
+    """
+    rng = np.random.default_rng(seed)
+    places = AgentPlaces.new(Config.ROUTINES_PATH)
+
+    store = {}
+    for number in range(raions):
+        name = f'Test Raion {number}'
+        origin = np.array([number * RAION_SIZE, 0.0])
+
+        pairs = [pair for pair in tag_values(tags['home']) if pair[1] in HOUSING_MAPPING]
+        homes = []
+        while sum(HOUSING_MAPPING[value] for _, value in homes) < agents // raions:
+            homes.append(pairs[rng.integers(len(pairs))])
+
+        raion_places = {}
+        for place in places:
+            tag = place['tag']
+            values = homes if tag == 'home' else \
+                [tag_values(tags[tag])[0]] * PLACES_PER_TAG
+            raion_places[tag] = make_places(tags[tag], origin + rng.random((len(values), 2)) * RAION_SIZE, values)
+
+        size = RAION_SIZE / SECTORS_PER_SIDE
+        sectors = [
+            shapely.box(*(origin + [i * size, j * size]), *(origin + [(i + 1) * size, (j + 1) * size]))
+            for i in range(SECTORS_PER_SIDE) for j in range(SECTORS_PER_SIDE)
+        ]
+        store[name] = {
+            'polygon': CustomPolygon.from_gdf(name, gpd.GeoDataFrame(geometry=sectors, crs=4326)),
+            'places': raion_places,
+        }
+
+    return store
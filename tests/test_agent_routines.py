@@ -0,0 +1,42 @@
+import numpy as np
+import shapely
+
+from src.utils.agent_routines import AgentRoutine
+
+draw_distinct = AgentRoutine._AgentRoutine__draw_distinct
+
+
+def test_draw_distinct_returns_distinct_points():
+    counts = np.array([10, 3, 1, 4])
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    points = np.array(shapely.points(np.arange(counts.sum()), 0), dtype=object)
+    rng = np.random.default_rng(0)
+
+    for _ in range(200):
+        rows = draw_distinct(points, offsets, counts, 3, rng)
+        for row, offset, count in zip(rows, offsets, counts):
+            assert len(row) == min(count, 3)
+            assert len({point.x for point in row}) == len(row)
+            assert all(offset <= point.x < offset + count for point in row)
+
+
+def test_draw_distinct_is_uniform():
+    counts = np.array([6])
+    points = np.array(shapely.points(np.arange(6), 0), dtype=object)
+    rng = np.random.default_rng(0)
+
+    hits = np.zeros(6)
+    for _ in range(3000):
+        for point in draw_distinct(points, np.array([0]), counts, 2, rng)[0]:
+            hits[int(point.x)] += 1
+    assert np.allclose(hits / 3000, 2 / 6, atol=0.04)
+
+
+def test_draw_distinct_with_empty_raion_last():
+    counts = np.array([5, 0])
+    points = np.array(shapely.points(np.arange(5), 0), dtype=object)
+    offsets = np.array([0, 5])
+
+    first, second = draw_distinct(points, offsets, counts, 3, np.random.default_rng(0))
+    assert len({point.x for point in first}) == 3
+    assert second is None
@@ -0,0 +1,49 @@
+"""
+The engines draw infections from different random streams, so their counts are compared exactly with nobody
+infected, and as means over seeds with infections on.
+A short year makes the comparison cover aging and natural deaths.
+"""
+import numpy as np
+
+from src.utils.human_state import HumanState
+from tests.conftest import run
+
+DISEASE_PARAMETERS = {'year_in_steps': 24, 'lifespan_years': 40}
+SEEDS = range(5)
+SPREAD_STATES = [HumanState.Sustainable, HumanState.Latent, HumanState.PrimaryTuberculosis]
+
+
+def test_agent_and_vectorized_counts_are_equal(model_factory):
+    agent = model_factory(infected_percentage=0, engine='agent', disease_parameters=DISEASE_PARAMETERS)
+    vectorized = model_factory(infected_percentage=0, engine='vectorized', disease_parameters=DISEASE_PARAMETERS)
+
+    agent_rows, vectorized_rows = run(agent, 240), run(vectorized, 240)
+    assert agent_rows == vectorized_rows
+    assert agent_rows[0]['state'] != agent_rows[-1]['state']
+
+
+def final_counts(model_factory, engine: str, steps: int = 150) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Counts of `SPREAD_STATES` after the first step and after `steps`, one row per seed.
+    """
+    first, last = [], []
+    for seed in SEEDS:
+        model = model_factory(exposure_distance=0.003, infected_percentage=20, engine=engine, seed=seed)
+        rows = run(model, steps)
+        first.append([rows[0]['state'][state] for state in SPREAD_STATES])
+        last.append([rows[-1]['state'][state] for state in SPREAD_STATES])
+    return np.array(first), np.array(last)
+
+
+def test_agent_and_vectorized_spread_agree(model_factory):
+    agent_first, agent = final_counts(model_factory, 'agent')
+    _, vectorized = final_counts(model_factory, 'vectorized')
+
+    # The disease spreads in both engines
+    healthy = SPREAD_STATES.index(HumanState.Sustainable)
+    assert (agent[:, healthy] < agent_first[:, healthy]).all()
+    assert (vectorized[:, healthy] < agent_first[:, healthy]).all()
+
+    # Means over seeds agree within 3 standard errors of their difference, plus one agent
+    error = np.sqrt((agent.var(axis=0, ddof=1) + vectorized.var(axis=0, ddof=1)) / len(SEEDS))
+    assert (np.abs(agent.mean(axis=0) - vectorized.mean(axis=0)) <= 3 * error + 1).all()
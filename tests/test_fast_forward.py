@@ -0,0 +1,31 @@
+"""
+Fast-forward compounds infection chances over the merged steps, so it equals hourly stepping only without
+infection by contact. Infected humans still go through their disease timers.
+"""
+import numpy as np
+
+DISEASE_PARAMETERS = {'IR_constant': 0, 'year_in_steps': 240}
+
+
+def advance(model, steps: int) -> int:
+    calls = 0
+    while model.schedule.steps < steps:
+        model.step(max_steps=steps - model.schedule.steps)
+        calls += 1
+    return calls
+
+
+def test_fast_forward_equals_hourly_steps(model_factory):
+    steps = 1000
+    hourly = model_factory(infected_percentage=20, engine='vectorized', disease_parameters=DISEASE_PARAMETERS)
+    fast = model_factory(infected_percentage=20, engine='vectorized', disease_parameters=DISEASE_PARAMETERS,
+                         fast_forward=True)
+
+    assert advance(hourly, steps) == steps
+    assert advance(fast, steps) < steps
+    assert fast.schedule.steps == steps
+
+    assert hourly.datacollector.get_model_vars_dataframe().equals(fast.datacollector.get_model_vars_dataframe())
+    fast_state = fast.population.state()
+    for name, values in hourly.population.state().items():
+        assert np.array_equal(values, fast_state[name]), name
@@ -0,0 +1,20 @@
+import numpy as np
+
+from src.openstreetmap.custompolygon import PolygonUtils
+from tests import legacy_features
+
+
+def test_process_features_equals_legacy_pipeline(tags):
+    rng = np.random.default_rng(42)
+    for tag in ['home', 'work', 'school']:
+        features = legacy_features.make_features(2000, tags[tag], rng)
+        original = features.copy()
+
+        legacy = legacy_features.process_features(features, tags[tag])
+        new = PolygonUtils.process_features(features, tags[tag])
+        if tag == 'home':
+            legacy = legacy_features.prepare_housing_df(legacy, tags[tag])
+            new = PolygonUtils.prepare_housing_df(new, tags[tag])
+
+        assert legacy_features.same_frames(legacy, new), tag
+        assert features.equals(original), tag
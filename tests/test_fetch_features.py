@@ -0,0 +1,18 @@
+import osmnx as ox
+from osmnx._errors import InsufficientResponseError
+
+from src.openstreetmap.custompolygon import PolygonUtils
+
+
+def test_no_features_give_empty_place_frames(tags, monkeypatch):
+    def no_features(polygon, query):
+        raise InsufficientResponseError('No matching features')
+
+    monkeypatch.setattr(ox, 'features_from_polygon', no_features)
+    selections = {tag: tags[tag] for tag in ['home', 'work']}
+    features = PolygonUtils.fetch_features(None, PolygonUtils.union_tags(selections))
+    assert features.empty
+
+    for tag, frame in PolygonUtils.split_features(features, selections).items():
+        assert frame.empty, tag
+        assert 'representative_point' in frame.columns, tag
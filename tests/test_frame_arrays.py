@@ -0,0 +1,25 @@
+import multiprocessing
+
+import numpy as np
+
+from src.openstreetmap.frame_arrays import SharedArrays
+
+
+def arrays() -> dict[str, np.ndarray]:
+    return {
+        'x': np.linspace(0, 1, 1001),
+        'codes': np.arange(7, dtype=np.int32),
+        'categories': np.array(['home', 'work', 'school']),
+        'empty': np.empty(0, dtype=np.int64),
+    }
+
+
+def test_arrays_packed_by_a_worker_are_unpacked_by_the_parent():
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        payload = pool.apply(SharedArrays.pack, (arrays(),))
+        # The block outlives the worker's task, the parent frees it
+        unpacked = SharedArrays.unpack(payload)
+
+    for name, values in arrays().items():
+        assert unpacked[name].dtype == values.dtype
+        assert np.array_equal(unpacked[name], values)
@@ -0,0 +1,44 @@
+import pytest
+
+from tests.conftest import near
+
+
+@pytest.mark.parametrize('engine', ['agent', 'vectorized'])
+def test_geospace_contacts_follow_moves(model_factory, engine):
+    model = model_factory(contacts='geospace', engine=engine)
+    homes = model.positions.place[:len(model.positions)].copy()
+    moved = False
+    while model.schedule.steps < 12:
+        model.step()
+        model.sync_geometries()
+        moved = moved or (model.positions.place[:len(homes)] != homes).any()
+
+        distance = model.exposure_distance
+        for human in model.humans()[::7]:
+            ids = {neighbor.unique_id for neighbor in model.get_contacts(human)}
+            assert near(model, human, distance * 0.99) <= ids <= near(model, human, distance * 1.01)
+    assert moved
+
+
+def test_geospace_and_grid_contacts_give_the_same_run(model_factory):
+    geospace = model_factory(contacts='geospace', engine='vectorized', infected_percentage=20)
+    grid = model_factory(contacts='grid', engine='vectorized', infected_percentage=20)
+    for _ in range(48):
+        geospace.step()
+        grid.step()
+
+    data = geospace.datacollector.get_model_vars_dataframe()
+    assert data.equals(grid.datacollector.get_model_vars_dataframe())
+    assert data.iloc[-1].to_dict() != data.iloc[0].to_dict()
+
+
+def test_agent_engine_geospace_contacts_equal_grid_contacts(model_factory):
+    geospace = model_factory(contacts='geospace', engine='agent', infected_percentage=0)
+    grid = model_factory(contacts='grid', engine='agent', infected_percentage=0)
+    for _ in range(12):
+        geospace.step()
+        grid.step()
+
+        for geospace_human, grid_human in zip(geospace.humans()[::7], grid.humans()[::7]):
+            assert {neighbor.unique_id for neighbor in geospace.get_contacts(geospace_human)} == \
+                   {neighbor.unique_id for neighbor in grid.get_contacts(grid_human)}
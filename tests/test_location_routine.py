@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def redrawing(population) -> np.ndarray:
+    indexes = np.arange(len(population))
+    return population.routine_table.redraws(
+        population.routine_age_group[indexes], population.routine_day_type[indexes],
+        population.routine_variant[indexes]
+    )
+
+
+def test_days_without_routine_are_redrawn_every_step(model_factory):
+    model = model_factory(engine='vectorized', infected_percentage=0)
+    population = model.population
+
+    waiting, redrawn = 0, 0
+    model.step()
+    for _ in range(7 * 24):
+        before = np.flatnonzero(redrawing(population))
+        day_types = population.routine_day_type[before].copy()
+        model.step()
+
+        # Within the same day type, agents without routine only leave `~` through a redraw
+        same_day = before[population.routine_day_type[before] == day_types]
+        waiting += len(same_day)
+        redrawn += np.count_nonzero(~redrawing(population)[same_day])
+
+    assert waiting > 0
+    assert 0 < redrawn < waiting
@@ -0,0 +1,17 @@
+from tests.conftest import near
+
+
+def test_newborns_are_indexed_once(model_factory):
+    model = model_factory(contacts='geospace')
+    model.step()
+    agents = len(model.space.agents)
+
+    model._TuberculosisSpread__add_newborn_agents([f'NB_test_{i}' for i in range(5)])
+    assert len(model.space.agents) == agents + 5
+
+    distance = model.exposure_distance
+    for newborn in model.humans()[-5:]:
+        ids = [neighbor.unique_id for neighbor in model.get_contacts(newborn)]
+        assert len(ids) == len(set(ids))
+        assert ids.count(newborn.unique_id) == 1
+        assert near(model, newborn, distance * 0.99) <= set(ids) <= near(model, newborn, distance * 1.01)
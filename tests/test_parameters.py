@@ -0,0 +1,19 @@
+import pytest
+
+from src.batch.scenario import Scenario
+from src.disease_spread.parameters import DiseaseParameters
+
+
+def test_overrides_are_applied():
+    parameters = DiseaseParameters(24, {'IR_constant': 0.1, 'latent_recovery_day_range': [40, 50]})
+    assert parameters.IR_constant == 0.1
+    assert parameters.latent_recovery_day_range == (40, 50)
+    assert parameters.year_in_steps == 365 * 24
+
+
+@pytest.mark.parametrize('name', ['step_per_day', 'unknown'])
+def test_invalid_overrides_are_rejected(name):
+    with pytest.raises(Exception, match=rf'\[DiseaseParameters\] .*{name}'):
+        DiseaseParameters(24, {name: 1})
+    with pytest.raises(Exception, match=rf'\[DiseaseParameters\] .*{name}'):
+        Scenario({'locations': ['Raion'], 'steps': 10, 'sweep': {name: [1, 2]}})
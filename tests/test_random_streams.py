@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.utils.random_streams import RandomStreams
+
+
+def test_uniform_is_independent_of_batching():
+    indexes = np.arange(3 * RandomStreams.BLOCK_SIZE + 17)
+    keys = indexes % 3
+    streams = RandomStreams(seed=11)
+    at_once = streams.uniform('infection', 5, indexes, keys)
+
+    bounds = [0, 100, RandomStreams.BLOCK_SIZE - 1, RandomStreams.BLOCK_SIZE + 1, 2 * RandomStreams.BLOCK_SIZE,
+              len(indexes)]
+    batched = np.concatenate([
+        RandomStreams(seed=11).uniform('infection', 5, indexes[start:end], keys[start:end])
+        for start, end in zip(bounds, bounds[1:])
+    ])
+    assert np.array_equal(at_once, batched)
+
+    shuffled = np.random.default_rng(0).permutation(len(indexes))
+    assert np.array_equal(at_once[shuffled], streams.uniform('infection', 5, indexes[shuffled], keys[shuffled]))
+
+    single = [RandomStreams(seed=11).uniform('infection', 5, [index], key)[0]
+              for index, key in zip(indexes[::997], keys[::997])]
+    assert np.array_equal(at_once[::997], single)
+
+
+def test_uniform_depends_on_name_step_and_key():
+    streams = RandomStreams(seed=11)
+    indexes = np.arange(10)
+    draws = streams.uniform('infection', 5, indexes)
+    assert not np.array_equal(draws, streams.uniform('routines', 5, indexes))
+    assert not np.array_equal(draws, streams.uniform('infection', 6, indexes))
+    assert not np.array_equal(draws, streams.uniform('infection', 5, indexes, 1))
+    assert np.array_equal(draws, RandomStreams(seed=11).uniform('infection', 5, indexes))
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+
+from src.config import Config
+from src.utils.agent_places import AgentPlaces
+from src.utils.human_age import HumanAge
+from src.utils.routine_table import RoutineTable
+from src.utils.yaml_reader import YamlReader
+
+
+def test_cached_table_equals_compiled_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(RoutineTable, 'CACHE_FOLDER', str(tmp_path))
+    places = [place['tag'] for place in AgentPlaces.new(Config.ROUTINES_PATH).raw().values()]
+    compiled = RoutineTable.compile(YamlReader(Config.ROUTINES_PATH).read('routines'), places)
+
+    first = RoutineTable.load(Config.ROUTINES_PATH, places)
+    assert len(os.listdir(tmp_path)) == 1
+    second = RoutineTable.load(Config.ROUTINES_PATH, places)
+
+    for table in (first, second):
+        assert table.places == places
+        assert table.table.dtype == compiled.table.dtype
+        assert np.array_equal(table.table, compiled.table)
+        assert np.array_equal(table.variants, compiled.variants)
+        assert np.array_equal(table.empty, compiled.empty)
+        assert np.array_equal(table.choices, compiled.choices)
+
+
+def routines(**days) -> dict:
+    ages = [str(age).lower() for age in HumanAge]
+    return {age: {'weekday': days.get(age, [None]), 'weekend': [None]} for age in ages}
+
+
+def test_lists_of_places_are_chosen_per_step():
+    places = ['home', 'work', 'school']
+    table = RoutineTable.compile(routines(adult=[{8: ['work', 'school'], 18: 'home'}]), places)
+
+    cell = table.slots(np.array([HumanAge.Adult]), np.array([0]), np.array([0]), np.array([8]))
+    assert cell[0] <= RoutineTable.CHOICE
+    assert table.steps_to_transition(np.array([HumanAge.Adult]), np.array([0]), np.array([0]), np.array([7]))[0] == 1
+
+    uniform = np.random.default_rng(0).random(2000)
+    chosen = table.choose(np.repeat(cell, len(uniform)), uniform)
+    assert set(chosen.tolist()) == {places.index('work'), places.index('school')}
+    assert abs(np.mean(chosen == places.index('work')) - 0.5) < 0.05
+
+
+def test_days_without_routine_are_redrawn():
+    table = RoutineTable.compile(routines(adult=[None, {8: 'work', 18: 'home'}]), ['home', 'work'])
+    adult, newborn = HumanAge.Adult, HumanAge.Newborn
+
+    assert table.empty[adult - newborn, 0].tolist() == [True, False]
+    redraws = table.redraws(np.array([adult, adult, newborn]), np.array([0, 0, 0]), np.array([0, 1, 0]))
+    # A day with `~` as its only variant would pick it again
+    assert redraws.tolist() == [True, False, False]
@@ -0,0 +1,12 @@
+from src.utils.human_state import HumanState
+from tests.conftest import run
+
+
+def test_event_scheduler_steps_like_base_scheduler(model_factory):
+    base = model_factory(infected_percentage=20, scheduler='base', debug_counters=True)
+    event = model_factory(infected_percentage=20, scheduler='event', debug_counters=True)
+
+    base_rows, event_rows = run(base, 300), run(event, 300)
+    assert base_rows == event_rows
+    assert base_rows[-1]['state'][HumanState.Sustainable] != base_rows[0]['state'][HumanState.Sustainable]
+    assert [agent.condition for agent in base.humans()] == [agent.condition for agent in event.humans()]
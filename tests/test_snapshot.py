@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def test_resumed_run_equals_uninterrupted_run(model_factory, tmp_path):
+    steps = 300
+    path = str(tmp_path / 'snapshot.npz')
+
+    uninterrupted = model_factory(engine='vectorized')
+    for _ in range(steps):
+        uninterrupted.step()
+
+    interrupted = model_factory(engine='vectorized')
+    for _ in range(steps // 2):
+        interrupted.step()
+    interrupted.save_snapshot(path, run_step=steps // 2)
+
+    resumed = model_factory(engine='vectorized', snapshot=path)
+    for _ in range(steps - steps // 2):
+        resumed.step()
+
+    assert uninterrupted.datacollector.get_model_vars_dataframe().equals(
+        resumed.datacollector.get_model_vars_dataframe()
+    )
+    resumed_state = resumed.population.state()
+    for name, values in uninterrupted.population.state().items():
+        assert np.array_equal(values, resumed_state[name]), name